@@ -0,0 +1,36 @@
+"""CSC110 Project: The Hidden Correlation Between Covid-19 and Hate Crimes in the United States
+
+Module Description
+==================
+This module contains the function used to write the project's generated files, such as the data
+set snapshots and the exported figures, atomically.
+"""
+import os
+from typing import Callable
+
+
+def replace_file(path: str, write: Callable) -> None:
+    """Call write with a new binary file and atomically move that file to path.
+
+    Other processes reading or writing path concurrently see either the old or the new file,
+    never a partially written one.
+    """
+    temporary_path = f'{path}.{os.getpid()}.tmp'
+    with open(temporary_path, 'wb') as file:
+        write(file)
+    os.replace(temporary_path, path)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'extra-imports': ['validation', 'os', 'typing'],
+        'allowed-io': ['replace_file'],
+        'disable': ['R1705']
+    })
+
+    import validation
+
+    validation.check_contracts()
@@ -0,0 +1,125 @@
+"""CSC110 Project: The Hidden Correlation Between Covid-19 and Hate Crimes in the United States
+
+Module Description
+==================
+This module contains functions to backtest the models used to predict the number of hate crime
+incidents of a year.
+
+For every target year, every model predicts the number of incidents of every state from the
+years before the target year only, exactly like hate_crime.predictions predicts 2020 from 1999 to
+2019. The predictions are then compared with the actual number of incidents of the target year.
+All predictions are computed from the yearly counts of a single CountCube.
+"""
+import csv
+from typing import Iterable, Optional
+
+import numpy as np
+
+import prediction_models
+from hate_crime import HateCrime, CountCube, STATE_CODES, count_cube
+
+# The names of the error metrics computed by backtest, in the order they are stored in
+METRICS = ('MAE', 'MAPE', 'Bias')
+
+
+def backtest_predictions(cube: CountCube, target_years: Iterable[int], model: str,
+                         start_year: int = 1999) -> np.ndarray:
+    """Return a states x target years matrix of the predictions of the given model for every
+    state of STATE_CODES, each predicted from the years start_year to target year - 1.
+
+    Preconditions:
+        - model in prediction_models.MODELS
+        - all(start_year + 1 < year for year in target_years)
+    """
+    year_counts = cube.year_counts[:len(STATE_CODES)]
+    return np.column_stack([
+        prediction_models.predict(
+            prediction_models.year_window(year_counts, cube.first_year, start_year, year - 1),
+            model)
+        for year in target_years])
+
+
+def actual_counts(cube: CountCube, target_years: Iterable[int]) -> np.ndarray:
+    """Return a states x target years matrix of the number of incidents of every state of
+    STATE_CODES in every target year."""
+    columns = [year - cube.first_year for year in target_years]
+    return cube.year_counts[:len(STATE_CODES), columns]
+
+
+def error_metrics(predicted: np.ndarray, actual: np.ndarray) -> np.ndarray:
+    """Return the mean absolute error, mean absolute percentage error and bias (mean of the
+    predicted minus the actual counts) of every row of predicted, as the columns of a matrix.
+
+    Years without any actual incidents are left out of the mean absolute percentage error, which
+    is nan for rows without any incidents at all.
+
+    >>> error_metrics(np.array([[12, 8, 5]]), np.array([[10, 10, 0]])).round(2).tolist()
+    [[3.0, 20.0, 1.67]]
+    """
+    difference = np.asarray(predicted, dtype=np.float64) - actual
+    has_incidents = actual > 0
+    percentage = np.divide(np.abs(difference) * 100, actual, out=np.zeros_like(difference),
+                           where=has_incidents)
+    num_with_incidents = has_incidents.sum(axis=1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mape = percentage.sum(axis=1) / num_with_incidents
+
+    return np.column_stack((np.abs(difference).mean(axis=1), mape, difference.mean(axis=1)))
+
+
+def backtest(data: list[HateCrime], target_years: Iterable[int] = range(2005, 2021),
+             models: Optional[Iterable[str]] = None,
+             start_year: int = 1999) -> dict[str, dict[str, list[float]]]:
+    """Return a dictionary mapping every model name to a dictionary mapping every state to its
+    [MAE, MAPE, Bias] over the target years, when predicting each target year from the years
+    start_year to target year - 1.
+
+    The additional state 'ALL' holds the errors over the target years of all states together.
+    By default, every model of prediction_models.MODELS is backtested.
+
+    Preconditions:
+        - models is None or all(model in prediction_models.MODELS for model in models)
+        - all(start_year + 1 < year <= 2020 for year in target_years)
+    """
+    cube = count_cube(data)
+    target_years = list(target_years)
+    actual = actual_counts(cube, target_years)
+
+    errors = {}
+    for model in (prediction_models.MODELS if models is None else models):
+        predicted = backtest_predictions(cube, target_years, model, start_year)
+        by_state = error_metrics(predicted, actual)
+        overall = error_metrics(predicted.reshape((1, -1)), actual.reshape((1, -1)))[0]
+
+        errors[model] = {state: by_state[code].tolist() for code, state in enumerate(STATE_CODES)}
+        errors[model]['ALL'] = overall.tolist()
+
+    return errors
+
+
+def to_csv(errors: dict[str, dict[str, list[float]]], filename: str = 'backtest.csv') -> None:
+    """Write the errors returned by backtest to a csv file with the given filename."""
+    with open(filename, 'w', newline='') as backtest_file:
+
+        writer = csv.writer(backtest_file)
+        writer.writerow(['Model', 'State', *METRICS])
+        for model, by_state in errors.items():
+            for state, metrics in by_state.items():
+                writer.writerow([model, state, *metrics])
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'extra-imports': ['validation', 'csv', 'typing', 'numpy', 'prediction_models',
+                          'hate_crime'],
+        'allowed-io': ['to_csv'],
+        'disable': ['R1705']
+    })
+
+    import validation
+
+    validation.check_contracts()
@@ -0,0 +1,194 @@
+"""CSC110 Project: The Hidden Correlation Between Covid-19 and Hate Crimes in the United States
+
+Module Description
+==================
+This module contains a benchmark of every stage of the project's pipeline, from reading the csv
+files to writing percent_diff.csv.
+
+The stages are timed on the real data sets and on synthetic data sets (see synthetic_data) with
+a multiple of the real number of rows, and the timings are written to a json file so that
+different runs can be compared. Every aggregation stage is timed with empty caches, so that it
+includes building the count cube and the covid monthly totals.
+
+Run this module as a script, e.g. python benchmark.py --scales 1 10 100 --output bench.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+import zipfile
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+import covid_dataclass
+import covid_to_hate_crime_relationship
+import creating_graphs
+import hate_crime
+import series_cache
+import synthetic_data
+
+
+def time_call(function: Callable[[], Any], repeat: int,
+              setup: Optional[Callable[[], Any]] = None) -> list[float]:
+    """Return the wall time in seconds of each of repeat calls to function, calling setup (not
+    timed) before each call.
+
+    Preconditions:
+        - repeat >= 1
+    """
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def clear_caches() -> None:
+    """Forget every aggregate cached by the hate_crime and covid_dataclass modules, and every
+    series cached by series_cache."""
+    hate_crime.clear_count_cubes()
+    covid_dataclass.clear_monthly_totals()
+    series_cache.invalidate()
+
+
+def benchmark_files(hate_crime_file: str, covid_file: str, output_dir: str,
+                    repeat: int) -> tuple[dict[str, int], dict[str, list[float]]]:
+    """Return the number of rows read from the given hate crime and covid csv files, and a
+    dictionary mapping the name of every stage of the pipeline to its timings on them.
+
+    percent_diff.csv is written in output_dir.
+    """
+    timings = {}
+    hate_crime_data = []
+    covid_data = []
+
+    def read_hate_crime() -> None:
+        hate_crime_data[:] = hate_crime.read_csv_file(hate_crime_file)[1]
+
+    def read_covid() -> None:
+        covid_data[:] = covid_dataclass.read_csv_file(covid_file)
+
+    timings['read_hate_crime'] = time_call(read_hate_crime, repeat)
+    timings['read_covid'] = time_call(read_covid, repeat)
+
+    timings['processing_data'] = time_call(
+        lambda: covid_dataclass.processing_data(covid_data), repeat, clear_caches)
+    timings['get_data_by_month'] = time_call(
+        lambda: [creating_graphs.get_data_by_month(hate_crime_data, state)
+                 for state in hate_crime.STATE_CODES], repeat, clear_caches)
+    timings['get_xy_data'] = time_call(
+        lambda: [covid_to_hate_crime_relationship.get_xy_data(covid_data, hate_crime_data, state)
+                 for state in hate_crime.STATE_CODES], repeat, clear_caches)
+    timings['calculate_percent_difference'] = time_call(
+        lambda: hate_crime.calculate_percent_difference(hate_crime_data), repeat, clear_caches)
+
+    percent_diff = hate_crime.calculate_percent_difference(hate_crime_data)
+    percent_diff_file = os.path.join(output_dir, 'percent_diff.csv')
+    timings['to_csv'] = time_call(lambda: hate_crime.to_csv(percent_diff, percent_diff_file),
+                                  repeat)
+
+    return {'hate_crime': len(hate_crime_data), 'covid': len(covid_data)}, timings
+
+
+def run_benchmarks(scales: list[float], repeat: int = 3, seed: int = 0,
+                   real_hate_crime: Optional[str] = 'hate_crime.zip',
+                   real_covid: Optional[str] = 'all-states-history.csv') -> dict[str, Any]:
+    """Return the results of benchmarking every stage on the real data sets and on synthetic data
+    sets of every scale, as a json-serializable dictionary.
+
+    The real hate crime file may be hate_crime.csv or a zip archive containing it; the archive is
+    extracted to a temporary directory first, and reading it directly is timed separately. The
+    real data sets are skipped if real_hate_crime or real_covid is None.
+    """
+    results = []
+
+    def add_results(dataset: str, scale: float, rows: dict[str, int],
+                    timings: dict[str, list[float]]) -> None:
+        for stage, seconds in timings.items():
+            results.append({'dataset': dataset, 'scale': scale, 'rows': rows, 'stage': stage,
+                            'seconds': seconds, 'min': min(seconds),
+                            'median': statistics.median(seconds)})
+
+    with tempfile.TemporaryDirectory() as temporary_dir:
+        if real_hate_crime is not None and real_covid is not None:
+            extra_timings = {}
+            if real_hate_crime.endswith('.zip'):
+                extra_timings['read_zip_hate_crime'] = time_call(
+                    lambda: hate_crime.read_zip_file(real_hate_crime), repeat)
+                with zipfile.ZipFile(real_hate_crime) as archive:
+                    real_hate_crime = archive.extract('hate_crime.csv', temporary_dir)
+
+            rows, timings = benchmark_files(real_hate_crime, real_covid, temporary_dir, repeat)
+            add_results('real', 1, rows, {**extra_timings, **timings})
+
+        for scale in scales:
+            rows = {'hate_crime': round(synthetic_data.HATE_CRIME_ROWS * scale),
+                    'covid': round(synthetic_data.COVID_ROWS * scale)}
+            hate_crime_file = os.path.join(temporary_dir, 'synthetic_hate_crime.csv')
+            covid_file = os.path.join(temporary_dir, 'synthetic_covid.csv')
+            synthetic_data.write_hate_crime_csv(hate_crime_file, rows['hate_crime'], seed)
+            synthetic_data.write_covid_csv(covid_file, rows['covid'], seed)
+
+            _, timings = benchmark_files(hate_crime_file, covid_file, temporary_dir, repeat)
+            add_results('synthetic', scale, rows, timings)
+            clear_caches()
+
+    return {'metadata': {'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+                         'python': platform.python_version(), 'numpy': np.__version__,
+                         'platform': platform.platform(), 'repeat': repeat, 'seed': seed},
+            'results': results}
+
+
+def main(arguments: Optional[list[str]] = None) -> None:
+    """Run the benchmarks with the given command line arguments and write the results to the
+    output json file."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scales', type=float, nargs='*', default=[1, 10, 100],
+                        help='multiples of the real row counts to generate synthetic data for')
+    parser.add_argument('--repeat', type=int, default=3, help='number of timings per stage')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic data')
+    parser.add_argument('--hate-crime', default='hate_crime.zip',
+                        help='real hate crime csv file or zip archive')
+    parser.add_argument('--covid', default='all-states-history.csv', help='real covid csv file')
+    parser.add_argument('--no-real', action='store_true', help='skip the real data sets')
+    parser.add_argument('--output', default='bench.json', help='json file to write')
+    options = parser.parse_args(arguments)
+
+    results = run_benchmarks(options.scales, options.repeat, options.seed,
+                             None if options.no_real else options.hate_crime,
+                             None if options.no_real else options.covid)
+
+    with open(options.output, 'w') as file:
+        json.dump(results, file, indent=2)
+
+    for result in results['results']:
+        print(f"{result['dataset']:>9} x{result['scale']:<6g} {result['stage']:<30} "
+              f"{result['min']:.4f} s")
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'extra-imports': ['validation', 'argparse', 'datetime', 'json', 'os', 'platform',
+                          'statistics', 'tempfile', 'time', 'zipfile', 'typing', 'numpy',
+                          'covid_dataclass', 'covid_to_hate_crime_relationship',
+                          'creating_graphs', 'hate_crime', 'series_cache', 'synthetic_data'],
+        'allowed-io': ['main'],
+        'disable': ['R1705']
+    })
+
+    import validation
+
+    validation.check_contracts()
+
+    main()
@@ -0,0 +1,286 @@
+"""CSC110 Project: The Hidden Correlation Between Covid-19 and Hate Crimes in the United States
+
+Module Description
+==================
+This module contains the categorical columns of hate_crime.csv that HateCrime leaves out, such as
+the bias motivations, offenses and locations of every incident, and a group-by engine that counts
+the incidents of a record_store.HateCrimeStore by any combination of state, year, month and these
+categories.
+
+A categorical column is dictionary-encoded: every distinct value is stored once, and every row
+holds small integer codes into these values. Fields such as BIAS_DESC can hold several values
+separated by semicolons, so the codes of all rows are stored one after the other in a single
+array, with an array of offsets marking where the codes of every row begin. An incident with
+several values counts once under each of its values.
+
+A breakdown is computed in a single pass: the codes of every dimension are combined into one
+integer key per (incident, value) pair, and the keys are counted at once.
+
+>>> column = encode_column('bias', ['Anti-Jewish', 'Anti-Black;Anti-Jewish', ''])
+>>> column.categories
+('Anti-Black', 'Anti-Jewish')
+>>> column.values(1)
+['Anti-Black', 'Anti-Jewish']
+"""
+import csv
+from dataclasses import dataclass
+import io
+from typing import Iterable, Optional, Sequence
+import zipfile
+
+import numpy as np
+
+from hate_crime import split_date_ordinals
+from record_store import HateCrimeStore
+
+# The categorical columns of hate_crime.csv, keyed by the name of their dimension
+CATEGORY_COLUMNS = {'bias': 'BIAS_DESC', 'offense': 'OFFENSE_NAME', 'location': 'LOCATION_NAME',
+                    'victim_type': 'VICTIM_TYPES'}
+
+# The dimensions of every store, besides the categorical columns
+STORE_DIMENSIONS = ('state', 'year', 'month')
+
+# The separator of the values of a multi-valued field
+_SEPARATOR = ';'
+
+# The largest number of combinations counted in a dense array; more are counted by sorting
+_DENSE_LIMIT = 1 << 22
+
+
+@dataclass
+class CategoricalColumn:
+    """A dictionary-encoded column of hate_crime.csv, whose fields may hold several values.
+
+    Attributes:
+        - name: the name of the dimension of the column, a key of CATEGORY_COLUMNS
+        - categories: the distinct values of the column, in the order of their codes
+        - offsets: the codes of row i are codes[offsets[i]:offsets[i + 1]]
+        - codes: the codes of the values of every row, one row after the other
+
+    Representation Invariants:
+        - self.offsets[0] == 0 and self.offsets[-1] == len(self.codes)
+        - (np.diff(self.offsets) >= 0).all()
+        - len(self.categories) <= 65536
+    """
+    name: str
+    categories: tuple[str, ...]
+    offsets: np.ndarray
+    codes: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def values(self, row: int) -> list[str]:
+        """Return the values of the given row."""
+        return [self.categories[code]
+                for code in self.codes[self.offsets[row]:self.offsets[row + 1]].tolist()]
+
+
+@dataclass
+class Breakdown:
+    """The number of incidents in every combination of values of some dimensions, keeping only
+    the combinations with at least one incident.
+
+    Attributes:
+        - dimensions: the names of the dimensions
+        - labels: the values of every dimension, in the order of its codes
+        - groups: groups[i, j] is the code of the value of dimension j in the i-th combination
+        - counts: counts[i] is the number of incidents in the i-th combination
+
+    Representation Invariants:
+        - len(self.dimensions) == len(self.labels) == self.groups.shape[1]
+        - self.groups.shape[0] == len(self.counts)
+    """
+    dimensions: tuple[str, ...]
+    labels: tuple[tuple, ...]
+    groups: np.ndarray
+    counts: np.ndarray
+
+    def to_dict(self) -> dict[tuple, int]:
+        """Return a dictionary mapping every combination of values to its number of incidents."""
+        return {tuple(labels[code] for labels, code in zip(self.labels, group)): count
+                for group, count in zip(self.groups.tolist(), self.counts.tolist())}
+
+
+###############################################################################
+# Encoding the columns
+###############################################################################
+class _ColumnEncoder:
+    """An encoder building a categorical column one field at a time.
+
+    Instance Attributes:
+        - name: the name of the dimension of the column
+        - category_codes: a mapping from every value seen so far to its code, in the order the
+          values were first seen
+        - offsets: the offsets of the column so far
+        - codes: the codes of the column so far
+    """
+    name: str
+    category_codes: dict[str, int]
+    offsets: list[int]
+    codes: list[int]
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.category_codes = {}
+        self.offsets = [0]
+        self.codes = []
+
+    def add(self, field: str) -> None:
+        """Add a row with the values of field, separated by semicolons, to the column."""
+        if field:
+            category_codes = self.category_codes
+            self.codes.extend(category_codes.setdefault(value, len(category_codes))
+                              for value in field.split(_SEPARATOR))
+        self.offsets.append(len(self.codes))
+
+    def column(self) -> CategoricalColumn:
+        """Return the column of the rows added so far, with its categories sorted."""
+        categories = sorted(self.category_codes)
+        dtype = np.uint8 if len(categories) <= 256 else np.uint16
+        remap = np.zeros(len(categories), dtype=dtype)
+        remap[[self.category_codes[category] for category in categories]] = \
+            np.arange(len(categories))
+
+        return CategoricalColumn(self.name, tuple(categories),
+                                 np.array(self.offsets, dtype=np.int64),
+                                 remap[np.array(self.codes, dtype=np.int64)])
+
+
+def encode_column(name: str, fields: Iterable[str]) -> CategoricalColumn:
+    """Return the categorical column with the given name of the given fields, in which values
+    are separated by semicolons. The categories are sorted, and empty fields have no values.
+    """
+    encoder = _ColumnEncoder(name)
+    for field in fields:
+        encoder.add(field)
+    return encoder.column()
+
+
+def read_rows(rows: Iterable[list[str]],
+              names: Sequence[str] = tuple(CATEGORY_COLUMNS)) -> dict[str, CategoricalColumn]:
+    """Return the categorical columns with the given names of the hate crime csv rows, whose
+    first row is the header.
+
+    The columns are found by their headers, and all of them are encoded in one pass over rows,
+    keeping only the codes of every row.
+
+    Preconditions:
+        - all(name in CATEGORY_COLUMNS for name in names)
+    """
+    rows = iter(rows)
+    headers = next(rows)
+    encoders = [(headers.index(CATEGORY_COLUMNS[name]), _ColumnEncoder(name)) for name in names]
+
+    for row in rows:
+        for index, encoder in encoders:
+            encoder.add(row[index])
+
+    return {encoder.name: encoder.column() for _, encoder in encoders}
+
+
+def read_categories(filename: str = 'hate_crime.zip',
+                    names: Sequence[str] = tuple(CATEGORY_COLUMNS),
+                    member: str = 'hate_crime.csv') -> dict[str, CategoricalColumn]:
+    """Return the categorical columns with the given names of the hate crime data set in
+    filename, with one row per record of hate_crime.read_csv_file, in the same order.
+
+    filename may be either hate_crime.csv or a zip archive containing it as member.
+
+    Preconditions:
+        - filename refers to a valid hate crime csv file or zip archive
+        - all(name in CATEGORY_COLUMNS for name in names)
+    """
+    if filename.endswith('.zip'):
+        with zipfile.ZipFile(filename) as archive, archive.open(member) as raw:
+            return read_rows(csv.reader(io.TextIOWrapper(raw, encoding='utf-8', newline='')),
+                             names)
+    else:
+        with open(filename, newline='') as file:
+            return read_rows(csv.reader(file), names)
+
+
+###############################################################################
+# Counting the incidents
+###############################################################################
+def breakdown(store: HateCrimeStore, columns: dict[str, CategoricalColumn],
+              dimensions: Sequence[str], where: Optional[np.ndarray] = None) -> Breakdown:
+    """Return the number of incidents of store in every combination of values of the given
+    dimensions, counting only the incidents selected by the boolean mask where, if given.
+
+    Every dimension is either one of STORE_DIMENSIONS or the name of a column of columns. An
+    incident with several values in a column counts once in each of them, and an incident
+    without any value in a column is not counted.
+
+    Preconditions:
+        - all(len(column) == len(store) for column in columns.values())
+        - all(d in STORE_DIMENSIONS or d in columns for d in dimensions)
+        - where is None or where.shape == (len(store),)
+    """
+    rows = np.arange(len(store)) if where is None else np.flatnonzero(where)
+    keys = np.zeros(len(rows), dtype=np.int64)
+    labels = []
+
+    years, months = split_date_ordinals(store.date_ordinals)
+    first_year = int(years.min()) if len(years) > 0 else 0
+
+    # The values of a dimension are strings for the state and the columns, and ints otherwise
+    dimension_labels: tuple
+
+    for dimension in dimensions:
+        if dimension in columns:
+            rows, keys, codes = _expand(columns[dimension], rows, keys)
+            dimension_labels = columns[dimension].categories
+        elif dimension == 'state':
+            codes, dimension_labels = store.state_codes[rows], store.states
+        elif dimension == 'year':
+            codes = years[rows] - first_year
+            dimension_labels = tuple(range(first_year, int(years.max()) + 1)) if len(years) else ()
+        else:
+            codes, dimension_labels = months[rows] - 1, tuple(range(1, 13))
+
+        keys = keys * max(len(dimension_labels), 1) + codes
+        labels.append(dimension_labels)
+
+    shape = tuple(max(len(dimension_labels), 1) for dimension_labels in labels)
+    if np.prod(shape, dtype=np.float64) <= _DENSE_LIMIT:
+        counts = np.bincount(keys, minlength=int(np.prod(shape)))
+        flat_groups = np.flatnonzero(counts)
+        counts = counts[flat_groups]
+    else:
+        flat_groups, counts = np.unique(keys, return_counts=True)
+
+    groups = np.stack(np.unravel_index(flat_groups, shape), axis=1) if labels \
+        else np.zeros((len(counts), 0), dtype=np.int64)
+    return Breakdown(tuple(dimensions), tuple(labels), groups, counts)
+
+
+def _expand(column: CategoricalColumn, rows: np.ndarray,
+            keys: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return the rows and keys repeated once per value of the row in column, along with the
+    code of that value."""
+    starts = column.offsets[rows]
+    lengths = column.offsets[rows + 1] - starts
+
+    # The position of every value among the values of its row
+    ends = np.cumsum(lengths)
+    positions = np.arange(ends[-1] if len(ends) > 0 else 0) - np.repeat(ends - lengths, lengths)
+
+    return (np.repeat(rows, lengths), np.repeat(keys, lengths),
+            column.codes[np.repeat(starts, lengths) + positions])
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'extra-imports': ['validation', 'csv', 'dataclasses', 'io', 'typing', 'zipfile', 'numpy',
+                          'hate_crime', 'record_store'],
+        'allowed-io': ['read_categories'],
+        'disable': ['R1705']
+    })
+
+    import validation
+
+    validation.check_contracts()
@@ -0,0 +1,268 @@
+"""CSC110 Project: The Hidden Correlation Between Covid-19 and Hate Crimes in the United States
+
+Module Description
+==================
+This module contains functions to compute the correlation between the monthly covid cases and
+the monthly hate crime incidents of 2020 (the series of get_xy_data) for every state at once.
+
+For every state, the Pearson and Spearman correlations are computed with a bootstrap confidence
+interval and a two-sided permutation p-value. The resamples and permutations of all states are
+drawn in vectorized batches, and the batches are spread over a pool of worker processes. Every
+batch draws from its own random generator spawned from a single seed, so the results depend on
+the seed but not on the number of workers.
+
+Run this module as a script, e.g. python correlation.py --resamples 10000 --workers 8
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import functools
+from typing import Iterable, Optional
+import warnings
+
+import numpy as np
+
+import covid_dataclass
+from covid_dataclass import CovidData
+import hate_crime
+from hate_crime import HateCrime, CountCube
+
+# The correlation methods, in the order they are computed in
+METHODS = ('pearson', 'spearman')
+
+# The statistics computed for every state and method, in the order they are stored in
+STATISTICS = ('r', 'CI Low', 'CI High', 'p-value')
+
+# The number of resamples or permutations drawn by one batch
+_BATCH_SIZE = 1000
+
+
+def xy_matrices(covid_totals: dict[tuple[str, int, int], int], cube: CountCube,
+                states: Iterable[str]) -> tuple[np.ndarray, np.ndarray]:
+    """Return a states x months matrix of the covid cases and a states x months matrix of the
+    hate crime incidents of every given state in every month of 2020.
+
+    Row i of the matrices holds the second and third lists returned by
+    covid_to_hate_crime_relationship.aggregate_xy_data for the i-th state.
+    """
+    states = list(states)
+    covid = np.array([[covid_totals.get((state, 2020, month), 0) for month in range(1, 13)]
+                      for state in states], dtype=np.float64)
+
+    hate_crimes = np.zeros((len(states), 12))
+    column = 2020 - cube.first_year
+    if 0 <= column < cube.counts.shape[1]:
+        for row, state in enumerate(states):
+            if state in cube.state_index:
+                hate_crimes[row] = cube.counts[cube.state_index[state], column]
+
+    return covid, hate_crimes
+
+
+def pearson(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Return the Pearson correlation between x and y along their last axis.
+
+    The correlation of a series without any variance is nan.
+
+    >>> pearson(np.array([[1, 2, 3], [1, 2, 3]]), np.array([[2, 4, 7], [3, 2, 1]])).round(3)
+    array([ 0.993, -1.   ])
+    """
+    x = x - x.mean(axis=-1, keepdims=True)
+    y = y - y.mean(axis=-1, keepdims=True)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (x * y).sum(axis=-1) / np.sqrt((x * x).sum(axis=-1) * (y * y).sum(axis=-1))
+
+
+def ranks(values: np.ndarray) -> np.ndarray:
+    """Return the ranks, starting at 1, of values along their last axis, giving tied values the
+    mean of their ranks.
+
+    >>> ranks(np.array([30, 10, 20, 10])).tolist()
+    [4.0, 1.5, 3.0, 1.5]
+    """
+    smaller = (values[..., None, :] < values[..., :, None]).sum(axis=-1)
+    equal = (values[..., None, :] == values[..., :, None]).sum(axis=-1)
+    return smaller + (equal + 1) / 2
+
+
+def spearman(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Return the Spearman rank correlation between x and y along their last axis.
+
+    >>> spearman(np.array([1, 2, 3, 4]), np.array([1, 8, 27, 64])).item()
+    1.0
+    """
+    return pearson(ranks(x), ranks(y))
+
+
+def correlate(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Return the correlations of every method of METHODS between x and y along their last axis,
+    stacked along a new first axis."""
+    return np.stack([pearson(x, y), spearman(x, y)])
+
+
+def _bootstrap_batch(x: np.ndarray, y: np.ndarray, seed: np.random.SeedSequence,
+                     size: int) -> np.ndarray:
+    """Return the correlations of every method between size bootstrap resamples of the rows of
+    x and y, as a methods x size x rows array.
+
+    Every resample draws the months of every row with replacement, keeping the covid cases and
+    hate crime incidents of a month together.
+    """
+    indexes = np.random.default_rng(seed).integers(0, x.shape[-1], (size, *x.shape))
+    return correlate(np.take_along_axis(x[None], indexes, axis=-1),
+                     np.take_along_axis(y[None], indexes, axis=-1))
+
+
+def _permutation_batch(x: np.ndarray, y: np.ndarray, observed: np.ndarray,
+                       seed: np.random.SeedSequence, size: int) -> np.ndarray:
+    """Return the number of size random permutations of the rows of y whose correlation with x is
+    at least as far from 0 as observed, for every method and row, as a methods x rows array.
+
+    The count of a row whose observed correlation is nan is meaningless, since no correlation
+    compares as far from 0 as nan.
+    """
+    permutations = np.random.default_rng(seed).random((size, *y.shape)).argsort(axis=-1)
+
+    # Permuting a row permutes its ranks, so the ranks are only computed once
+    permuted = np.stack([
+        pearson(x, np.take_along_axis(y[None], permutations, axis=-1)),
+        pearson(ranks(x), np.take_along_axis(ranks(y)[None], permutations, axis=-1))])
+
+    # The tolerance keeps permutations equal to the observed data from being missed due to
+    # rounding errors
+    return (np.abs(permuted) >= np.abs(observed[:, None]) - 1e-12).sum(axis=1)
+
+
+def _batch_sizes(total: int) -> list[int]:
+    """Return the sizes of the batches drawing total resamples or permutations."""
+    return [min(_BATCH_SIZE, total - start) for start in range(0, total, _BATCH_SIZE)]
+
+
+def correlation_statistics(x: np.ndarray, y: np.ndarray, resamples: int = 10000,
+                           permutations: int = 10000, confidence: float = 0.95, seed: int = 0,
+                           workers: Optional[int] = None) -> np.ndarray:
+    """Return a methods x rows x STATISTICS array of the correlation of every method between
+    every row of x and the same row of y, its bootstrap percentile confidence interval at the
+    given confidence level and its two-sided permutation p-value.
+
+    Resamples in which a row has no variance are left out of its confidence interval. Where x
+    or y has no variance at all, the correlation, its confidence interval and its p-value are
+    nan. The batches are spread over the given number of worker processes, by default one per
+    cpu; with a single worker, they are drawn in this process.
+
+    Preconditions:
+        - x.shape == y.shape and x.ndim == 2
+        - resamples >= 1 and permutations >= 1
+        - 0 < confidence < 1
+        - workers is None or workers >= 1
+    """
+    observed = correlate(x, y)
+
+    bootstrap_sizes = _batch_sizes(resamples)
+    permutation_sizes = _batch_sizes(permutations)
+    seeds = np.random.SeedSequence(seed).spawn(len(bootstrap_sizes) + len(permutation_sizes))
+
+    bootstrap = functools.partial(_bootstrap_batch, x, y)
+    permutation = functools.partial(_permutation_batch, x, y, observed)
+    bootstrap_seeds, permutation_seeds = seeds[:len(bootstrap_sizes)], seeds[len(bootstrap_sizes):]
+
+    if workers == 1:
+        resampled = list(map(bootstrap, bootstrap_seeds, bootstrap_sizes))
+        exceeding = list(map(permutation, permutation_seeds, permutation_sizes))
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            resampled = list(executor.map(bootstrap, bootstrap_seeds, bootstrap_sizes))
+            exceeding = list(executor.map(permutation, permutation_seeds, permutation_sizes))
+
+    tail = (1 - confidence) / 2 * 100
+    # Rows without any defined resampled correlation have a nan interval
+    with np.errstate(invalid='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        low, high = np.nanpercentile(np.concatenate(resampled, axis=1), [tail, 100 - tail],
+                                     axis=1)
+    p_value = (np.sum(exceeding, axis=0) + 1) / (permutations + 1)
+
+    # A correlation that is undefined has neither a confidence interval nor a p-value
+    undefined = np.isnan(observed)
+    low[undefined], high[undefined], p_value[undefined] = np.nan, np.nan, np.nan
+
+    return np.stack((observed, low, high, p_value), axis=-1)
+
+
+def correlations(covid_data: list[CovidData], hate_crime_data: list[HateCrime],
+                 states: Iterable[str] = hate_crime.STATE_CODES, resamples: int = 10000,
+                 permutations: int = 10000, confidence: float = 0.95, seed: int = 0,
+                 workers: Optional[int] = None) -> dict[str, dict[str, list[float]]]:
+    """Return a dictionary mapping every method of METHODS to a dictionary mapping every given
+    state to its [r, CI Low, CI High, p-value] between the monthly covid cases and hate crime
+    incidents of 2020, in the order of states.
+
+    See correlation_statistics for the meaning of the other arguments.
+
+    Preconditions:
+        - resamples >= 1 and permutations >= 1
+        - 0 < confidence < 1
+        - workers is None or workers >= 1
+    """
+    states = list(states)
+    x, y = xy_matrices(covid_dataclass.monthly_totals(covid_data),
+                       hate_crime.count_cube(hate_crime_data), states)
+    statistics = correlation_statistics(x, y, resamples, permutations, confidence, seed, workers)
+
+    return {method: {state: statistics[i, row].tolist() for row, state in enumerate(states)}
+            for i, method in enumerate(METHODS)}
+
+
+def to_csv(results: dict[str, dict[str, list[float]]],
+           filename: str = 'correlations.csv') -> None:
+    """Write the results returned by correlations to a csv file with the given filename."""
+    with open(filename, 'w', newline='') as correlation_file:
+
+        writer = csv.writer(correlation_file)
+        writer.writerow(['Method', 'State', *STATISTICS])
+        for method, by_state in results.items():
+            for state, statistics in by_state.items():
+                writer.writerow([method, state, *statistics])
+
+
+def main(arguments: Optional[list[str]] = None) -> None:
+    """Write the correlations of the states given as command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('states', nargs='*', default=hate_crime.STATE_CODES,
+                        help='abbreviated names of the states to analyze (default: all)')
+    parser.add_argument('--resamples', type=int, default=10000,
+                        help='number of bootstrap resamples')
+    parser.add_argument('--permutations', type=int, default=10000,
+                        help='number of permutations for the p-values')
+    parser.add_argument('--confidence', type=float, default=0.95,
+                        help='confidence level of the intervals')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the random generators')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of worker processes (default: one per cpu)')
+    parser.add_argument('--output', default='correlations.csv', help='csv file to write')
+    options = parser.parse_args(arguments)
+
+    import main as project
+    project.load_datasets()
+    to_csv(correlations(project.get_covid_data(), project.get_hate_crime_data(), options.states,
+                        options.resamples, options.permutations, options.confidence,
+                        options.seed, options.workers), options.output)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'extra-imports': ['validation', 'argparse', 'concurrent.futures', 'csv', 'functools',
+                          'typing', 'warnings', 'numpy', 'covid_dataclass', 'hate_crime', 'main'],
+        'allowed-io': ['to_csv'],
+        'disable': ['R1705']
+    })
+
+    import validation
+
+    validation.check_contracts()
+
+    main()
@@ -0,0 +1,145 @@
+"""CSC110 Project: The Hidden Correlation Between Covid-19 and Hate Crimes in the United States
+
+Module Description
+==================
+This module contains a cumulative daily count index, which answers how many hate crime
+incidents (or new covid cases) happened in any set of states from any start date up to but not
+including any end date.
+
+An index is built in a single pass over a data set. It stores, for every state and day, the
+total count of that state before that day, so a query only subtracts two stored totals per
+state, however long its date range is. Many queries can be answered at once with counts.
+
+>>> import datetime
+>>> index = CountIndex.from_arrays(('AL', 'AK'), np.array([0, 0, 1]),
+...                                np.array([737425, 737430, 737430]))
+>>> index.count(datetime.date(2020, 1, 1), datetime.date(2020, 2, 1), {'AL', 'AK'})
+3
+>>> index.count(datetime.date(2020, 1, 2), datetime.date(2020, 2, 1), {'AL'})
+1
+"""
+from dataclasses import dataclass
+import datetime
+from typing import Iterable, Optional
+
+import numpy as np
+
+from covid_dataclass import CovidData
+from hate_crime import HateCrime
+from record_store import CovidStore, HateCrimeStore
+
+
+@dataclass
+class CountIndex:
+    """The cumulative daily counts of every state of a data set.
+
+    Attributes:
+        - states: the abbreviated state names, in the order of the rows of cumulative
+        - state_index: a mapping from each abbreviated state name to its index in states
+        - first_ordinal: the date ordinal of the first day of the index
+        - cumulative: cumulative[code, day] is the total count of states[code] before the day
+          with date ordinal first_ordinal + day
+
+    Representation Invariants:
+        - self.cumulative.shape[0] == len(self.states)
+        - (self.cumulative[:, 0] == 0).all()
+
+    The counts of days before first_ordinal are 0, and those of days after the last day of the
+    index are 0 too. A query whose end is not after its start counts 0.
+    """
+    states: tuple[str, ...]
+    state_index: dict[str, int]
+    first_ordinal: int
+    cumulative: np.ndarray
+
+    @classmethod
+    def from_arrays(cls, states: tuple[str, ...], state_codes: np.ndarray,
+                    date_ordinals: np.ndarray,
+                    weights: Optional[np.ndarray] = None) -> 'CountIndex':
+        """Return the index of rows given as parallel arrays of state codes into states and date
+        ordinals, as in a record store. Every row counts once if weights is None, or as its
+        integer weight otherwise.
+        """
+        if len(date_ordinals) == 0:
+            return cls(states, {state: code for code, state in enumerate(states)}, 0,
+                       np.zeros((len(states), 1), dtype=np.int64))
+
+        first_ordinal = int(date_ordinals.min())
+        num_days = int(date_ordinals.max()) - first_ordinal + 1
+
+        keys = state_codes.astype(np.int64) * num_days + (date_ordinals - first_ordinal)
+        daily = np.bincount(keys, weights, len(states) * num_days)
+
+        cumulative = np.zeros((len(states), num_days + 1), dtype=np.int64)
+        cumulative[:, 1:] = np.rint(daily).astype(np.int64).reshape((len(states), num_days))
+        np.cumsum(cumulative, axis=1, out=cumulative)
+
+        return cls(states, {state: code for code, state in enumerate(states)}, first_ordinal,
+                   cumulative)
+
+    def count(self, start: datetime.date, end: datetime.date, states: Iterable[str]) -> int:
+        """Return the total count of the given states from start up to but not including end.
+
+        States that are not in the index count as 0.
+        """
+        codes = [self.state_index[state] for state in states if state in self.state_index]
+        start_day, end_day = self._days(np.array([start.toordinal(), end.toordinal()]))
+        end_day = max(start_day, end_day)
+        return int((self.cumulative[codes, end_day] - self.cumulative[codes, start_day]).sum())
+
+    def count_by_state(self, start: datetime.date, end: datetime.date,
+                       states: Iterable[str]) -> dict[str, int]:
+        """Return a dictionary mapping every given state to its count from start up to but not
+        including end."""
+        return {state: self.count(start, end, [state]) for state in states}
+
+    def counts(self, queries: list[tuple[datetime.date, datetime.date, Iterable[str]]]) \
+            -> np.ndarray:
+        """Return the count of count(start, end, states) of every (start, end, states) query,
+        answering all queries at once."""
+        starts = self._days(np.array([query[0].toordinal() for query in queries], dtype=np.int64))
+        ends = self._days(np.array([query[1].toordinal() for query in queries], dtype=np.int64))
+        ends = np.maximum(starts, ends)
+
+        selected = np.zeros((len(queries), len(self.states)), dtype=bool)
+        for row, (_, _, states) in enumerate(queries):
+            selected[row, [self.state_index[state] for state in states
+                           if state in self.state_index]] = True
+
+        # Every state's count in every query, as a queries x states matrix
+        by_state = (self.cumulative[:, ends] - self.cumulative[:, starts]).T
+        return np.where(selected, by_state, 0).sum(axis=1)
+
+    def _days(self, ordinals: np.ndarray) -> np.ndarray:
+        """Return the columns of cumulative holding the totals before the days with the given
+        date ordinals."""
+        return np.clip(ordinals - self.first_ordinal, 0, self.cumulative.shape[1] - 1)
+
+
+def hate_crime_index(data: list[HateCrime]) -> CountIndex:
+    """Return the index of the number of hate crime incidents in data."""
+    if not isinstance(data, HateCrimeStore):
+        data = HateCrimeStore.from_records([], data)
+    return CountIndex.from_arrays(data.states, data.state_codes, data.date_ordinals)
+
+
+def covid_index(data: list[CovidData]) -> CountIndex:
+    """Return the index of the number of new covid cases in data."""
+    if not isinstance(data, CovidStore):
+        data = CovidStore.from_records(data)
+    return CountIndex.from_arrays(data.states, data.state_codes, data.date_ordinals, data.cases)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'extra-imports': ['validation', 'dataclasses', 'datetime', 'typing', 'numpy',
+                          'covid_dataclass', 'hate_crime', 'record_store'],
+        'disable': ['R1705']
+    })
+
+    import validation
+
+    validation.check_contracts()
@@ -12,6 +12,18 @@ into workable dataclasses.
 import csv
 from dataclasses import dataclass
 import datetime
+import weakref
+
+import numpy as np
+
+from hate_crime import is_store, split_date_ordinals
+from instrumentation import counted
+
+STATES = {'AL', 'AK', 'AZ', 'AR', 'CA', 'CO', 'CT', 'DE', 'FL', 'GA',
+          'HI', 'ID', 'IL', 'IN', 'IA', 'KS', 'KY', 'LA', 'ME', 'MD', 'MA',
+          'MI', 'MN', 'MS', 'MO', 'MT', 'NE', 'NV', 'NH', 'NJ', 'NM', 'NY',
+          'NC', 'ND', 'OH', 'OK', 'OR', 'PA', 'RI', 'SC', 'SD', 'TN', 'TX',
+          'UT', 'VT', 'VA', 'WA', 'WV', 'WI', 'WY'}
 
 
 @dataclass
@@ -35,6 +47,7 @@ class CovidData:
     cases: int
 
 
+@counted
 def read_csv_file(filename: str) -> list[CovidData]:
     """Process and return the relevant data stored in a csv file with the given filename.
     The return value is a list of the data in the file in the form of the dataclass defined above.
@@ -68,30 +81,90 @@ def process_row(row: list[str]) -> CovidData:
 ###############################################################################
 # Operating on the data
 ###############################################################################
+@counted
+def build_monthly_totals(covid_data: list[CovidData]) -> dict[tuple[str, int, int], int]:
+    """Return a dictionary mapping (state, year, month) tuples to the total number of covid
+    cases reported in that state and month, computed in a single pass over covid_data.
+
+    Months without any reported data are not keys of the dictionary. If covid_data is a
+    record_store.CovidStore, its arrays are summed directly.
+    """
+    if is_store(covid_data):
+        return _store_monthly_totals(covid_data)
+
+    totals = {}
+    for row in covid_data:
+        key = (row.state, row.date.year, row.date.month)
+        totals[key] = totals.get(key, 0) + row.cases
+    return totals
+
+
+def _store_monthly_totals(store: 'CovidStore') -> dict[tuple[str, int, int], int]:
+    """Return the monthly totals of build_monthly_totals for a record_store.CovidStore."""
+    years, months = split_date_ordinals(store.date_ordinals)
+    first_year = int(years.min()) if len(years) > 0 else 0
+    num_years = int(years.max()) - first_year + 1 if len(years) > 0 else 0
+
+    keys = (store.state_codes.astype(np.int64) * num_years + (years - first_year)) * 12 \
+        + (months - 1)
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    sums = np.zeros(len(unique_keys), dtype=np.int64)
+    np.add.at(sums, inverse, store.cases)
+
+    totals = {}
+    for key, total in zip(unique_keys.tolist(), sums.tolist()):
+        code, rest = divmod(key, num_years * 12)
+        totals[(store.states[code], first_year + rest // 12, rest % 12 + 1)] = total
+    return totals
+
+
+# The monthly totals of record stores, which are read-only, kept only as long as their store is
+# alive
+_STORE_TOTALS: 'weakref.WeakKeyDictionary[CovidStore, dict[tuple[str, int, int], int]]' = \
+    weakref.WeakKeyDictionary()
+
+
+@counted
+def monthly_totals(covid_data: list[CovidData]) -> dict[tuple[str, int, int], int]:
+    """Return the monthly totals of build_monthly_totals of covid_data.
+
+    The totals of a record_store.CovidStore are only computed the first time the store is seen,
+    and are kept until the store is garbage collected, so they must not be mutated. A list can
+    be mutated, so its totals are computed again on every call.
+    """
+    if not is_store(covid_data):
+        return build_monthly_totals(covid_data)
+
+    if covid_data not in _STORE_TOTALS:
+        _STORE_TOTALS[covid_data] = build_monthly_totals(covid_data)
+    return _STORE_TOTALS[covid_data]
+
+
+def clear_monthly_totals() -> None:
+    """Forget every result cached by monthly_totals, e.g. after the data sets were reloaded."""
+    _STORE_TOTALS.clear()
+
+
+@counted
 def cases_by_month(covid_data: list[CovidData], month: int, state: str) -> CovidData:
     """Take the dataclasses from the file and combine the cases from for each day to per month.
     The whole month's total covid cases will be represented by the case count on the first day
     of the month.
     """
-    date = datetime.date(2020, month, 1)
-    total_cases = 0
-    for row in covid_data:
-        if row.date.month == month and row.date.year == 2020 and row.state == state:
-            total_cases = total_cases + row.cases
-    return CovidData(date, state, total_cases)
+    total_cases = monthly_totals(covid_data).get((state, 2020, month), 0)
+    return CovidData(datetime.date(2020, month, 1), state, total_cases)
 
 
+@counted
 def processing_data(raw_covid_data: list[CovidData]) -> list[CovidData]:
     """Take the data read from the file and compile it for monthly totals for each state."""
+    totals = monthly_totals(raw_covid_data)
 
     data_by_month = []
-    for state in {'AL', 'AK', 'AZ', 'AR', 'CA', 'CO', 'CT', 'DE', 'FL', 'GA',
-                  'HI', 'ID', 'IL', 'IN', 'IA', 'KS', 'KY', 'LA', 'ME', 'MD', 'MA',
-                  'MI', 'MN', 'MS', 'MO', 'MT', 'NE', 'NV', 'NH', 'NJ', 'NM', 'NY',
-                  'NC', 'ND', 'OH', 'OK', 'OR', 'PA', 'RI', 'SC', 'SD', 'TN', 'TX',
-                  'UT', 'VT', 'VA', 'WA', 'WV', 'WI', 'WY'}:
+    for state in STATES:
         for x in range(1, 13):
-            month_total = cases_by_month(raw_covid_data, x, state)
+            month_total = CovidData(datetime.date(2020, x, 1), state,
+                                    totals.get((state, 2020, x), 0))
             list.append(data_by_month, month_total)
     return data_by_month
 
@@ -101,12 +174,12 @@ if __name__ == '__main__':
 
     python_ta.check_all(config={
         'max-line-length': 100,
-        'extra-imports': ['python_ta.contracts', 'csv', 'dataclasses', 'datetime'],
+        'extra-imports': ['validation', 'csv', 'dataclasses', 'datetime', 'numpy', 'hate_crime',
+                          'instrumentation', 'weakref'],
         'allowed-io': ['read_csv_file'],
         'disable': ['R1705']
     })
 
-    import python_ta.contracts
+    import validation
 
-    python_ta.contracts.DEBUG_CONTRACTS = False
-    python_ta.contracts.check_all_contracts()
+    validation.check_contracts()
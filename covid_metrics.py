@@ -0,0 +1,139 @@
+"""CSC110 Project: The Hidden Correlation Between Covid-19 and Hate Crimes in the United States
+
+Module Description
+==================
+This module contains a columnar loader for any number of the covid metrics of
+all-states-history.csv, such as deathIncrease, hospitalizedCurrently and
+totalTestResultsIncrease, in a single pass over the file.
+
+The metrics are selected by their headers. Rows outside the selected date range are rejected by
+comparing the date at the start of every line as a string, before the line is split into fields,
+so that no object is ever created for them. The fields of every metric are then converted to an
+int64 array at once, along with a mask of the rows where the metric is missing.
+
+The covid data sets of the rest of the project hold a single metric. CovidMetrics.store returns
+any metric as a record_store.CovidStore, which can be passed to every function taking the covid
+data set, e.g. covid_dataclass.monthly_totals or correlation.correlations.
+"""
+import csv
+from dataclasses import dataclass
+import datetime
+from typing import Sequence
+
+import numpy as np
+
+import hate_crime
+from instrumentation import counted
+from record_store import CovidStore
+
+# The metric of the covid data set used by the rest of the project
+DEFAULT_METRIC = 'positiveIncrease'
+
+
+@dataclass
+class CovidMetrics:
+    """Some metrics of every row of the covid data set, stored as parallel arrays.
+
+    Attributes:
+        - states: the abbreviated state names that the state codes refer to
+        - date_ordinals: the date of every row, as returned by datetime.date.toordinal
+        - state_codes: the index in states of the state of every row
+        - values: a mapping from every metric to its value in every row, or 0 where it is missing
+        - missing: a mapping from every metric to a boolean array that is True in every row where
+          it is missing
+
+    Representation Invariants:
+        - self.values.keys() == self.missing.keys()
+        - all(self.values[metric].shape == self.date_ordinals.shape for metric in self.values)
+        - all(self.missing[metric].shape == self.date_ordinals.shape for metric in self.missing)
+        - self.state_codes.shape == self.date_ordinals.shape
+    """
+    states: tuple[str, ...]
+    date_ordinals: np.ndarray
+    state_codes: np.ndarray
+    values: dict[str, np.ndarray]
+    missing: dict[str, np.ndarray]
+
+    def __len__(self) -> int:
+        return len(self.date_ordinals)
+
+    def store(self, metric: str = DEFAULT_METRIC) -> CovidStore:
+        """Return the given metric as a covid store, with missing values counted as 0.
+
+        Preconditions:
+            - metric in self.values
+        """
+        return CovidStore(self.states, self.date_ordinals, self.state_codes, self.values[metric])
+
+
+@counted
+def read_metrics(filename: str = 'all-states-history.csv',
+                 metrics: Sequence[str] = (DEFAULT_METRIC,),
+                 start: datetime.date = datetime.date(2020, 1, 1),
+                 end: datetime.date = datetime.date(2021, 1, 1)) -> CovidMetrics:
+    """Return the given metrics of the rows of the covid csv file with the given filename whose
+    date is from start up to but not including end, in the order of the file.
+
+    read_metrics(filename).store() holds the same rows as covid_dataclass.read_csv_file(filename).
+
+    Preconditions:
+        - filename refers to a valid covid csv file with headers
+        - all metrics are headers of the file
+        - the first column of the file is its date column, in yyyy-mm-dd format, and no field
+          holds a line break
+    """
+    first, last = start.isoformat(), end.isoformat()
+
+    with open(filename, newline='') as file:
+        headers = next(csv.reader([file.readline()]))
+
+        # An ISO date string compares like its date, so rows are rejected before being parsed
+        rows = list(csv.reader(line for line in file if first <= line[:10] < last))
+
+    return metrics_from_rows(headers, rows, metrics)
+
+
+def metrics_from_rows(headers: list[str], rows: list[list[str]],
+                      metrics: Sequence[str] = (DEFAULT_METRIC,)) -> CovidMetrics:
+    """Return the given metrics of the covid csv rows, whose columns have the given headers.
+
+    Preconditions:
+        - 'date' in headers and 'state' in headers
+        - all metrics are in headers
+        - the dates of rows are in yyyy-mm-dd format
+    """
+    date_column, state_column = headers.index('date'), headers.index('state')
+
+    dates = np.array([row[date_column] for row in rows], dtype='datetime64[D]')
+    date_ordinals = (dates.astype(np.int64) + datetime.date(1970, 1, 1).toordinal()) \
+        .astype(np.int32)
+
+    row_states = [row[state_column] for row in rows]
+    states = hate_crime.state_codes_for(set(row_states))
+    state_index = {state: code for code, state in enumerate(states)}
+    state_codes = np.fromiter((state_index[state] for state in row_states), np.uint8, len(rows))
+
+    values, missing = {}, {}
+    for metric in metrics:
+        column = headers.index(metric)
+        fields = np.array([row[column] for row in rows], dtype=str)
+        missing[metric] = fields == ''
+        values[metric] = np.where(missing[metric], '0', fields).astype(np.int64)
+
+    return CovidMetrics(states, date_ordinals, state_codes, values, missing)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'extra-imports': ['validation', 'csv', 'dataclasses', 'datetime', 'typing', 'numpy',
+                          'hate_crime', 'instrumentation', 'record_store'],
+        'allowed-io': ['read_metrics'],
+        'disable': ['R1705']
+    })
+
+    import validation
+
+    validation.check_contracts()
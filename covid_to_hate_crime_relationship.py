@@ -6,11 +6,17 @@ Module Description
 This module contains functions to transform the data about covid cases and hate crime rates in the
 United States into graphs.
 """
-import plotly.graph_objects as go
-from hate_crime import HateCrime, num_instances_by_month
-from covid_dataclass import CovidData, processing_data
+import numpy as np
 
+from figure_export import show_figure
+from hate_crime import HateCrime, CountCube, count_cube, cube_count_by_month
+from covid_dataclass import CovidData, monthly_totals
+from instrumentation import counted, stage
+from series_cache import memoized_series
 
+
+@counted
+@memoized_series
 def get_xy_data(covid_data: list[CovidData], hate_crime_data: list[HateCrime], state: 'str') -> \
         tuple[list[str], list[int], list[int]]:
     """Return a tuple of 3 parallel lists.
@@ -26,17 +32,21 @@ def get_xy_data(covid_data: list[CovidData], hate_crime_data: list[HateCrime], s
                          'NC', 'ND', 'OH', 'OK', 'OR', 'PA', 'RI', 'SC', 'SD', 'TN', 'TX', \
                          'UT', 'VT', 'VA', 'WA', 'WV', 'WI', 'WY'}
     """
+    return aggregate_xy_data(monthly_totals(covid_data), count_cube(hate_crime_data), state)
+
+
+def aggregate_xy_data(covid_totals: dict[tuple[str, int, int], int], hate_crime_counts: CountCube,
+                      state: str) -> tuple[list[str], list[int], list[int]]:
+    """Return the parallel lists of get_xy_data, read from the monthly covid totals returned by
+    covid_dataclass.monthly_totals and a hate crime CountCube.
+    """
     dates = []
     covid_nums = []
     hate_crimes = []
-    covid_data_by_month = processing_data(covid_data)
-    for x in covid_data_by_month:
-        if x.state == state:
-            date = (x.date.month, 2020)
-            list.append(dates, date)
-            list.append(covid_nums, x.cases)
-            list.append(hate_crimes, num_instances_by_month(hate_crime_data, state, 2020,
-                                                            x.date.month))
+    for month in range(1, 13):
+        list.append(dates, (month, 2020))
+        list.append(covid_nums, covid_totals.get((state, 2020, month), 0))
+        list.append(hate_crimes, cube_count_by_month(hate_crime_counts, state, 2020, month))
     return dates, covid_nums, hate_crimes
 
 
@@ -52,15 +62,29 @@ def plot_covid_and_hate_crime(covid_data: list[CovidData], hate_crime_data: list
                          'UT', 'VT', 'VA', 'WA', 'WV', 'WI', 'WY'}
     """
 
-    _, x_data, y_data = get_xy_data(covid_data, hate_crime_data, state)
+    with stage('aggregate'):
+        _, x_data, y_data = get_xy_data(covid_data, hate_crime_data, state)
+
+    with stage('build_figure'):
+        fig = covid_and_hate_crime_figure(state, x_data, y_data)
+
+    with stage('show_figure'):
+        show_figure(fig, f'{state}_covid_and_hate_crime')
+
+
+def covid_and_hate_crime_figure(state: str, x_data: list[int], y_data: list[int]) -> 'go.Figure':
+    """Return the scatter plot figure of plot_covid_and_hate_crime for the covid and hate crime
+    lists returned by get_xy_data.
+    """
+    import plotly.graph_objects as go
 
-    fig = go.Figure(data=go.Scatter(x=x_data, y=y_data, mode='markers'))
+    fig = go.Figure(data=go.Scatter(x=np.asarray(x_data), y=np.asarray(y_data), mode='markers'))
 
     fig.update_layout(title=f'The Correlation Between Covid Rates and Hate Crime in {state}',
                       xaxis_title='Covid Rate',
                       yaxis_title='Hate Crime Rate')
 
-    fig.show()
+    return fig
 
 
 if __name__ == '__main__':
@@ -68,12 +92,12 @@ if __name__ == '__main__':
 
     python_ta.check_all(config={
         'max-line-length': 100,
-        'extra-imports': ['python_ta.contracts', 'plotly.graph_objects', 'hate_crime',
-                          'covid_dataclass'],
+        'extra-imports': ['validation', 'plotly.graph_objects', 'hate_crime',
+                          'covid_dataclass', 'figure_export', 'instrumentation',
+                          'numpy', 'series_cache'],
         'disable': ['R1705']
     })
 
-    import python_ta.contracts
+    import validation
 
-    python_ta.contracts.DEBUG_CONTRACTS = False
-    python_ta.contracts.check_all_contracts()
+    validation.check_contracts()
@@ -4,14 +4,20 @@ Module Description
 ==================
 This module contains the data and functions to read hate_crime.csv file.
 """
-import plotly.graph_objects as go
+import numpy as np
+
+from figure_export import show_figure
 from hate_crime import HateCrime
 import hate_crime as hc
+from instrumentation import counted, stage
+from series_cache import memoized_series
 
 
 ###############################################################################
 # Creating the graphs (month)
 ###############################################################################
+@counted
+@memoized_series
 def get_data_by_month(data: list[HateCrime], state: str) -> dict[tuple[int, int], int]:
     """Return a dictionary mapping (year, month) tuples to the corresponding number of hate crime
     incidences in the given state.
@@ -21,26 +27,41 @@ def get_data_by_month(data: list[HateCrime], state: str) -> dict[tuple[int, int]
                     'NE', 'NV', 'NH', 'NJ', 'NM', 'NY', 'NC', 'ND', 'OH', 'OK', 'OR', 'PA', 'RI',\
                     'SC', 'SD', 'TN', 'TX', 'UT', 'VT', 'VA', 'WA', 'WV', 'WV', 'WI', 'WY'}
     """
+    return cube_data_by_month(hc.count_cube(data), state)
+
+
+def cube_data_by_month(cube: hc.CountCube, state: str) -> dict[tuple[int, int], int]:
+    """Return a dictionary mapping (year, month) tuples to the corresponding number of hate crime
+    incidences in the given state, read from a CountCube.
+    """
     hate_crime_data = {}
 
     for year in range(1999, 2021):
         for month in range(1, 13):
-            hate_crime_data[(year, month)] = hc.num_instances_by_month(data, state, year, month)
+            hate_crime_data[(year, month)] = hc.cube_count_by_month(cube, state, year, month)
 
     return hate_crime_data
 
 
+@memoized_series
 def get_xy_coordinates_month(data: list[HateCrime], state: str) -> tuple[list[str], list[int]]:
     """Return a tuple of two parallel lists. The first list the keys of the incidences as strings
     in the format 'year, month'. The second list contains the corresponding value of incidences.
     Preconditions:
         - incidences != {}
     """
+    return month_coordinates(get_data_by_month(data, state))
+
+
+def month_coordinates(incidences: dict[tuple[int, int], int]) -> tuple[list[str], list[int]]:
+    """Return the parallel lists of get_xy_coordinates_month for the incidences returned by
+    get_data_by_month.
+    Preconditions:
+        - incidences != {}
+    """
     year_and_month = []
     value = []
 
-    incidences = get_data_by_month(data, state)
-
     for row in incidences:
         year = str(row[0])
         month = str(row[1])
@@ -56,21 +77,37 @@ def plot_hate_crime_by_month(data: list[HateCrime], state: str) -> None:
     Preconditions:
         - incidences != {}
     """
-    x_data, y_data = get_xy_coordinates_month(data, state)
+    with stage('aggregate'):
+        x_data, y_data = get_xy_coordinates_month(data, state)
+
+    with stage('build_figure'):
+        fig = hate_crime_by_month_figure(state, x_data, y_data)
+
+    with stage('show_figure'):
+        show_figure(fig, f'{state}_by_month')
+
+
+def hate_crime_by_month_figure(state: str, x_data: list[str], y_data: list[int]) -> 'go.Figure':
+    """Return the time series figure of plot_hate_crime_by_month for the coordinates returned by
+    get_xy_coordinates_month.
+    """
+    import plotly.graph_objects as go
 
     fig = go.Figure()
-    fig.add_trace(go.Scatter(x=x_data, y=y_data, name=state))
+    fig.add_trace(go.Scatter(x=x_data, y=np.asarray(y_data), name=state))
 
     fig.update_layout(title=f'Time Series of {state}',
                       xaxis_title='(Year, Month)',
                       yaxis_title=f'Calculated {state}')
 
-    fig.show()
+    return fig
 
 
 ###############################################################################
 # Creating the graphs (year)
 ###############################################################################
+@counted
+@memoized_series
 def get_data_by_year(data: list[HateCrime], state: str) -> dict[int, int]:
     """"Return a dictionary mapping (year, month) tuples to the corresponding number of hate crime
     incidences in the given state.
@@ -80,25 +117,40 @@ def get_data_by_year(data: list[HateCrime], state: str) -> dict[int, int]:
                     'NE', 'NV', 'NH', 'NJ', 'NM', 'NY', 'NC', 'ND', 'OH', 'OK', 'OR', 'PA', 'RI',\
                     'SC', 'SD', 'TN', 'TX', 'UT', 'VT', 'VA', 'WA', 'WV', 'WV', 'WI', 'WY'}
     """
+    return cube_data_by_year(hc.count_cube(data), state)
+
+
+def cube_data_by_year(cube: hc.CountCube, state: str) -> dict[int, int]:
+    """Return a dictionary mapping years to the corresponding number of hate crime incidences in
+    the given state, read from a CountCube.
+    """
     hate_crime_data = {}
 
     for year in range(1999, 2021):
-        hate_crime_data[year] = hc.num_instances_by_year(data, state, year)
+        hate_crime_data[year] = hc.cube_count_by_year(cube, state, year)
 
     return hate_crime_data
 
 
+@memoized_series
 def get_xy_coordinates_year(data: list[HateCrime], state: str) -> tuple[list[str], list[int]]:
     """Return a tuple of two parallel lists. The first list the keys of the incidences as strings
     in the format 'year, month'. The second list contains the corresponding value of incidences.
     Preconditions:
         - incidences != {}
     """
+    return year_coordinates(get_data_by_year(data, state))
+
+
+def year_coordinates(incidences: dict[int, int]) -> tuple[list[str], list[int]]:
+    """Return the parallel lists of get_xy_coordinates_year for the incidences returned by
+    get_data_by_year.
+    Preconditions:
+        - incidences != {}
+    """
     years = []
     value = []
 
-    incidences = get_data_by_year(data, state)
-
     for row in incidences:
         year = str(row)
         years.append(year)
@@ -113,16 +165,30 @@ def plot_hate_crime_by_year(data: list[HateCrime], state: str) -> None:
     Preconditions:
         - incidences != {}
     """
-    x_data, y_data = get_xy_coordinates_year(data, state)
+    with stage('aggregate'):
+        x_data, y_data = get_xy_coordinates_year(data, state)
+
+    with stage('build_figure'):
+        fig = hate_crime_by_year_figure(state, x_data, y_data)
+
+    with stage('show_figure'):
+        show_figure(fig, f'{state}_by_year')
+
+
+def hate_crime_by_year_figure(state: str, x_data: list[str], y_data: list[int]) -> 'go.Figure':
+    """Return the time series figure of plot_hate_crime_by_year for the coordinates returned by
+    get_xy_coordinates_year.
+    """
+    import plotly.graph_objects as go
 
     fig = go.Figure()
-    fig.add_trace(go.Scatter(x=x_data, y=y_data, name=state))
+    fig.add_trace(go.Scatter(x=x_data, y=np.asarray(y_data), name=state))
 
     fig.update_layout(title=f'Time Series of {state}',
                       xaxis_title='(Year)',
                       yaxis_title=f'Calculated {state}')
 
-    fig.show()
+    return fig
 
 
 if __name__ == '__main__':
@@ -130,12 +196,12 @@ if __name__ == '__main__':
 
     python_ta.check_all(config={
         'max-line-length': 100,
-        'extra-imports': ['python_ta.contracts', 'hate_crime', 'plotly.graph_objects'],
+        'extra-imports': ['validation', 'hate_crime', 'plotly.graph_objects',
+                          'figure_export', 'instrumentation', 'numpy', 'series_cache'],
         'allowed-io': ['read_csv_file', 'to_csv'],
         'disable': ['R1705']
     })
 
-    import python_ta.contracts
+    import validation
 
-    python_ta.contracts.DEBUG_CONTRACTS = False
-    python_ta.contracts.check_all_contracts()
+    validation.check_contracts()
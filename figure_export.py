@@ -0,0 +1,103 @@
+"""CSC110 Project: The Hidden Correlation Between Covid-19 and Hate Crimes in the United States
+
+Module Description
+==================
+This module contains the functions to either show the project's figures in a browser or, in
+headless mode, write them to an output directory.
+
+In headless mode, figures are written as html pages or as plotly json. Every html page written to
+the same directory references a single shared copy of plotly.js instead of embedding its own. The
+figure builders pass the numeric data of their traces as numpy arrays, which plotly stores as
+compact base64 encoded binary arrays instead of lists of decimal numbers.
+
+Headless mode is turned on with set_headless, or by setting the HATE_CRIME_FIGURE_DIR environment
+variable to the output directory (and optionally HATE_CRIME_FIGURE_FORMAT to 'html' or 'json').
+"""
+import os
+from typing import Any, Optional
+
+from atomic_file import replace_file
+
+# The file name of the shared copy of plotly.js in an output directory
+PLOTLY_JS = 'plotly.min.js'
+
+FORMATS = ('html', 'json')
+
+# The output directory and format of headless mode; the output directory is None when figures
+# are shown in a browser instead
+_settings = {'output_dir': os.environ.get('HATE_CRIME_FIGURE_DIR') or None,
+             'format': os.environ.get('HATE_CRIME_FIGURE_FORMAT', 'html')}
+
+
+def set_headless(output_dir: Optional[str], figure_format: str = 'html') -> None:
+    """Write every figure shown from now on to output_dir in the given format, or show them in a
+    browser again if output_dir is None.
+
+    Preconditions:
+        - figure_format in FORMATS
+    """
+    _settings['output_dir'] = output_dir
+    _settings['format'] = figure_format
+
+
+def show_figure(fig: Any, name: str) -> Optional[str]:
+    """Show fig in a browser, or in headless mode, write it to the output directory under the
+    given name and return the path of the written file."""
+    output_dir = _settings['output_dir']
+    if output_dir is None:
+        fig.show()
+        return None
+    else:
+        return export_figure(fig, output_dir, name, _settings['format'])
+
+
+def export_figure(fig: Any, output_dir: str, name: str, figure_format: str = 'html') -> str:
+    """Write fig to output_dir as name.html or name.json and return the path of the written file.
+
+    An html page loads plotly.js from the shared copy in output_dir, which is written first if it
+    does not exist yet.
+
+    Preconditions:
+        - figure_format in FORMATS
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f'{name}.{figure_format}')
+
+    if figure_format == 'html':
+        write_plotly_js(output_dir)
+        html = fig.to_html(include_plotlyjs=PLOTLY_JS, full_html=True)
+        _write_text(path, html)
+    else:
+        _write_text(path, fig.to_json())
+
+    return path
+
+
+def write_plotly_js(output_dir: str) -> str:
+    """Write the shared copy of plotly.js to output_dir, unless it already exists, and return its
+    path."""
+    path = os.path.join(output_dir, PLOTLY_JS)
+    if not os.path.exists(path):
+        from plotly.offline import get_plotlyjs
+        _write_text(path, get_plotlyjs())
+    return path
+
+
+def _write_text(path: str, text: str) -> None:
+    """Write text to path atomically, encoded as utf-8, so that processes writing the same path
+    concurrently never leave it partially written."""
+    replace_file(path, lambda file: file.write(text.encode('utf-8')))
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'extra-imports': ['validation', 'os', 'typing', 'plotly.offline', 'atomic_file'],
+        'disable': ['R1705']
+    })
+
+    import validation
+
+    validation.check_contracts()
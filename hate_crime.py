@@ -7,13 +7,26 @@ This module contains the data and functions to read hate_crime.csv file.
 import csv
 from dataclasses import dataclass
 import datetime
-from typing import List, Tuple
+import io
+from operator import itemgetter
+from typing import Any, Iterable, Iterator, List, Tuple
+import weakref
+import zipfile
+
+import numpy as np
+
+from instrumentation import counted
+import prediction_models
 
 STATES = {'AL', 'AK', 'AZ', 'AR', 'CA', 'CO', 'CT', 'DE', 'FL', 'GA', 'HI', 'ID', 'IL', 'IN',
           'IA', 'KS', 'KY', 'LA', 'MA', 'MD', 'ME', 'MI', 'MN', 'MS', 'MO', 'MT', 'NE', 'NV',
           'NH', 'NJ', 'NM', 'NY', 'NC', 'ND', 'OH', 'OK', 'OR', 'PA', 'RI', 'SC', 'SD', 'TN',
           'TX', 'UT', 'VT', 'VA', 'WA', 'WV', 'WV', 'WI', 'WY'}
 
+# A fixed ordering of STATES, so that a state can be referred to by its index (its state code)
+STATE_CODES = tuple(sorted(STATES))
+STATE_INDEX = {state: code for code, state in enumerate(STATE_CODES)}
+
 
 @dataclass
 class HateCrime:
@@ -42,6 +55,7 @@ class HateCrime:
     date: datetime.date
 
 
+@counted
 def read_csv_file(filename: str) -> Tuple[List[str], List[HateCrime]]:
     """Return the headers and data stored in a csv file with the given filename.
 
@@ -53,16 +67,57 @@ def read_csv_file(filename: str) -> Tuple[List[str], List[HateCrime]]:
         Preconditions:
           - filename refers to a valid csv file with headers
     """
-    with open(filename) as file:
-        reader = csv.reader(file)
-        rows = next(reader)
-        headers = [rows[0], rows[6], rows[12]]
-        data = [process_row(row) for row in reader]
-        for instance in data:
-            if instance.state_abbr == 'NB':
-                instance.state_abbr = 'NE'
+    with open(filename, newline='') as file:
+        return read_records(file)
+
+
+@counted
+def read_zip_file(filename: str = 'hate_crime.zip',
+                  member: str = 'hate_crime.csv') -> Tuple[List[str], List[HateCrime]]:
+    """Return the headers and data stored in the csv file member of the given zip archive.
+
+    The member is decompressed as a stream while it is parsed, so the csv file never has to be
+    extracted to disk. The return value has the same format as read_csv_file.
+
+        Preconditions:
+          - filename refers to a valid zip archive containing member
+          - member refers to a valid csv file with headers
+    """
+    with zipfile.ZipFile(filename) as archive, archive.open(member) as raw:
+        return read_records(io.TextIOWrapper(raw, encoding='utf-8', newline=''))
+
+
+def read_records(file: Iterable[str]) -> Tuple[List[str], List[HateCrime]]:
+    """Return the headers and data of the hate crime csv text in file.
+
+    Only the incident_id, state_abbr and incident_date columns are kept.
+    """
+    reader = csv.reader(file)
+    headers = list(_SELECTED_COLUMNS(next(reader)))
+    return (headers, list(iter_records(reader)))
 
-    return (headers, data)
+
+# The incident_id, state_abbr and incident_date columns of hate_crime.csv
+_SELECTED_COLUMNS = itemgetter(0, 6, 12)
+
+
+def iter_records(rows: Iterable[List[str]]) -> Iterator[HateCrime]:
+    """Yield a HateCrime for each row of hate crime incident data in rows.
+
+    The 'NB' abbreviation used for Nebraska in hate_crime.csv is replaced with 'NE' as each
+    row is parsed.
+
+    Preconditions:
+        - every row has the correct format for the hate crime data set.
+    """
+    select = _SELECTED_COLUMNS
+    from_iso = datetime.date.fromisoformat
+
+    for row in rows:
+        incident_id, state, date = select(row)
+        if state == 'NB':
+            state = 'NE'
+        yield HateCrime(int(incident_id), state, from_iso(date))
 
 
 def process_row(row: List[str]) -> HateCrime:
@@ -71,10 +126,7 @@ def process_row(row: List[str]) -> HateCrime:
     Preconditions:
         - row has the correct format for the hate crime data set.
     """
-    return HateCrime(
-        int(row[0]),
-        row[6],
-        str_to_date(row[12]))
+    return next(iter_records([row]))
 
 
 def str_to_date(date_string: str) -> datetime.date:
@@ -86,15 +138,175 @@ def str_to_date(date_string: str) -> datetime.date:
     >>> str_to_date('2011-01-05')
     datetime.date(2011, 1, 5)
     """
-    date_string_split = str.split(date_string, '-')
-    integer_date = [int(num) for num in date_string_split]
+    return datetime.date.fromisoformat(date_string)
+
+
+###############################################################################
+# Aggregating the data
+###############################################################################
+@dataclass
+class CountCube:
+    """The number of hate crime incidents in every state, year and month, counted in one pass
+    over a list of HateCrime.
+
+    Attributes:
+        - states: the abbreviated state names, in the order of the first axis of counts
+        - state_index: a mapping from each abbreviated state name to its index in states
+        - first_year: the year of the first index of the second axis of counts
+        - counts: counts[code, year - first_year, month - 1] is the number of incidents in
+          states[code] in that year and month
+        - year_counts: year_counts[code, year - first_year] is the number of incidents in
+          states[code] in that year
+
+    Representation invariants:
+        - self.states[:len(STATE_CODES)] == STATE_CODES
+        - self.counts.shape == (len(self.states), self.year_counts.shape[1], 12)
+        - (self.counts.sum(axis=2) == self.year_counts).all()
+
+    The states of STATE_CODES come first, so a state code indexes the cube directly. Any other
+    abbreviations found in the data (e.g. 'DC') follow them.
+    """
+    states: tuple[str, ...]
+    state_index: dict[str, int]
+    first_year: int
+    counts: np.ndarray
+    year_counts: np.ndarray
+
+
+def state_codes_for(abbreviations: Iterable[str]) -> tuple[str, ...]:
+    """Return STATE_CODES followed by the abbreviations that are not in STATES, in sorted order.
+
+    The index of an abbreviated state name in the returned tuple is its state code.
+
+    >>> state_codes_for({'DC', 'AL'})[-1]
+    'DC'
+    """
+    return STATE_CODES + tuple(sorted(set(abbreviations) - STATES))
+
+
+@counted
+def build_count_cube(data: List[HateCrime]) -> CountCube:
+    """Return the CountCube of the hate crime incidents in data.
+
+    If data is a record_store.HateCrimeStore, its arrays are counted directly.
+    """
+    if is_store(data):
+        return count_cube_from_arrays(data.states, data.state_codes, data.date_ordinals)
+
+    states = state_codes_for({row.state_abbr for row in data})
+    state_index = {state: code for code, state in enumerate(states)}
+
+    codes = np.fromiter((state_index[row.state_abbr] for row in data), np.int64, len(data))
+    ordinals = np.fromiter((row.date.toordinal() for row in data), np.int64, len(data))
+
+    return count_cube_from_arrays(states, codes, ordinals)
+
+
+def count_cube_from_arrays(states: tuple[str, ...], codes: np.ndarray,
+                           ordinals: np.ndarray) -> CountCube:
+    """Return the CountCube of the hate crime incidents given as parallel arrays of state codes
+    (indexes into states) and date ordinals.
+
+    Preconditions:
+        - states[:len(STATE_CODES)] == STATE_CODES
+        - codes.shape == ordinals.shape
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    years, months = split_date_ordinals(ordinals)
+
+    # The cube always covers 1999 to 2020, the years studied in this project
+    first_year, last_year = 1999, 2020
+    if len(years) > 0:
+        first_year, last_year = min(first_year, int(years.min())), max(last_year, int(years.max()))
+    num_years = last_year - first_year + 1
 
-    return datetime.date(integer_date[0], integer_date[1], integer_date[2])
+    flat_index = (codes * num_years + (years - first_year)) * 12 + (months - 1)
+    counts = np.bincount(flat_index, minlength=len(states) * num_years * 12)
+    counts = counts.reshape((len(states), num_years, 12))
+
+    state_index = {state: code for code, state in enumerate(states)}
+    return CountCube(states, state_index, first_year, counts, counts.sum(axis=2))
+
+
+# The ordinal of 1970-01-01, the epoch of numpy's datetime64
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+
+def split_date_ordinals(ordinals: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Return the years and months of an array of proleptic Gregorian date ordinals, as returned
+    by datetime.date.toordinal.
+
+    >>> split_date_ordinals(np.array([datetime.date(2020, 3, 14).toordinal()]))
+    (array([2020]), array([3]))
+    """
+    days = (np.asarray(ordinals, dtype=np.int64) - _EPOCH_ORDINAL).astype('datetime64[D]')
+    months_since_epoch = days.astype('datetime64[M]').astype(np.int64)
+    return (months_since_epoch // 12 + 1970, months_since_epoch % 12 + 1)
+
+
+def cube_count_by_month(cube: CountCube, state: str, year: int, month: int) -> int:
+    """Return the number of hate crime instances in cube that occurred in the given state, month
+    and year.
+
+    Preconditions:
+        - 1 <= month <= 12
+    """
+    year_index = year - cube.first_year
+    code = cube.state_index.get(state)
+    if code is None or not 0 <= year_index < cube.counts.shape[1]:
+        return 0
+    return int(cube.counts[code, year_index, month - 1])
+
+
+def cube_count_by_year(cube: CountCube, state: str, year: int) -> int:
+    """Return the number of hate crime instances in cube that occurred in the given state and
+    year."""
+    year_index = year - cube.first_year
+    code = cube.state_index.get(state)
+    if code is None or not 0 <= year_index < cube.year_counts.shape[1]:
+        return 0
+    return int(cube.year_counts[code, year_index])
+
+
+def is_store(data: Any) -> bool:
+    """Return whether data is a record store, such as a record_store.HateCrimeStore or
+    CovidStore, whose arrays can be read directly.
+
+    record_store imports this module, so a store is recognized by its arrays rather than by its
+    type.
+    """
+    return hasattr(data, 'state_codes') and hasattr(data, 'date_ordinals')
+
+
+# The cubes of record stores, which are read-only, kept only as long as their store is alive
+_STORE_CUBES: 'weakref.WeakKeyDictionary[Any, CountCube]' = weakref.WeakKeyDictionary()
+
+
+@counted
+def count_cube(data: List[HateCrime]) -> CountCube:
+    """Return the CountCube of data.
+
+    The cube of a record_store.HateCrimeStore is only built the first time the store is seen, and
+    is kept until the store is garbage collected. A list can be mutated, so its cube is built
+    again on every call.
+    """
+    if not is_store(data):
+        return build_count_cube(data)
+
+    if data not in _STORE_CUBES:
+        _STORE_CUBES[data] = build_count_cube(data)
+    return _STORE_CUBES[data]
+
+
+def clear_count_cubes() -> None:
+    """Forget every cube cached by count_cube, e.g. after the data sets were reloaded."""
+    _STORE_CUBES.clear()
 
 
 ###############################################################################
 # Operating on the data
 ###############################################################################
+@counted
 def num_instances_by_month(data: List[HateCrime], state: str, year: int, month: int) -> int:
     """Return the number of hate crime instances that occurred in the given state, month and year.
 
@@ -106,15 +318,10 @@ def num_instances_by_month(data: List[HateCrime], state: str, year: int, month:
         - 1999 <= year <= 2020
         - 1 <= month <= 12
     """
-    num_of_instances = 0
-
-    for row in data:
-        if row.state_abbr == state and row.date.year == year and row.date.month == month:
-            num_of_instances += 1
-
-    return num_of_instances
+    return cube_count_by_month(count_cube(data), state, year, month)
 
 
+@counted
 def num_instances_by_year(data: List[HateCrime], state: str, year: int) -> int:
     """Return the number of hate crime instances that occurred in the given state and year.
 
@@ -125,31 +332,41 @@ def num_instances_by_year(data: List[HateCrime], state: str, year: int) -> int:
                     'SC', 'SD', 'TN', 'TX', 'UT', 'VT', 'VA', 'WA', 'WV', 'WV', 'WI', 'WY'}
         - 1999 <= year <= 2020
     """
-    num_of_instances = 0
+    return cube_count_by_year(count_cube(data), state, year)
+
 
-    for row in data:
-        if row.state_abbr == state and row.date.year == year:
-            num_of_instances += 1
+@counted
+def predictions(data: List[HateCrime], model: str = 'slope') -> dict[str, int | float]:
+    """Takes hate crime data and returns a dictionary with the predicted number of hate crime
+    incidents in 2020 per state, computed for all states at once by the model of
+    prediction_models.MODELS with the given name.
 
-    return num_of_instances
+    The default model, 'slope', extends the trend found by find_best_slope from 1999 to 2019.
 
+    Preconditions:
+        - model in prediction_models.MODELS
+    """
+    return cube_predictions(count_cube(data), STATE_CODES, model)
 
-def predictions(data: List[HateCrime]) -> dict[str, int]:
-    """Takes hate crime data and returns a dictionary with the predicted number of hate crime
-    incidents in 2020 per state"""
 
-    hate_crime_2020_predictions = {}
+def cube_predictions(cube: CountCube, states: Iterable[str],
+                     model: str = 'slope') -> dict[str, int | float]:
+    """Return a dictionary with the predicted number of hate crime incidents in 2020 of each of
+    the given states, computed from a CountCube as in predictions.
 
-    for state in STATES:
-        slope = find_best_slope(data, state, 1999, 2019)
-        prediction = slope + num_instances_by_year(data, state, 2019)
-        if prediction < 1:
-            prediction = 1
-        hate_crime_2020_predictions[state] = prediction
+    Preconditions:
+        - all(state in STATES for state in states)
+        - model in prediction_models.MODELS
+    """
+    states = list(states)
+    codes = [STATE_INDEX[state] for state in states]
+    window = prediction_models.year_window(cube.year_counts[codes], cube.first_year, 1999, 2019)
+    predicted = prediction_models.predict(window, model)
 
-    return hate_crime_2020_predictions
+    return {state: predicted[i].item() for i, state in enumerate(states)}
 
 
+@counted
 def find_best_slope(data: List[HateCrime], state: str, start_year: int, end_year: int) -> int:
     """Finds best slope of the hate crime trend to use for predicting the number of incidents"""
     start_incidents = num_instances_by_year(data, state, start_year)
@@ -187,26 +404,40 @@ def instances_in_2020(data: List[HateCrime]) -> dict[str, int]:
     return hate_crime_instances_2020
 
 
+@counted
 def calculate_percent_difference(data: List[HateCrime]) -> dict[str, list[float, int, int]]:
     """Return a dictionary mapping the abbreviated state name with the corresponding percent
     difference between the real and predicted hate crime instances in 2020.
 
+    """
+    return cube_percent_difference(count_cube(data), STATES)
+
+
+def cube_percent_difference(cube: CountCube,
+                            states: Iterable[str]) -> dict[str, list[float, int, int]]:
+    """Return the percent difference of calculate_percent_difference for each of the given states,
+    computed from a CountCube.
+
+    Preconditions:
+        - all(state in STATES for state in states)
     """
     percent_difference = {}
 
-    predicted = predictions(data)
-    actual = instances_in_2020(data)
+    predicted = cube_predictions(cube, states)
 
-    for state in STATES:
-        percent_difference[state] = [(actual[state] - predicted[state]) / predicted[state] * 100,
-                                     actual[state], predicted[state]]
+    for state in predicted:
+        actual = cube_count_by_year(cube, state, 2020)
+        percent_difference[state] = [(actual - predicted[state]) / predicted[state] * 100,
+                                     actual, predicted[state]]
 
     return percent_difference
 
 
-def to_csv(percent_diff: dict[str, list[float, int, int]]) -> None:
+@counted
+def to_csv(percent_diff: dict[str, list[float, int, int]],
+           filename: str = 'percent_diff.csv') -> None:
     """Converts dictionary into csv file"""
-    with open('percent_diff.csv', 'w', newline='') as pd_file:
+    with open(filename, 'w', newline='') as pd_file:
 
         writer = csv.writer(pd_file)
         writer.writerow(['State', 'Percent Difference', 'Actual', 'Predicted'])
@@ -215,18 +446,31 @@ def to_csv(percent_diff: dict[str, list[float, int, int]]) -> None:
             writer.writerow([key, value[0], value[1], value[2]])
 
 
+def read_percent_difference(filename: str = 'percent_diff.csv') \
+        -> dict[str, list[float, int, int]]:
+    """Return the percent differences written to the csv file with the given filename by to_csv.
+
+    Preconditions:
+        - filename refers to a csv file written by to_csv
+    """
+    with open(filename, newline='') as pd_file:
+        reader = csv.reader(pd_file)
+        next(reader)
+        return {row[0]: [float(row[1]), int(row[2]), int(row[3])] for row in reader}
+
+
 if __name__ == '__main__':
     import python_ta
 
     python_ta.check_all(config={
         'max-line-length': 100,
-        'extra-imports': ['python_ta.contracts', 'csv', 'dataclasses', 'datetime',
-                          'typing'],
-        'allowed-io': ['read_csv_file', 'to_csv'],
+        'extra-imports': ['validation', 'csv', 'dataclasses', 'datetime', 'io',
+                          'instrumentation', 'numpy', 'operator', 'prediction_models',
+                          'typing', 'weakref', 'zipfile'],
+        'allowed-io': ['read_csv_file', 'read_zip_file', 'to_csv', 'read_percent_difference'],
         'disable': ['R1705']
     })
 
-    import python_ta.contracts
+    import validation
 
-    python_ta.contracts.DEBUG_CONTRACTS = False
-    python_ta.contracts.check_all_contracts()
+    validation.check_contracts()
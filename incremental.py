@@ -0,0 +1,332 @@
+"""CSC110 Project: The Hidden Correlation Between Covid-19 and Hate Crimes in the United States
+
+Module Description
+==================
+This module contains functions to keep the aggregates of the hate crime and covid data sets, and
+the percent differences computed from them, up to date as new rows arrive, without reprocessing
+the rows that were already ingested.
+
+An IngestionState remembers how far each source csv file has been read (a byte offset) and a
+watermark of the data ingested so far: the highest incident_id for the hate crime data set and
+the latest date for the covid data set. Rows appended to a source file are read from the offset
+onwards, and separate delta files can be ingested as well. A source file may also be a zip
+archive, such as hate_crime.zip, in which case the offset is a position in its csv member; the
+member is decompressed up to the offset again on every update.
+
+A hate crime row is new if its incident_id has not been ingested yet, whatever its date, so
+incidents reported late for past months are counted in their own month and rows delivered twice
+are only counted once. The incident_ids in hate_crime.csv are not in increasing order, so the
+ingested ids are kept as well as the watermark. A covid row for a state and day that was already
+ingested replaces the earlier row, so late corrections of past days are applied instead of double
+counted. Only the percent differences of the states that changed are
+recomputed.
+"""
+from contextlib import contextmanager
+import csv
+from dataclasses import dataclass
+import datetime
+import hashlib
+import io
+import json
+import os
+from typing import BinaryIO, Iterable, Iterator, Optional
+import zipfile
+
+import numpy as np
+
+import covid_dataclass
+from covid_dataclass import CovidData
+import hate_crime
+from hate_crime import HateCrime, CountCube
+
+# The number of bytes before the read offset of a source file that are hashed, to detect that the
+# file was rewritten rather than appended to
+_CHECK_BYTES = 4096
+
+
+@dataclass
+class IngestionState:
+    """The aggregates of the hate crime and covid data sets ingested so far, and how far their
+    source files have been read.
+
+    Attributes:
+        - hate_crime_source: the hate crime csv file, or zip archive containing one, that is read
+          incrementally
+        - hate_crime_offset: the byte offset in hate_crime_source (or in its csv member) just after
+          the last row read
+        - hate_crime_check: the sha256 hash of the bytes just before hate_crime_offset
+        - hate_crime_watermark: the highest incident_id ingested
+        - incident_ids: the sorted incident_ids of all hate crime incidents ingested
+        - cube: the counts of all hate crime incidents ingested
+        - percent_difference: the percent differences of every state, as returned by
+          hate_crime.calculate_percent_difference, for the incidents ingested
+        - covid_source: the covid csv file that is read incrementally
+        - covid_offset: the byte offset in covid_source just after the last row read
+        - covid_check: the sha256 hash of the bytes just before covid_offset
+        - covid_watermark: the ordinal of the latest date of the covid rows ingested
+        - covid_cases: a mapping from (state, date ordinal) to the cases of the covid row ingested
+          for that state and day
+        - covid_totals: the monthly covid totals, as returned by covid_dataclass.monthly_totals,
+          of covid_cases
+
+    Representation invariants:
+        - self.hate_crime_offset >= 0
+        - self.covid_offset >= 0
+    """
+    hate_crime_source: str
+    hate_crime_offset: int
+    hate_crime_check: str
+    hate_crime_watermark: int
+    incident_ids: np.ndarray
+    cube: CountCube
+    percent_difference: dict[str, list[float, int, int]]
+    covid_source: str
+    covid_offset: int
+    covid_check: str
+    covid_watermark: int
+    covid_cases: dict[tuple[str, int], int]
+    covid_totals: dict[tuple[str, int, int], int]
+
+
+def initialize(hate_crime_file: str = 'hate_crime.zip',
+               covid_file: str = 'all-states-history.csv') -> IngestionState:
+    """Return the IngestionState of reading the given hate crime and covid csv files in full.
+
+    Preconditions:
+        - hate_crime_file refers to a valid hate crime csv file with headers, or a zip archive
+          containing one
+        - covid_file refers to a valid covid csv file with headers
+    """
+    state = IngestionState(hate_crime_file, 0, '', -1, np.array([], dtype=np.int64),
+                           hate_crime.build_count_cube([]), {}, covid_file, 0, '', 0, {}, {})
+    state.percent_difference = hate_crime.cube_percent_difference(state.cube, hate_crime.STATES)
+    update(state)
+    return state
+
+
+def update(state: IngestionState, hate_crime_file: Optional[str] = None,
+           covid_file: Optional[str] = None) -> set[str]:
+    """Ingest the new rows of the given csv files into state and return the set of states whose
+    data changed.
+
+    Without a file argument, the rows appended to the source file of that data set since it was
+    last read are ingested. A file argument other than the source file is ingested as a delta
+    file in full, but only its rows that were not ingested yet are counted. If a source
+    file was rewritten instead of appended to, it is read in full again; rows that were already
+    ingested are then skipped or replaced as usual.
+    """
+    changed = set()
+
+    hate_crime_file = hate_crime_file or state.hate_crime_source
+    lines = _new_lines(state, 'hate_crime', hate_crime_file)
+    changed |= ingest_hate_crimes(state, hate_crime.iter_records(csv.reader(lines)))
+
+    covid_file = covid_file or state.covid_source
+    lines = _new_lines(state, 'covid', covid_file)
+    changed |= ingest_covid(state, (covid_dataclass.process_row(row)
+                                    for row in csv.reader(lines)))
+
+    return changed
+
+
+def ingest_hate_crimes(state: IngestionState, records: Iterable[HateCrime]) -> set[str]:
+    """Add the records whose incident_id was not ingested yet to the aggregates of state, update
+    the percent differences of the states they belong to, and return the set of those states.
+    """
+    records = list(records)
+    ids = np.fromiter((record.incident_id for record in records), np.int64, len(records))
+
+    # Only the first of several records with the same incident_id is new
+    _, first_indexes = np.unique(ids, return_index=True)
+    is_new = np.zeros(len(records), dtype=bool)
+    is_new[first_indexes] = True
+    is_new &= (ids > state.hate_crime_watermark) | ~np.isin(ids, state.incident_ids)
+
+    new_records = [records[i] for i in np.flatnonzero(is_new)]
+    if new_records == []:
+        return set()
+
+    state.incident_ids = np.union1d(state.incident_ids, ids[is_new])
+    state.hate_crime_watermark = int(state.incident_ids[-1])
+    changed = {record.state_abbr for record in new_records}
+
+    cube = _covering_cube(state.cube, changed,
+                          {record.date.year for record in new_records})
+    for record in new_records:
+        code = cube.state_index[record.state_abbr]
+        cube.counts[code, record.date.year - cube.first_year, record.date.month - 1] += 1
+        cube.year_counts[code, record.date.year - cube.first_year] += 1
+    state.cube = cube
+
+    state.percent_difference.update(
+        hate_crime.cube_percent_difference(cube, changed & hate_crime.STATES))
+
+    return changed
+
+
+def ingest_covid(state: IngestionState, records: Iterable[CovidData]) -> set[str]:
+    """Add the 2020 records to the covid aggregates of state, replacing any record already
+    ingested for the same state and day, and return the set of states they belong to.
+    """
+    changed = set()
+
+    for record in records:
+        if record.date.year != 2020:
+            continue
+
+        ordinal = record.date.toordinal()
+        key = (record.state, 2020, record.date.month)
+        previous = state.covid_cases.get((record.state, ordinal), 0)
+
+        state.covid_cases[(record.state, ordinal)] = record.cases
+        state.covid_totals[key] = state.covid_totals.get(key, 0) - previous + record.cases
+        state.covid_watermark = max(state.covid_watermark, ordinal)
+        changed.add(record.state)
+
+    return changed
+
+
+def covid_data(state: IngestionState) -> list[CovidData]:
+    """Return the covid records ingested into state, so that they can be used with the functions
+    that take the covid data set."""
+    return [CovidData(datetime.date.fromordinal(ordinal), abbreviation, cases)
+            for (abbreviation, ordinal), cases in state.covid_cases.items()]
+
+
+###############################################################################
+# Reading new rows
+###############################################################################
+def _new_lines(state: IngestionState, kind: str, filename: str) -> Iterator[str]:
+    """Return the complete lines of filename that are new to state, without the header, and move
+    the offset of the source file of the given kind past them.
+
+    kind is 'hate_crime' or 'covid'. A trailing line without a line break may still be being
+    written, so it is left to be read by a later update. If filename is a zip archive, the lines
+    of its first csv member are read.
+    """
+    source = getattr(state, kind + '_source')
+    offset = getattr(state, kind + '_offset')
+    check = getattr(state, kind + '_check')
+
+    with _open_source(filename) as (file, size):
+        if filename != source:
+            start = 0
+        elif offset <= size and _check_bytes(file, offset) == check:
+            start = offset
+        else:
+            start = 0  # The source file was rewritten
+
+        file.seek(start)
+        text = file.read()
+        complete = text[:text.rfind(b'\n') + 1]
+
+        if filename == source:
+            setattr(state, kind + '_offset', start + len(complete))
+            setattr(state, kind + '_check', _check_bytes(file, start + len(complete)))
+
+    lines = io.StringIO(complete.decode('utf-8'), newline='')
+    if start == 0:
+        next(lines, None)
+    return lines
+
+
+@contextmanager
+def _open_source(filename: str) -> Iterator[tuple[BinaryIO, int]]:
+    """Open filename for reading as bytes, or the first csv member of filename if it is a zip
+    archive, and yield the file along with its size in bytes."""
+    if not filename.endswith('.zip'):
+        with open(filename, 'rb') as file:
+            yield file, os.fstat(file.fileno()).st_size
+        return
+
+    with zipfile.ZipFile(filename) as archive:
+        member = next(info for info in archive.infolist() if info.filename.endswith('.csv'))
+        with archive.open(member) as file:
+            yield file, member.file_size
+
+
+def _check_bytes(file: BinaryIO, offset: int) -> str:
+    """Return the sha256 hash of the bytes of file just before offset."""
+    start = max(0, offset - _CHECK_BYTES)
+    file.seek(start)
+    return hashlib.sha256(file.read(offset - start)).hexdigest()
+
+
+def _covering_cube(cube: CountCube, states: set[str], years: set[int]) -> CountCube:
+    """Return cube if it has counts for all the given states and years, or otherwise a copy of
+    cube extended with zero counts for them."""
+    if states <= cube.state_index.keys() and \
+            all(0 <= year - cube.first_year < cube.year_counts.shape[1] for year in years):
+        return cube
+
+    all_states = hate_crime.state_codes_for(set(cube.states) | states)
+    first_year = min(cube.first_year, *years)
+    last_year = max(cube.first_year + cube.year_counts.shape[1] - 1, *years)
+
+    counts = np.zeros((len(all_states), last_year - first_year + 1, 12), dtype=np.int64)
+    codes = [all_states.index(abbreviation) for abbreviation in cube.states]
+    start = cube.first_year - first_year
+    counts[codes, start:start + cube.counts.shape[1]] = cube.counts
+
+    state_index = {abbreviation: code for code, abbreviation in enumerate(all_states)}
+    return CountCube(all_states, state_index, first_year, counts, counts.sum(axis=2))
+
+
+###############################################################################
+# Saving the state between runs
+###############################################################################
+def save_state(state: IngestionState, filename: str) -> None:
+    """Save state to a file with the given filename, which should end in .npz."""
+    metadata = {name: getattr(state, name) for name in (
+        'hate_crime_source', 'hate_crime_offset', 'hate_crime_check', 'hate_crime_watermark',
+        'covid_source', 'covid_offset', 'covid_check', 'covid_watermark')}
+    metadata['states'] = list(state.cube.states)
+    metadata['first_year'] = state.cube.first_year
+
+    covid_keys = list(state.covid_cases)
+    np.savez(filename, metadata=np.array(json.dumps(metadata)), counts=state.cube.counts,
+             incident_ids=state.incident_ids,
+             covid_states=np.array([key[0] for key in covid_keys], dtype=str),
+             covid_ordinals=np.array([key[1] for key in covid_keys], dtype=np.int64),
+             covid_cases=np.array(list(state.covid_cases.values()), dtype=np.int64))
+
+
+def load_state(filename: str) -> IngestionState:
+    """Return the state saved to the file with the given filename by save_state."""
+    with np.load(filename) as arrays:
+        metadata = json.loads(arrays['metadata'].item())
+        counts = arrays['counts']
+        incident_ids = arrays['incident_ids']
+        covid_cases = dict(zip(zip(arrays['covid_states'].tolist(),
+                                   arrays['covid_ordinals'].tolist()),
+                               arrays['covid_cases'].tolist()))
+
+    states = tuple(metadata.pop('states'))
+    state_index = {abbreviation: code for code, abbreviation in enumerate(states)}
+    cube = CountCube(states, state_index, metadata.pop('first_year'), counts, counts.sum(axis=2))
+
+    state = IngestionState(cube=cube, incident_ids=incident_ids, covid_cases=covid_cases,
+                           percent_difference={}, covid_totals={}, **metadata)
+    state.percent_difference = hate_crime.cube_percent_difference(cube, hate_crime.STATES)
+    for (abbreviation, ordinal), cases in covid_cases.items():
+        key = (abbreviation, 2020, datetime.date.fromordinal(ordinal).month)
+        state.covid_totals[key] = state.covid_totals.get(key, 0) + cases
+
+    return state
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'extra-imports': ['validation', 'contextlib', 'csv', 'dataclasses', 'datetime',
+                          'hashlib', 'io', 'json', 'os', 'typing', 'zipfile', 'numpy',
+                          'covid_dataclass', 'hate_crime'],
+        'allowed-io': ['_new_lines', '_open_source'],
+        'disable': ['R1705']
+    })
+
+    import validation
+
+    validation.check_contracts()
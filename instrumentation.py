@@ -0,0 +1,183 @@
+"""CSC110 Project: The Hidden Correlation Between Covid-19 and Hate Crimes in the United States
+
+Module Description
+==================
+This module contains the instrumentation used to find where the time and memory of a run of the
+project go, without attaching a profiler.
+
+Instrumentation is turned on by setting the HATE_CRIME_PROFILE environment variable to the path of
+the report to write when the process exits, or by running this module as a script, e.g.
+python instrumentation.py --output profile.json run graphs
+
+While it is on:
+    - stage(name) times a named stage of a run, such as parsing or writing percent_diff.csv, and
+      records the peak memory traced while it ran. Stages can be nested.
+    - functions decorated with counted record how many times they were called and their total
+      time.
+
+The report is json, with every stage, every counted function and the stages as collapsed stacks
+(one 'outer;inner microseconds' line per stage, with its self time), which flamegraph tools read
+directly. A report path ending in .folded gets only the collapsed stacks.
+
+While it is off, stage does nothing and counted returns functions unchanged, so instrumentation
+costs nothing.
+"""
+import argparse
+import atexit
+from contextlib import contextmanager
+import functools
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Iterator, Optional
+
+# Whether instrumentation is on; decided when this module is first imported
+ENABLED = bool(os.environ.get('HATE_CRIME_PROFILE'))
+
+# The totals of every stage, keyed by the names of the stages enclosing it and its own name:
+# [number of runs, total seconds, peak traced bytes]
+_stages: dict[tuple[str, ...], list] = {}
+
+# The totals of every counted function, keyed by qualified name: [number of calls, total seconds]
+_functions: dict[str, list] = {}
+
+# The stages currently running, innermost last: [name, start time, peak traced bytes so far]
+_running: list[list] = []
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time the code run inside this context manager as a stage with the given name, nested
+    inside the stages that are running."""
+    if not ENABLED:
+        yield
+        return
+
+    if _running:
+        _running[-1][2] = max(_running[-1][2], tracemalloc.get_traced_memory()[1])
+    tracemalloc.reset_peak()
+    _running.append([name, time.perf_counter(), 0])
+
+    try:
+        yield
+    finally:
+        path = tuple(frame[0] for frame in _running)
+        _, start, peak = _running.pop()
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+
+        totals = _stages.setdefault(path, [0, 0.0, 0])
+        totals[0] += 1
+        totals[1] += time.perf_counter() - start
+        totals[2] = max(totals[2], peak)
+
+        if _running:
+            _running[-1][2] = max(_running[-1][2], peak)
+
+
+def counted(function: Callable) -> Callable:
+    """Return function wrapped so that its calls and total time are recorded, or function itself
+    if instrumentation is off."""
+    if not ENABLED:
+        return function
+
+    name = f'{function.__module__}.{function.__qualname__}'
+    totals = _functions.setdefault(name, [0, 0.0])
+
+    @functools.wraps(function)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        totals[0] += 1
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            totals[1] += time.perf_counter() - start
+
+    return wrapper
+
+
+def report() -> dict[str, Any]:
+    """Return the stages and counted functions recorded so far as a json-serializable
+    dictionary."""
+    children_seconds = {}
+    for path, totals in _stages.items():
+        if len(path) > 1:
+            children_seconds[path[:-1]] = children_seconds.get(path[:-1], 0.0) + totals[1]
+
+    stages = []
+    collapsed = []
+    for path, (runs, seconds, peak) in _stages.items():
+        self_seconds = max(seconds - children_seconds.get(path, 0.0), 0.0)
+        stages.append({'stage': '/'.join(path), 'runs': runs, 'seconds': seconds,
+                       'self_seconds': self_seconds, 'peak_traced_bytes': peak})
+        collapsed.append(f'{";".join(path)} {round(self_seconds * 1e6)}')
+
+    try:
+        import resource
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except ImportError:
+        max_rss = None
+
+    return {'stages': stages,
+            'functions': {name: {'calls': calls, 'seconds': seconds}
+                          for name, (calls, seconds) in sorted(_functions.items())},
+            'collapsed': collapsed,
+            'max_rss_bytes': max_rss}
+
+
+def write_report(path: str) -> None:
+    """Write the report of the stages and counted functions recorded so far to path, as json, or
+    as collapsed stacks only if path ends in .folded."""
+    result = report()
+    with open(path, 'w') as file:
+        if path.endswith('.folded'):
+            file.write('\n'.join(result['collapsed']) + '\n')
+        else:
+            json.dump(result, file, indent=2)
+
+
+if ENABLED:
+    tracemalloc.start()
+    atexit.register(lambda: write_report(os.environ['HATE_CRIME_PROFILE']))
+
+
+def main(arguments: Optional[list[str]] = None) -> None:
+    """Run the entry points of main given as command line arguments with instrumentation on, and
+    write the report."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('entry_points', nargs='+',
+                        choices=['run', 'graphs', 'report', 'write_percent_difference'],
+                        help='functions of the main module to run')
+    parser.add_argument('--output', default='profile.json',
+                        help='report to write (json, or collapsed stacks if it ends in .folded)')
+    options = parser.parse_args(arguments)
+
+    # The project modules import this module as instrumentation, not __main__, so turning it on
+    # has to go through the environment before they are imported
+    os.environ['HATE_CRIME_PROFILE'] = options.output
+    if 'instrumentation' in sys.modules and not sys.modules['instrumentation'].ENABLED:
+        sys.exit('instrumentation was imported before it could be turned on')
+
+    import main as project
+    for entry_point in options.entry_points:
+        with sys.modules['instrumentation'].stage(entry_point):
+            getattr(project, entry_point)()
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'extra-imports': ['validation', 'argparse', 'atexit', 'contextlib', 'functools', 'json',
+                          'os', 'resource', 'sys', 'time', 'tracemalloc', 'typing', 'main'],
+        'allowed-io': ['write_report'],
+        'disable': ['R1705']
+    })
+
+    import validation
+
+    validation.check_contracts()
+
+    main()
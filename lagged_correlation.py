@@ -0,0 +1,211 @@
+"""CSC110 Project: The Hidden Correlation Between Covid-19 and Hate Crimes in the United States
+
+Module Description
+==================
+This module contains functions to compute the cross-correlation between the daily covid cases
+and the daily hate crime incidents of every state at a range of lags.
+
+The daily series of all states are built at once as states x days matrices, optionally summed
+into weeks, and the cross-correlations of all states at all lags are computed together with the
+fast Fourier transform instead of one sum per state and lag.
+
+A positive lag of k days correlates the covid cases of every day with the hate crime incidents
+k days later.
+
+Run this module as a script, e.g. python lagged_correlation.py --max-lag 90 --weekly
+"""
+import argparse
+import csv
+import datetime
+from typing import Iterable, Optional
+
+import numpy as np
+
+from covid_dataclass import CovidData
+import hate_crime
+from hate_crime import HateCrime
+from record_store import CovidStore, HateCrimeStore
+
+
+def daily_counts(states: tuple[str, ...], state_codes: np.ndarray, date_ordinals: np.ndarray,
+                 weights: Optional[np.ndarray], selected: Iterable[str], start: datetime.date,
+                 end: datetime.date) -> np.ndarray:
+    """Return a selected states x days matrix of the sum of the weights of the rows of every
+    selected state on every day from start up to but not including end.
+
+    The rows are given as parallel arrays of state codes into states and date ordinals, as in a
+    record store. Every row counts once if weights is None.
+    """
+    selected = list(selected)
+    num_days = end.toordinal() - start.toordinal()
+
+    # Rows of the states that are not selected are counted in a discarded extra row
+    rows = np.full(len(states) + 1, len(selected))
+    for row, state in enumerate(selected):
+        if state in states:
+            rows[states.index(state)] = row
+
+    days = date_ordinals.astype(np.int64) - start.toordinal()
+    in_range = (days >= 0) & (days < num_days)
+    keys = rows[state_codes[in_range]] * num_days + days[in_range]
+    counts = np.bincount(keys, None if weights is None else weights[in_range],
+                         (len(selected) + 1) * num_days)
+
+    return counts.reshape((len(selected) + 1, num_days))[:-1]
+
+
+def daily_series(covid_data: list[CovidData], hate_crime_data: list[HateCrime],
+                 states: Iterable[str] = hate_crime.STATE_CODES,
+                 start: datetime.date = datetime.date(2020, 1, 1),
+                 end: datetime.date = datetime.date(2021, 1, 1)) -> tuple[np.ndarray, np.ndarray]:
+    """Return a states x days matrix of the new covid cases and a states x days matrix of the
+    hate crime incidents of every given state on every day from start up to but not including
+    end.
+
+    Days without any covid data count as 0 cases.
+
+    Preconditions:
+        - start < end
+    """
+    if not isinstance(covid_data, CovidStore):
+        covid_data = CovidStore.from_records(covid_data)
+    if not isinstance(hate_crime_data, HateCrimeStore):
+        hate_crime_data = HateCrimeStore.from_records([], hate_crime_data)
+
+    states = list(states)
+    covid = daily_counts(covid_data.states, covid_data.state_codes, covid_data.date_ordinals,
+                         covid_data.cases, states, start, end)
+    hate_crimes = daily_counts(hate_crime_data.states, hate_crime_data.state_codes,
+                               hate_crime_data.date_ordinals, None, states, start, end)
+    return covid, hate_crimes
+
+
+def weekly(series: np.ndarray) -> np.ndarray:
+    """Return the sums of every complete week of the daily series along the last axis of series.
+    Trailing days that do not make up a whole week are left out.
+
+    >>> weekly(np.arange(15)).tolist()
+    [21, 70]
+    """
+    num_weeks = series.shape[-1] // 7
+    return series[..., :num_weeks * 7].reshape((*series.shape[:-1], num_weeks, 7)).sum(axis=-1)
+
+
+def cross_correlation(x: np.ndarray, y: np.ndarray, max_lag: int) -> np.ndarray:
+    """Return the cross-correlation between x and y along their last axis at every lag from
+    -max_lag to max_lag, as an array with a last axis of length 2 * max_lag + 1.
+
+    The cross-correlation at lag k is the sum of the products of the deviations of x from its
+    mean and those of y from its mean k steps later, divided by the square root of the product
+    of their sums of squares, so that the cross-correlation at lag 0 is the Pearson correlation.
+    It is nan for a series without any variance.
+
+    >>> cross_correlation(np.array([0, 1, 0, 0, 0]), np.array([0, 0, 1, 0, 0]), 1).round(3)
+    array([-0.3 , -0.25,  0.95])
+
+    Preconditions:
+        - x.shape == y.shape
+        - 0 <= max_lag < x.shape[-1]
+    """
+    num_steps = x.shape[-1]
+    x = x - x.mean(axis=-1, keepdims=True)
+    y = y - y.mean(axis=-1, keepdims=True)
+
+    # Zero padding to at least 2 * num_steps - 1 keeps the circular correlation from wrapping
+    size = 1 << (2 * num_steps - 1).bit_length()
+    products = np.fft.irfft(np.conj(np.fft.rfft(x, size)) * np.fft.rfft(y, size), size)
+    lagged = np.concatenate((products[..., size - max_lag:], products[..., :max_lag + 1]),
+                            axis=-1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scale = np.sqrt((x * x).sum(axis=-1) * (y * y).sum(axis=-1))
+        return lagged / scale[..., None]
+
+
+def lagged_correlations(covid_data: list[CovidData], hate_crime_data: list[HateCrime],
+                        states: Iterable[str] = hate_crime.STATE_CODES, max_lag: int = 90,
+                        resample_weekly: bool = False) -> tuple[list[int], dict[str, list[float]]]:
+    """Return the lags in days and a dictionary mapping every given state to the
+    cross-correlation between its daily covid cases and hate crime incidents in 2020 at each of
+    those lags, from -max_lag to max_lag days.
+
+    If resample_weekly is True, the series are summed into weeks first, and the lags are the
+    multiples of 7 days from -max_lag to max_lag.
+
+    Preconditions:
+        - 0 <= max_lag < 366
+    """
+    states = list(states)
+    covid, hate_crimes = daily_series(covid_data, hate_crime_data, states)
+
+    step = 1
+    if resample_weekly:
+        covid, hate_crimes, step = weekly(covid), weekly(hate_crimes), 7
+
+    correlations = cross_correlation(covid, hate_crimes, max_lag // step)
+    lags = list(range(-(max_lag // step) * step, max_lag + 1, step))
+
+    return lags, {state: correlations[row].tolist() for row, state in enumerate(states)}
+
+
+def strongest_lags(lags: list[int], correlations: dict[str, list[float]]) -> dict[str, int]:
+    """Return a dictionary mapping every state of correlations to the lag at which its
+    cross-correlation is furthest from 0, ignoring states without any variance.
+
+    >>> strongest_lags([-1, 0, 1], {'AL': [0.1, -0.5, 0.3]})
+    {'AL': 0}
+    """
+    strongest = {}
+    for state, values in correlations.items():
+        values = np.abs(np.array(values))
+        if not np.isnan(values).all():
+            strongest[state] = lags[int(np.nanargmax(values))]
+    return strongest
+
+
+def to_csv(lags: list[int], correlations: dict[str, list[float]],
+           filename: str = 'lagged_correlations.csv') -> None:
+    """Write the lags and cross-correlations returned by lagged_correlations to a csv file with
+    the given filename, with one row per state and one column per lag."""
+    with open(filename, 'w', newline='') as correlation_file:
+
+        writer = csv.writer(correlation_file)
+        writer.writerow(['State', *lags])
+        for state, values in correlations.items():
+            writer.writerow([state, *values])
+
+
+def main(arguments: Optional[list[str]] = None) -> None:
+    """Write the lagged cross-correlations of the states given as command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('states', nargs='*', default=hate_crime.STATE_CODES,
+                        help='abbreviated names of the states to analyze (default: all)')
+    parser.add_argument('--max-lag', type=int, default=90, help='largest lag, in days')
+    parser.add_argument('--weekly', action='store_true', help='sum the daily series into weeks')
+    parser.add_argument('--output', default='lagged_correlations.csv', help='csv file to write')
+    options = parser.parse_args(arguments)
+
+    import main as project
+    project.load_datasets()
+    lags, correlations = lagged_correlations(project.get_covid_data(),
+                                             project.get_hate_crime_data(), options.states,
+                                             options.max_lag, options.weekly)
+    to_csv(lags, correlations, options.output)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'extra-imports': ['validation', 'argparse', 'csv', 'datetime', 'typing', 'numpy',
+                          'covid_dataclass', 'hate_crime', 'record_store', 'main'],
+        'allowed-io': ['to_csv'],
+        'disable': ['R1705']
+    })
+
+    import validation
+
+    validation.check_contracts()
+
+    main()
@@ -6,23 +6,143 @@ Module Description
 ==================
 This module contains the important key functions and dataclasses of the project.
 """
-from hate_crime import read_csv_file, calculate_percent_difference, to_csv
-from covid_dataclass import read_csv_file as read_csv_file_covid
-from map import make_map
-from creating_graphs import plot_hate_crime_by_year, plot_hate_crime_by_month
-from covid_to_hate_crime_relationship import plot_covid_and_hate_crime
+from typing import Any, Optional
 
-hate_crime_data = read_csv_file('hate_crime.csv')[1]
-covid_data = read_csv_file_covid('all-states-history.csv')
+from covid_dataclass import CovidData, clear_monthly_totals
+from figure_export import show_figure
+from hate_crime import HateCrime, calculate_percent_difference, clear_count_cubes, to_csv
+from instrumentation import stage
+from pipeline import Pipeline, Stage
+from validation import validate
 
+# The source files of the data sets
+SOURCES = {'hate_crime': 'hate_crime.zip', 'covid': 'all-states-history.csv'}
 
-def run() -> None:
+# The data sets, loaded by get_hate_crime_data and get_covid_data the first time they are used
+_datasets = {}
+
+
+def load_datasets() -> None:
+    """Load the data sets that are not loaded yet, parsing both data sets at the same time in
+    separate processes if neither has an up to date snapshot.
+
+    Call this before using both data sets, so that the first use of each does not wait for the
+    other to be parsed. Every data set is validated by validation.validate as it is loaded.
+    """
+    from snapshot import load_stores
+
+    with stage('load_datasets'):
+        for kind, store in load_stores({kind: filename for kind, filename in SOURCES.items()
+                                        if kind not in _datasets}):
+            _add_dataset(kind, store)
+
+
+def _add_dataset(kind: str, store: Any) -> None:
+    """Validate the loaded data set store of the given kind and keep it in _datasets."""
+    with stage('validate_' + kind):
+        validate(kind, store)
+    _datasets[kind] = store
+
+
+def reload_datasets() -> None:
+    """Forget the loaded data sets and everything computed from them, so that they are loaded
+    again from their source files the next time they are used."""
+    import series_cache
+
+    _datasets.clear()
+    series_cache.invalidate()
+    clear_count_cubes()
+    clear_monthly_totals()
+
+
+def get_hate_crime_data() -> list[HateCrime]:
+    """Return the hate crime data set, loading it the first time this function is called.
+
+    The data set is a record_store.HateCrimeStore, which can be used as a list of HateCrime.
+    """
+    if 'hate_crime' not in _datasets:
+        from snapshot import load_hate_crime_store
+        with stage('load_hate_crime'):
+            _add_dataset('hate_crime', load_hate_crime_store(SOURCES['hate_crime']))
+    return _datasets['hate_crime']
+
+
+def get_covid_data() -> list[CovidData]:
+    """Return the covid data set, loading it the first time this function is called.
+
+    The data set is a record_store.CovidStore, which can be used as a list of CovidData.
+    """
+    if 'covid' not in _datasets:
+        from snapshot import load_covid_store
+        with stage('load_covid'):
+            _add_dataset('covid', load_covid_store(SOURCES['covid']))
+    return _datasets['covid']
+
+
+def get_hate_crime_categories() -> dict[str, Any]:
+    """Return the categorical columns of the hate crime data set, such as its bias motivations,
+    offenses and locations, loading them the first time this function is called.
+
+    The columns are a dictionary mapping every key of categories.CATEGORY_COLUMNS to its
+    categories.CategoricalColumn, whose rows are those of get_hate_crime_data().
+    """
+    if 'hate_crime_categories' not in _datasets:
+        from snapshot import load_hate_crime_categories
+        with stage('load_hate_crime_categories'):
+            _datasets['hate_crime_categories'] = load_hate_crime_categories(SOURCES['hate_crime'])
+    return _datasets['hate_crime_categories']
+
+
+def __getattr__(name: str) -> Any:
+    """Load the hate_crime_data and covid_data module attributes the first time they are
+    accessed, so that importing this module does not parse either data set."""
+    if name == 'hate_crime_data':
+        return get_hate_crime_data()
+    elif name == 'covid_data':
+        return get_covid_data()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def _percent_difference_map(percent_difference: dict[str, list[float, int, int]]) -> Any:
+    """Return the figure of map.make_map for the given percent differences."""
+    from map import percent_difference_map
+    return percent_difference_map(percent_difference)
+
+
+# The stages of run and write_percent_difference. The pipeline keeps the latest output of each
+# stage, so calling them again with the same hate crime data set skips the computation.
+_pipeline = Pipeline([
+    Stage('percent_difference', calculate_percent_difference, ('hate_crime_data',)),
+    Stage('map', _percent_difference_map, ('percent_difference',))
+])
+
+
+def write_percent_difference(filename: str = 'percent_diff.csv') -> None:
+    """Write the percent difference between the actual and predicted hate crime instances in
+    2020 of every state to the csv file with the given filename. Only the hate crime data set is
+    loaded."""
+    outputs = _pipeline.run({'hate_crime_data': get_hate_crime_data()}, ['percent_difference'])
+
+    with stage('to_csv'):
+        to_csv(outputs['percent_difference'], filename)
+
+
+def run(percent_diff_file: Optional[str] = None) -> None:
     """This function creates the map which visualizes the relationship between hate crime rates
     and covid case rates.
+
+    The percent differences shown on the map are also written to percent_diff_file, if it is
+    given.
     """
-    percent_diff = calculate_percent_difference(hate_crime_data)
-    to_csv(percent_diff)
-    make_map()
+    outputs = _pipeline.run({'hate_crime_data': get_hate_crime_data()},
+                            ['percent_difference', 'map'])
+
+    if percent_diff_file is not None:
+        with stage('to_csv'):
+            to_csv(outputs['percent_difference'], percent_diff_file)
+
+    with stage('show_figure'):
+        show_figure(outputs['map'], 'map')
 
 
 def graphs() -> None:
@@ -33,9 +153,24 @@ def graphs() -> None:
     The default state is set to Alabama, which is an example of a state whose
     hate crime rate was drastically higher than predicted in 2020.
     """
+    from creating_graphs import plot_hate_crime_by_year, plot_hate_crime_by_month
+    from covid_to_hate_crime_relationship import plot_covid_and_hate_crime
+
+    load_datasets()
+    hate_crime_data = get_hate_crime_data()
     plot_hate_crime_by_year(hate_crime_data, 'AL')
     plot_hate_crime_by_month(hate_crime_data, 'AL')
-    plot_covid_and_hate_crime(covid_data, hate_crime_data, 'AL')
+    plot_covid_and_hate_crime(get_covid_data(), hate_crime_data, 'AL')
     # to create the graphs for a different state, replace 'AL' with the string \
     # of the abbreviation of the state you would like to look at. For example, \
     # Maryland is another state with interesting trends. To see its graphs, replace 'AL' with 'MD'.
+
+
+def report(output_dir: str = 'report', workers: Optional[int] = None) -> None:
+    """This function writes the 3 graphs of graphs() for every state as html files in output_dir,
+    using the given number of worker processes (by default, one per cpu).
+    """
+    from report import write_report
+
+    load_datasets()
+    write_report(get_hate_crime_data(), get_covid_data(), output_dir, workers=workers)
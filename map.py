@@ -4,33 +4,49 @@ Module Description
 ==================
 This module contains the functions to show the total percent change from predicted to actual, in hate crime rate.
 """
-import plotly.graph_objects as go
-import pandas as pd
+from typing import Optional
 
+import numpy as np
 
-def make_map() -> None:
+from figure_export import show_figure
+from hate_crime import read_percent_difference
+from instrumentation import stage
+
+
+def make_map(percent_difference: Optional[dict[str, list[float, int, int]]] = None) -> None:
     """Make the map showing the correlation between hate crime rate and covid rate by state.
    States that are more green had a larger increase in hate crime incidence than predicted,
    while states that are more red had a larger decrease in hate crime incidence than predicted.
-   States with almost white colours have similar predicted and actual hate crime rates."""
+   States with almost white colours have similar predicted and actual hate crime rates.
+
+   percent_difference is as returned by hate_crime.calculate_percent_difference; it is read from
+   percent_diff.csv if it is not given."""
+    if percent_difference is None:
+        with stage('read_percent_diff'):
+            percent_difference = read_percent_difference('percent_diff.csv')
+
+    with stage('build_figure'):
+        fig = percent_difference_map(percent_difference)
 
+    with stage('show_figure'):
+        show_figure(fig, 'map')
 
-    df = pd.read_csv('percent_diff.csv')
 
-    for col in df.columns:
-        df[col] = df[col].astype(str)
+def percent_difference_map(percent_difference: dict[str, list[float, int, int]]) -> 'go.Figure':
+    """Return the map figure of make_map for the given percent differences."""
+    import plotly.graph_objects as go
 
-    df['text'] = df['State'] + '<br>' + \
-                 'Actual ' + df['Actual'] + '<br>' + \
-                 'Predicted ' + df['Predicted']
+    states = list(percent_difference)
+    text = [f'{state}<br>Actual {actual}<br>Predicted {predicted}'
+            for state, (_, actual, predicted) in percent_difference.items()]
 
     fig = go.Figure(data=go.Choropleth(
-        locations=df['State'],
-        z=df['Percent Difference'].astype(float),
+        locations=states,
+        z=np.array([percent_difference[state][0] for state in states], dtype=float),
         locationmode='USA-states',
         colorscale=[[0, 'rgb(250, 255, 255)'], [1, 'rgb(10, 255, 255)']],
         autocolorscale=False,
-        text=df['text'],  # hover text
+        text=text,  # hover text
         colorbar=dict(title='Percent Difference')
     ))
 
@@ -43,4 +59,4 @@ def make_map() -> None:
             lakecolor='rgb(255, 255, 255)'),
     )
 
-    fig.show()
+    return fig
@@ -0,0 +1,184 @@
+"""CSC110 Project: The Hidden Correlation Between Covid-19 and Hate Crimes in the United States
+
+Module Description
+==================
+This module contains functions to parse hate_crime.csv in chunks spread over a pool of worker
+processes.
+
+The csv text is split into byte ranges that start and end on record boundaries. A line break
+inside a quoted field is not a record boundary: the quotes before a line break are counted, and
+a line break only ends a record when that count is even. Every worker parses its range with
+hate_crime.iter_records, exactly like the serial reader, into arrays of incident ids, state codes
+and date ordinals, and the arrays of all ranges are concatenated into a single
+record_store.HateCrimeStore.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import io
+import os
+from typing import Optional
+import zipfile
+
+import numpy as np
+
+import hate_crime
+from record_store import HateCrimeStore
+
+# The smallest number of bytes worth parsing in a separate chunk
+_MIN_CHUNK_SIZE = 1 << 20
+
+
+def record_boundaries(data: bytes, num_chunks: int, start: int = 0) -> list[int]:
+    """Return the offsets in data at which num_chunks chunks of about the same size begin,
+    followed by len(data), splitting data from start only at record boundaries.
+
+    Fewer chunks are returned when there are not enough record boundaries.
+
+    >>> data = b'1,"a\\nb"\\n2,c\\n3,d\\n'
+    >>> record_boundaries(data, 3)
+    [0, 8, 12, 16]
+
+    Preconditions:
+        - start is 0 or the offset of a record boundary in data
+        - num_chunks >= 1
+    """
+    boundaries = [start]
+
+    for chunk in range(1, num_chunks):
+        position = max(start + (len(data) - start) * chunk // num_chunks, boundaries[-1])
+        position = next_record_start(data, boundaries[-1], position)
+        if position >= len(data):
+            break
+        boundaries.append(position)
+
+    return boundaries + [len(data)]
+
+
+def next_record_start(data: bytes, boundary: int, position: int) -> int:
+    """Return the offset of the first record boundary in data after position, or len(data) if
+    there is none.
+
+    >>> next_record_start(b'1,"a\\nb"\\n2,c\\n', 0, 0)
+    8
+
+    Preconditions:
+        - boundary is 0 or the offset of a record boundary in data
+        - boundary <= position
+    """
+    odd_quotes = data.count(b'"', boundary, position) % 2
+
+    while True:
+        line_break = data.find(b'\n', position)
+        if line_break == -1:
+            return len(data)
+
+        odd_quotes ^= data.count(b'"', position, line_break) % 2
+        position = line_break + 1
+        if not odd_quotes:
+            return position
+
+
+def parse_chunk(text: bytes) -> tuple[tuple[str, ...], np.ndarray, np.ndarray, np.ndarray]:
+    """Return the abbreviated state names, incident ids, state codes and date ordinals of the
+    hate crime records in text, which holds complete records without a header.
+
+    The state codes index the returned state names, which are the result of
+    hate_crime.state_codes_for for the states in text.
+    """
+    records = list(hate_crime.iter_records(
+        csv.reader(io.StringIO(text.decode('utf-8'), newline=''))))
+
+    states = hate_crime.state_codes_for({record.state_abbr for record in records})
+    state_index = {state: code for code, state in enumerate(states)}
+
+    return (states,
+            np.fromiter((record.incident_id for record in records), np.int64, len(records)),
+            np.fromiter((state_index[record.state_abbr] for record in records), np.uint8,
+                        len(records)),
+            np.fromiter((record.date.toordinal() for record in records), np.int32,
+                        len(records)))
+
+
+def _parse_file_range(filename: str, start: int, end: int) \
+        -> tuple[tuple[str, ...], np.ndarray, np.ndarray, np.ndarray]:
+    """Return the result of parse_chunk for the bytes from start up to end of the given file."""
+    with open(filename, 'rb') as file:
+        file.seek(start)
+        return parse_chunk(file.read(end - start))
+
+
+def read_hate_crime_store(filename: str, workers: Optional[int] = None,
+                          member: str = 'hate_crime.csv') -> HateCrimeStore:
+    """Return the hate crime data set in filename as a store, parsed in chunks by the given
+    number of worker processes (by default, one per cpu).
+
+    filename may be either hate_crime.csv or a zip archive containing it as member. The store
+    holds exactly the headers and records returned by hate_crime.read_csv_file. With a single
+    worker, or for a file too small to split, the chunks are parsed in this process.
+
+    Preconditions:
+        - filename refers to a valid hate crime csv file or zip archive
+        - quotes only appear in the csv file around quoted fields and doubled inside them
+        - workers is None or workers >= 1
+    """
+    if filename.endswith('.zip'):
+        with zipfile.ZipFile(filename) as archive:
+            data = archive.read(member)
+    else:
+        with open(filename, 'rb') as file:
+            data = file.read()
+
+    header_end = next_record_start(data, 0, 0)
+    headers, _ = hate_crime.read_records(
+        io.StringIO(data[:header_end].decode('utf-8'), newline=''))
+
+    workers = workers or os.cpu_count() or 1
+    num_chunks = max(1, min(workers, (len(data) - header_end) // _MIN_CHUNK_SIZE))
+    boundaries = record_boundaries(data, num_chunks, header_end)
+    ranges = list(zip(boundaries, boundaries[1:]))
+
+    if len(ranges) == 1:
+        chunks = [parse_chunk(data[header_end:])]
+    elif filename.endswith('.zip'):
+        with ProcessPoolExecutor(min(workers, len(ranges))) as executor:
+            chunks = list(executor.map(parse_chunk, (data[start:end] for start, end in ranges)))
+    else:
+        del data  # The workers read their ranges from the file themselves
+        with ProcessPoolExecutor(min(workers, len(ranges))) as executor:
+            chunks = list(executor.map(_parse_file_range, [filename] * len(ranges),
+                                       *zip(*ranges)))
+
+    return _concatenate(headers, chunks)
+
+
+def _concatenate(headers: list[str],
+                 chunks: list[tuple[tuple[str, ...], np.ndarray, np.ndarray, np.ndarray]]) \
+        -> HateCrimeStore:
+    """Return the store of the records of the parsed chunks, in order."""
+    states = hate_crime.state_codes_for({state for chunk in chunks for state in chunk[0]})
+    state_index = {state: code for code, state in enumerate(states)}
+
+    state_codes = []
+    for chunk_states, _, codes, _ in chunks:
+        remapped = np.array([state_index[state] for state in chunk_states], dtype=np.uint8)
+        state_codes.append(remapped[codes])
+
+    return HateCrimeStore(headers, states, np.concatenate([chunk[1] for chunk in chunks]),
+                          np.concatenate(state_codes),
+                          np.concatenate([chunk[3] for chunk in chunks]))
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'extra-imports': ['validation', 'concurrent.futures', 'csv', 'io', 'os',
+                          'typing', 'zipfile', 'numpy', 'hate_crime', 'record_store'],
+        'allowed-io': ['_parse_file_range', 'read_hate_crime_store'],
+        'disable': ['R1705']
+    })
+
+    import validation
+
+    validation.check_contracts()
@@ -0,0 +1,172 @@
+"""CSC110 Project: The Hidden Correlation Between Covid-19 and Hate Crimes in the United States
+
+Module Description
+==================
+This module contains a small pipeline of named stages, in which the output of every stage is
+passed in memory to the stages that use it.
+
+Every input of a pipeline run is given a fingerprint, and every stage output is identified by a
+fingerprint of the stage and the fingerprints of its inputs. A pipeline remembers the latest output
+of every stage with its fingerprint, so running it again with unchanged inputs skips the stages
+whose inputs did not change.
+
+Writing a stage output to a file is never part of a stage; it is done explicitly by the caller
+with the outputs returned by Pipeline.run.
+"""
+from dataclasses import dataclass
+import hashlib
+from typing import Any, Callable, Iterable, Optional
+
+import numpy as np
+
+from instrumentation import stage
+
+
+@dataclass
+class Stage:
+    """A named step of a pipeline.
+
+    Instance Attributes:
+        - name: the name of the output of this stage
+        - function: the function computing the output of this stage from its inputs
+        - inputs: the names of the pipeline inputs or stage outputs passed to function, in order
+
+    Representation Invariants:
+        - self.name not in self.inputs
+    """
+    name: str
+    function: Callable
+    inputs: tuple[str, ...]
+
+
+class Pipeline:
+    """A set of stages, run in dependency order, that remembers the latest output of each stage.
+
+    Instance Attributes:
+        - stages: a mapping from the name of every stage to the stage
+        - executed: the names of the stages that were computed, rather than skipped, during the
+          latest run
+
+    Representation Invariants:
+        - all(name == self.stages[name].name for name in self.stages)
+    """
+    stages: dict[str, Stage]
+    executed: list[str]
+
+    # Private Instance Attributes:
+    #   - _outputs: a mapping from the name of every stage that has been run to the fingerprint
+    #     and value of its latest output
+    _outputs: dict[str, tuple[str, Any]]
+
+    def __init__(self, stages: Iterable[Stage]) -> None:
+        self.stages = {step.name: step for step in stages}
+        self.executed = []
+        self._outputs = {}
+
+    def run(self, inputs: dict[str, Any], targets: Iterable[str],
+            fingerprints: Optional[dict[str, str]] = None) -> dict[str, Any]:
+        """Return a dictionary mapping every target to its value, computing only the stages the
+        targets depend on whose inputs changed since they were last computed.
+
+        fingerprints maps input names to fingerprints computed by the caller, such as those of
+        the source files the inputs were read from. The fingerprint of any other input is
+        computed with fingerprint.
+
+        Preconditions:
+            - every input of every stage the targets depend on is in inputs or is a stage
+        """
+        fingerprints = dict(fingerprints or {})
+        for name, value in inputs.items():
+            if name not in fingerprints:
+                fingerprints[name] = fingerprint(value)
+
+        values = dict(inputs)
+        self.executed = []
+        for name in targets:
+            self._evaluate(name, values, fingerprints)
+
+        return {name: values[name] for name in targets}
+
+    def clear(self) -> None:
+        """Forget the outputs of all stages."""
+        self._outputs.clear()
+
+    def _evaluate(self, name: str, values: dict[str, Any], fingerprints: dict[str, str]) -> None:
+        """Add the value and fingerprint of the stage output with the given name to values and
+        fingerprints, after those of the stages it depends on."""
+        if name in values:
+            return
+
+        step = self.stages[name]
+        for input_name in step.inputs:
+            self._evaluate(input_name, values, fingerprints)
+
+        key = _digest([step.name, step.function.__module__, step.function.__qualname__]
+                      + [fingerprints[input_name] for input_name in step.inputs])
+
+        if name in self._outputs and self._outputs[name][0] == key:
+            values[name] = self._outputs[name][1]
+        else:
+            with stage(name):
+                values[name] = step.function(*(values[input_name] for input_name in step.inputs))
+            self._outputs[name] = (key, values[name])
+            self.executed.append(name)
+
+        fingerprints[name] = key
+
+
+def fingerprint(value: Any) -> str:
+    """Return a hex sha256 digest of the contents of value.
+
+    Numpy arrays are hashed by their type, shape and bytes, and objects storing their data in
+    attributes, such as the record stores and dataclasses, by their attributes.
+
+    >>> fingerprint({'AL': [1, 2]}) == fingerprint({'AL': [1, 2]})
+    True
+    >>> fingerprint(np.arange(3)) == fingerprint(np.arange(4))
+    False
+    """
+    digest = hashlib.sha256()
+    _update(digest, value)
+    return digest.hexdigest()
+
+
+def _update(digest: Any, value: Any) -> None:
+    """Update digest with the contents of value."""
+    if isinstance(value, np.ndarray):
+        digest.update(f'ndarray {value.dtype.str} {value.shape};'.encode())
+        digest.update(np.ascontiguousarray(value).data)
+    elif isinstance(value, dict):
+        digest.update(f'dict {len(value)};'.encode())
+        for key in value:
+            _update(digest, key)
+            _update(digest, value[key])
+    elif isinstance(value, (list, tuple)):
+        digest.update(f'{type(value).__name__} {len(value)};'.encode())
+        for item in value:
+            _update(digest, item)
+    elif hasattr(value, '__dict__'):
+        digest.update(f'{type(value).__qualname__};'.encode())
+        _update(digest, vars(value))
+    else:
+        digest.update(f'{repr(value)};'.encode())
+
+
+def _digest(parts: list[str]) -> str:
+    """Return the hex sha256 digest of the given strings."""
+    return hashlib.sha256('\0'.join(parts).encode()).hexdigest()
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'extra-imports': ['validation', 'dataclasses', 'hashlib', 'typing', 'numpy',
+                          'instrumentation'],
+        'disable': ['R1705']
+    })
+
+    import validation
+
+    validation.check_contracts()
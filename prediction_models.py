@@ -0,0 +1,161 @@
+"""CSC110 Project: The Hidden Correlation Between Covid-19 and Hate Crimes in the United States
+
+Module Description
+==================
+This module contains vectorized models that predict the number of hate crime incidents of every
+state in the year after a window of yearly counts, all states at once.
+
+A window is a states x years matrix: window[i, j] is the number of incidents of the i-th state in
+the j-th year of the window. Every model takes a window and returns an array with the predicted
+number of incidents of each state in the year after the window.
+"""
+from typing import Callable
+
+import numpy as np
+
+
+def best_slopes(window: np.ndarray) -> np.ndarray:
+    """Return the slope found by hate_crime.find_best_slope for every row of window, where the
+    first and last columns of window are the start_year and end_year counts.
+
+    The sequence of middle years that find_best_slope tries only depends on the length of the
+    window, so the adjusted slope of every middle year is computed for all states at once and
+    each state then keeps the first slope at which find_best_slope would have stopped.
+
+    Preconditions:
+        - window.shape[1] >= 2
+
+    >>> best_slopes(np.array([[10, 12, 14, 16, 18]]))
+    array([2])
+    """
+    window = np.asarray(window, dtype=np.int64)
+    end = window.shape[1] - 1
+    end_incidents = window[:, end]
+
+    # The middle years tried by find_best_slope, up to the one after which they stop changing
+    middle_years = [end // 2]
+    while (end + middle_years[-1]) // 2 != middle_years[-1]:
+        middle_years.append((end + middle_years[-1]) // 2)
+    middle_years = np.array(middle_years)
+
+    slope = (end_incidents - window[:, 0]) // end
+    adjusted = (end_incidents[:, None] - window[:, middle_years]) // (end - middle_years)
+
+    # previous[:, k] is the slope that adjusted[:, k] is compared with
+    previous = np.concatenate((slope[:, None], adjusted[:, :-1]), axis=1)
+    stopped = np.abs(previous - adjusted) <= 1
+    # The last middle year always repeats itself, so find_best_slope stops there at the latest
+    stopped[:, -1] = True
+
+    return adjusted[np.arange(len(window)), np.argmax(stopped, axis=1)]
+
+
+###############################################################################
+# Models
+###############################################################################
+def predict_slope(window: np.ndarray) -> np.ndarray:
+    """Return the prediction of hate_crime.predictions for every row of window: the last count
+    plus the best slope.
+
+    >>> predict_slope(np.array([[10, 12, 14, 16, 18]]))
+    array([20])
+    """
+    window = np.asarray(window, dtype=np.int64)
+    return best_slopes(window) + window[:, -1]
+
+
+def predict_ols(window: np.ndarray) -> np.ndarray:
+    """Return the ordinary least squares linear trend of every row of window, extrapolated to the
+    year after the window.
+
+    Preconditions:
+        - window.shape[1] >= 2
+
+    >>> predict_ols(np.array([[10, 12, 14, 16, 18]]))
+    array([20.])
+    """
+    window = np.asarray(window, dtype=np.float64)
+    years = np.arange(window.shape[1], dtype=np.float64)
+    centered_years = years - years.mean()
+    means = window.mean(axis=1)
+    slopes = (window - means[:, None]) @ centered_years / (centered_years @ centered_years)
+
+    return means + slopes * (window.shape[1] - years.mean())
+
+
+def predict_trailing_mean(window: np.ndarray, years: int = 3) -> np.ndarray:
+    """Return the mean of the last given number of years of every row of window.
+
+    Preconditions:
+        - years >= 1
+
+    >>> predict_trailing_mean(np.array([[10, 12, 14, 16, 18]]))
+    array([16.])
+    """
+    return np.asarray(window, dtype=np.float64)[:, -years:].mean(axis=1)
+
+
+def predict_exponential_smoothing(window: np.ndarray, alpha: float = 0.5) -> np.ndarray:
+    """Return the simple exponential smoothing forecast of every row of window, with the given
+    smoothing factor.
+
+    Preconditions:
+        - 0 < alpha <= 1
+
+    >>> predict_exponential_smoothing(np.array([[10, 12, 14, 16, 18]]))
+    array([16.125])
+    """
+    window = np.asarray(window, dtype=np.float64)
+    level = window[:, 0]
+    for column in range(1, window.shape[1]):
+        level = alpha * window[:, column] + (1 - alpha) * level
+    return level
+
+
+# The models that can be selected by name in predict
+MODELS: dict[str, Callable[..., np.ndarray]] = {
+    'slope': predict_slope,
+    'ols': predict_ols,
+    'trailing_mean': predict_trailing_mean,
+    'exponential_smoothing': predict_exponential_smoothing
+}
+
+
+def predict(window: np.ndarray, model: str = 'slope', **parameters: float) -> np.ndarray:
+    """Return the predictions of the model with the given name for every row of window.
+
+    As in hate_crime.predictions, every prediction is at least 1, so that percent differences
+    from the predictions are always defined. Any parameters are passed on to the model.
+
+    Preconditions:
+        - model in MODELS
+
+    >>> predict(np.array([[10, 12, 14, 16, 18], [9, 6, 3, 0, 0]]))
+    array([20,  1])
+    """
+    return np.maximum(MODELS[model](window, **parameters), 1)
+
+
+def year_window(year_counts: np.ndarray, first_year: int, start_year: int,
+                end_year: int) -> np.ndarray:
+    """Return the columns of year_counts from start_year to end_year inclusive, where the first
+    column of year_counts is first_year.
+
+    Preconditions:
+        - first_year <= start_year < end_year < first_year + year_counts.shape[1]
+    """
+    return year_counts[:, start_year - first_year:end_year - first_year + 1]
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'extra-imports': ['validation', 'typing', 'numpy'],
+        'disable': ['R1705']
+    })
+
+    import validation
+
+    validation.check_contracts()
@@ -0,0 +1,187 @@
+"""CSC110 Project: The Hidden Correlation Between Covid-19 and Hate Crimes in the United States
+
+Module Description
+==================
+This module contains compact, array-backed stores of the hate crime and covid data sets.
+
+A store keeps one array per attribute instead of one dataclass instance per row: incident ids as
+integers, dates as int32 day ordinals and states as uint8 codes into a tuple of abbreviated state
+names. A store is a read-only sequence of HateCrime or CovidData, so it can be passed to every
+function that takes the data set as a list. Its rows are created as dataclass instances only when
+they are accessed, and the aggregation functions of hate_crime and covid_dataclass read its arrays
+directly instead.
+"""
+from collections.abc import Sequence
+import datetime
+from typing import Any, Iterable, Iterator
+
+import numpy as np
+
+from covid_dataclass import CovidData
+import hate_crime
+from hate_crime import HateCrime
+
+# The number of rows converted to dataclass instances at a time while iterating over a store
+_CHUNK_SIZE = 1 << 16
+
+
+class HateCrimeStore(Sequence):
+    """A read-only sequence of HateCrime stored as parallel arrays.
+
+    Indexing a store with an integer returns a new HateCrime for that row; changing it does not
+    change the store. Indexing with a slice, a boolean mask or an array of indexes returns a
+    store of the selected rows.
+
+    Instance Attributes:
+        - headers: the headers of the kept columns of hate_crime.csv
+        - states: the abbreviated state names that the state codes refer to
+        - incident_ids: the incident_id of every incident
+        - state_codes: the index in states of the state of every incident
+        - date_ordinals: the date of every incident, as returned by datetime.date.toordinal
+
+    Representation Invariants:
+        - self.incident_ids.shape == self.state_codes.shape == self.date_ordinals.shape
+        - self.states[:len(hate_crime.STATE_CODES)] == hate_crime.STATE_CODES
+        - len(self.states) <= 256
+    """
+    headers: list[str]
+    states: tuple[str, ...]
+    incident_ids: np.ndarray
+    state_codes: np.ndarray
+    date_ordinals: np.ndarray
+
+    def __init__(self, headers: list[str], states: tuple[str, ...], incident_ids: np.ndarray,
+                 state_codes: np.ndarray, date_ordinals: np.ndarray) -> None:
+        self.headers = headers
+        self.states = states
+        self.incident_ids = incident_ids
+        self.state_codes = state_codes
+        self.date_ordinals = date_ordinals
+
+    @classmethod
+    def from_records(cls, headers: list[str], records: Iterable[HateCrime]) -> 'HateCrimeStore':
+        """Return a store of the given hate crime headers and records."""
+        records = list(records)
+        states = hate_crime.state_codes_for({row.state_abbr for row in records})
+        state_index = {state: code for code, state in enumerate(states)}
+
+        return cls(
+            list(headers), states,
+            np.fromiter((row.incident_id for row in records), np.int64, len(records)),
+            np.fromiter((state_index[row.state_abbr] for row in records), np.uint8, len(records)),
+            np.fromiter((row.date.toordinal() for row in records), np.int32, len(records)))
+
+    def __len__(self) -> int:
+        return len(self.incident_ids)
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, (int, np.integer)):
+            return HateCrime(int(self.incident_ids[index]),
+                             self.states[self.state_codes[index]],
+                             datetime.date.fromordinal(int(self.date_ordinals[index])))
+        return HateCrimeStore(self.headers, self.states, self.incident_ids[index],
+                              self.state_codes[index], self.date_ordinals[index])
+
+    def __iter__(self) -> Iterator[HateCrime]:
+        states = self.states
+        from_ordinal = datetime.date.fromordinal
+
+        for start in range(0, len(self), _CHUNK_SIZE):
+            chunk = slice(start, start + _CHUNK_SIZE)
+            for incident_id, code, ordinal in zip(self.incident_ids[chunk].tolist(),
+                                                  self.state_codes[chunk].tolist(),
+                                                  self.date_ordinals[chunk].tolist()):
+                yield HateCrime(incident_id, states[code], from_ordinal(ordinal))
+
+    def __repr__(self) -> str:
+        return f'HateCrimeStore(<{len(self)} incidents>)'
+
+    def records(self) -> list[HateCrime]:
+        """Return the rows of this store as a list of HateCrime."""
+        return list(self)
+
+
+class CovidStore(Sequence):
+    """A read-only sequence of CovidData stored as parallel arrays.
+
+    Indexing a store with an integer returns a new CovidData for that row; changing it does not
+    change the store. Indexing with a slice, a boolean mask or an array of indexes returns a
+    store of the selected rows.
+
+    Instance Attributes:
+        - states: the abbreviated state names that the state codes refer to
+        - date_ordinals: the date of every row, as returned by datetime.date.toordinal
+        - state_codes: the index in states of the state of every row
+        - cases: the number of new positive covid cases of every row
+
+    Representation Invariants:
+        - self.date_ordinals.shape == self.state_codes.shape == self.cases.shape
+        - len(self.states) <= 256
+    """
+    states: tuple[str, ...]
+    date_ordinals: np.ndarray
+    state_codes: np.ndarray
+    cases: np.ndarray
+
+    def __init__(self, states: tuple[str, ...], date_ordinals: np.ndarray,
+                 state_codes: np.ndarray, cases: np.ndarray) -> None:
+        self.states = states
+        self.date_ordinals = date_ordinals
+        self.state_codes = state_codes
+        self.cases = cases
+
+    @classmethod
+    def from_records(cls, records: Iterable[CovidData]) -> 'CovidStore':
+        """Return a store of the given covid records."""
+        records = list(records)
+        states = hate_crime.state_codes_for({row.state for row in records})
+        state_index = {state: code for code, state in enumerate(states)}
+
+        return cls(
+            states,
+            np.fromiter((row.date.toordinal() for row in records), np.int32, len(records)),
+            np.fromiter((state_index[row.state] for row in records), np.uint8, len(records)),
+            np.fromiter((row.cases for row in records), np.int64, len(records)))
+
+    def __len__(self) -> int:
+        return len(self.cases)
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, (int, np.integer)):
+            return CovidData(datetime.date.fromordinal(int(self.date_ordinals[index])),
+                             self.states[self.state_codes[index]], int(self.cases[index]))
+        return CovidStore(self.states, self.date_ordinals[index], self.state_codes[index],
+                          self.cases[index])
+
+    def __iter__(self) -> Iterator[CovidData]:
+        states = self.states
+        from_ordinal = datetime.date.fromordinal
+
+        for start in range(0, len(self), _CHUNK_SIZE):
+            chunk = slice(start, start + _CHUNK_SIZE)
+            for ordinal, code, cases in zip(self.date_ordinals[chunk].tolist(),
+                                            self.state_codes[chunk].tolist(),
+                                            self.cases[chunk].tolist()):
+                yield CovidData(from_ordinal(ordinal), states[code], cases)
+
+    def __repr__(self) -> str:
+        return f'CovidStore(<{len(self)} rows>)'
+
+    def records(self) -> list[CovidData]:
+        """Return the rows of this store as a list of CovidData."""
+        return list(self)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'extra-imports': ['validation', 'collections.abc', 'datetime', 'typing',
+                          'numpy', 'covid_dataclass', 'hate_crime'],
+        'disable': ['R1705']
+    })
+
+    import validation
+
+    validation.check_contracts()
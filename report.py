@@ -0,0 +1,140 @@
+"""CSC110 Project: The Hidden Correlation Between Covid-19 and Hate Crimes in the United States
+
+Module Description
+==================
+This module contains functions to generate the graphs of main.graphs for every state at once,
+spread over a pool of worker processes.
+
+The workers never receive the hate crime and covid data sets themselves. Each worker is given
+the hate crime CountCube and the covid monthly totals once, when it starts, and builds and writes
+the three figures of one state per task.
+
+Run this module as a script, e.g. python report.py --workers 8 --output-dir report
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import os
+from typing import Iterable, Optional
+
+import covid_dataclass
+from covid_dataclass import CovidData
+import covid_to_hate_crime_relationship as relationship
+import creating_graphs
+from figure_export import FORMATS, export_figure, write_plotly_js
+import hate_crime
+from hate_crime import HateCrime, CountCube
+
+# The names of the figures written for every state, in the order they are written in
+FIGURES = ('by_year', 'by_month', 'covid_and_hate_crime')
+
+# The aggregates, output directory and figure format used by write_state_figures, set by
+# _initialize_worker
+_worker_state = {}
+
+
+def _initialize_worker(cube: CountCube, covid_totals: dict[tuple[str, int, int], int],
+                       output_dir: str, figure_format: str) -> None:
+    """Store the aggregates, output directory and figure format used by write_state_figures in
+    this process."""
+    _worker_state['cube'] = cube
+    _worker_state['covid_totals'] = covid_totals
+    _worker_state['output_dir'] = output_dir
+    _worker_state['format'] = figure_format
+
+
+def write_state_figures(state: str) -> list[str]:
+    """Write the three figures of main.graphs for the given state and return their paths, in the
+    order of FIGURES.
+
+    Preconditions:
+        - _initialize_worker has been called in this process
+    """
+    cube = _worker_state['cube']
+    covid_totals = _worker_state['covid_totals']
+    output_dir, figure_format = _worker_state['output_dir'], _worker_state['format']
+
+    year_x, year_y = creating_graphs.year_coordinates(
+        creating_graphs.cube_data_by_year(cube, state))
+    month_x, month_y = creating_graphs.month_coordinates(
+        creating_graphs.cube_data_by_month(cube, state))
+    _, covid_x, covid_y = relationship.aggregate_xy_data(covid_totals, cube, state)
+
+    figures = [creating_graphs.hate_crime_by_year_figure(state, year_x, year_y),
+               creating_graphs.hate_crime_by_month_figure(state, month_x, month_y),
+               relationship.covid_and_hate_crime_figure(state, covid_x, covid_y)]
+
+    paths = []
+    for name, fig in zip(FIGURES, figures):
+        paths.append(export_figure(fig, output_dir, f'{state}_{name}', figure_format))
+
+    return paths
+
+
+def write_report(hate_crime_data: list[HateCrime], covid_data: list[CovidData],
+                 output_dir: str = 'report', states: Iterable[str] = hate_crime.STATE_CODES,
+                 workers: Optional[int] = None,
+                 figure_format: str = 'html') -> dict[str, list[str]]:
+    """Write the figures of every given state to output_dir and return a dictionary mapping
+    every state to the paths of its figures, in the order of states.
+
+    The figures are written in the given format of figure_export.FORMATS. All html pages share a
+    single copy of plotly.js in output_dir.
+
+    The states are spread over the given number of worker processes, by default one per cpu.
+    With a single worker, the figures are written in this process.
+
+    Preconditions:
+        - workers is None or workers >= 1
+        - figure_format in figure_export.FORMATS
+    """
+    states = list(states)
+    os.makedirs(output_dir, exist_ok=True)
+    if figure_format == 'html':
+        write_plotly_js(output_dir)
+    initializer_arguments = (hate_crime.count_cube(hate_crime_data),
+                             covid_dataclass.monthly_totals(covid_data), output_dir, figure_format)
+
+    if workers == 1:
+        _initialize_worker(*initializer_arguments)
+        paths = [write_state_figures(state) for state in states]
+    else:
+        with ProcessPoolExecutor(workers, initializer=_initialize_worker,
+                                 initargs=initializer_arguments) as executor:
+            paths = list(executor.map(write_state_figures, states))
+
+    return dict(zip(states, paths))
+
+
+def main(arguments: Optional[list[str]] = None) -> None:
+    """Write the report of the states given as command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('states', nargs='*', default=hate_crime.STATE_CODES,
+                        help='abbreviated names of the states to report on (default: all)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of worker processes (default: one per cpu)')
+    parser.add_argument('--output-dir', default='report', help='directory to write figures to')
+    parser.add_argument('--format', choices=FORMATS, default='html', help='figure file format')
+    options = parser.parse_args(arguments)
+
+    import main as project
+    project.load_datasets()
+    write_report(project.get_hate_crime_data(), project.get_covid_data(), options.output_dir,
+                 options.states, options.workers, options.format)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'extra-imports': ['validation', 'argparse', 'concurrent.futures', 'os', 'typing',
+                          'covid_dataclass', 'covid_to_hate_crime_relationship',
+                          'creating_graphs', 'figure_export', 'hate_crime', 'main'],
+        'disable': ['R1705']
+    })
+
+    import validation
+
+    validation.check_contracts()
+
+    main()
@@ -0,0 +1,226 @@
+"""CSC110 Project: The Hidden Correlation Between Covid-19 and Hate Crimes in the United States
+
+Module Description
+==================
+This module contains a memoization layer for the functions returning the series of one state,
+such as creating_graphs.get_data_by_month and covid_to_hate_crime_relationship.get_xy_data.
+
+Only the read-only record stores of record_store are memoized; a call with a list, which can be
+mutated, is always computed again. Every store passed to a memoized function is given a version
+number the first time it is seen, without keeping the store alive, and a new store (as when the
+data sets are reloaded) gets a new version. Results are cached under the versions of their data
+sets, the state and the name of the function, which stands for the granularity of the series.
+The results of a store are dropped as soon as the store is garbage collected.
+
+The cache evicts the least recently used results once their estimated size exceeds a memory cap,
+and counts its hits, misses and evictions. Every call returns its own copy of the cached dict,
+list or tuple of lists, so callers may mutate it.
+"""
+from collections import OrderedDict
+import functools
+import inspect
+import itertools
+import sys
+from typing import Any, Callable, Optional
+import weakref
+
+import numpy as np
+
+from hate_crime import is_store
+
+# The default memory cap of the cache, in bytes
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+
+class SeriesCache:
+    """A least recently used cache of the results of per-state series functions, bounded by the
+    estimated size of the results.
+
+    Instance Attributes:
+        - max_bytes: the largest estimated size of all cached results together, in bytes
+        - num_bytes: the estimated size of all cached results together, in bytes
+        - hits: the number of lookups that found a cached result
+        - misses: the number of lookups that did not find a cached result
+        - evictions: the number of results evicted to stay under max_bytes
+
+    Representation Invariants:
+        - self.num_bytes <= self.max_bytes
+    """
+    max_bytes: int
+    num_bytes: int
+    hits: int
+    misses: int
+    evictions: int
+
+    # Private Instance Attributes:
+    #   - _entries: a mapping from (data set versions, state, function name) keys to the cached
+    #     result and its estimated size, least recently used first
+    _entries: OrderedDict[tuple, tuple[Any, int]]
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.num_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def get(self, key: tuple, compute: Callable[[], Any]) -> Any:
+        """Return the result cached under key, or compute, cache and return it if there is none.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+
+        self.misses += 1
+        result = compute()
+        size = estimated_size(result)
+
+        if size <= self.max_bytes:
+            self._entries[key] = (result, size)
+            self.num_bytes += size
+            self._evict(self.max_bytes)
+
+        return result
+
+    def discard_version(self, version: int) -> None:
+        """Drop every result computed from the data set with the given version."""
+        for key in [key for key in self._entries if version in key[0]]:
+            self.num_bytes -= self._entries.pop(key)[1]
+
+    def resize(self, max_bytes: int) -> None:
+        """Change the memory cap to max_bytes, evicting results if needed."""
+        self.max_bytes = max_bytes
+        self._evict(max_bytes)
+
+    def clear(self) -> None:
+        """Drop every cached result. The counters are kept."""
+        self._entries.clear()
+        self.num_bytes = 0
+
+    def statistics(self) -> dict[str, int]:
+        """Return the counters, number of cached results and estimated size of this cache."""
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'entries': len(self._entries), 'bytes': self.num_bytes,
+                'max_bytes': self.max_bytes}
+
+    def _evict(self, max_bytes: int) -> None:
+        """Evict the least recently used results until their size is at most max_bytes."""
+        while self.num_bytes > max_bytes:
+            _, (_, size) = self._entries.popitem(last=False)
+            self.num_bytes -= size
+            self.evictions += 1
+
+
+def estimated_size(value: Any) -> int:
+    """Return an estimate of the memory used by value and the containers and numbers in it, in
+    bytes."""
+    if isinstance(value, np.ndarray):
+        return sys.getsizeof(value) + (value.nbytes if value.base is None else 0)
+    elif isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimated_size(key) + estimated_size(item)
+                                          for key, item in value.items())
+    elif isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimated_size(item) for item in value)
+    else:
+        return sys.getsizeof(value)
+
+
+# The cache used by the memoized functions
+_cache = SeriesCache()
+
+# The version of every record store seen so far, kept only as long as the store is alive
+_versions: 'weakref.WeakKeyDictionary[Any, int]' = weakref.WeakKeyDictionary()
+_next_version = itertools.count()
+
+
+def dataset_version(data: Any) -> Optional[int]:
+    """Return the version of the data set data, giving it a new version if it was not seen
+    before, or None if data is not a record store and so cannot be memoized.
+
+    The results of the version are dropped from the cache when data is garbage collected.
+    """
+    if not is_store(data):
+        return None
+
+    version = _versions.get(data)
+    if version is None:
+        version = _versions[data] = next(_next_version)
+        weakref.finalize(data, _cache.discard_version, version)
+    return version
+
+
+def copy_result(result: Any) -> Any:
+    """Return a copy of the dicts, lists and tuples of result, sharing their immutable items.
+
+    >>> result = ({'2020': 1}, [1, 2])
+    >>> copy_result(result) == result and copy_result(result)[1] is not result[1]
+    True
+    """
+    if isinstance(result, dict):
+        return {key: copy_result(item) for key, item in result.items()}
+    elif isinstance(result, (list, tuple)):
+        return type(result)(copy_result(item) for item in result)
+    else:
+        return result
+
+
+def memoized_series(function: Callable) -> Callable:
+    """Return function memoized by the versions of its data set arguments, its state argument
+    and its name, if all of its data sets are record stores.
+
+    function must take one or more data sets followed by an abbreviated state name, which may
+    be passed either by position or by keyword. Its result must be made of dicts, lists, tuples
+    and immutable values, and every call returns a copy of it.
+    """
+    name = function.__qualname__
+    signature = inspect.signature(function)
+
+    @functools.wraps(function)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        arguments = signature.bind(*args, **kwargs)
+        arguments.apply_defaults()
+        *data_sets, state = arguments.arguments.values()
+        versions = tuple(dataset_version(data) for data in data_sets)
+        if None in versions:
+            return function(*args, **kwargs)
+
+        key = (versions, state, name)
+        return copy_result(_cache.get(key, lambda: function(*args, **kwargs)))
+
+    return wrapper
+
+
+def invalidate() -> None:
+    """Forget every data set version and every cached result, e.g. after the data sets were
+    reloaded. The counters are kept."""
+    _versions.clear()
+    _cache.clear()
+
+
+def set_memory_cap(max_bytes: int) -> None:
+    """Change the memory cap of the cache to max_bytes."""
+    _cache.resize(max_bytes)
+
+
+def statistics() -> dict[str, int]:
+    """Return the hit, miss and eviction counters, the number of cached results and the
+    estimated size of the cache."""
+    return _cache.statistics()
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'extra-imports': ['validation', 'collections', 'functools', 'inspect', 'itertools', 'sys',
+                          'typing', 'weakref', 'numpy', 'hate_crime'],
+        'disable': ['R1705']
+    })
+
+    import validation
+
+    validation.check_contracts()
@@ -0,0 +1,398 @@
+"""CSC110 Project: The Hidden Correlation Between Covid-19 and Hate Crimes in the United States
+
+Module Description
+==================
+This module contains a local HTTP service that serves the project's aggregates and figures as
+json, built on asyncio from the standard library.
+
+The data sets are loaded once, when the service starts. The hate crime CountCube and the covid
+monthly totals are then handed once to a pool of worker processes, which render the responses,
+so building a series or a figure never blocks the event loop. The workers are started from a fork
+server rather than forked from the service, so that they never inherit its client connections.
+Every rendered response is cached under its canonical path with a strong ETag until the data sets
+are reloaded, concurrent requests for a response that is being rendered wait for the same
+rendering, and a GET with a matching If-None-Match header is answered with 304 Not Modified.
+
+Endpoints:
+    - /states: the abbreviated names of the states
+    - /series/<state>/month and /series/<state>/year: the hate crime series of a state, as
+      returned by creating_graphs.get_xy_coordinates_month and get_xy_coordinates_year
+    - /series/<state>/covid: the monthly covid cases and hate crimes of a state in 2020, as
+      returned by covid_to_hate_crime_relationship.get_xy_data
+    - /percent-difference: the percent differences of every state, as returned by
+      hate_crime.calculate_percent_difference
+    - /map: the locations, values and hover text of the map of map.make_map
+    - /figures/map and /figures/<state>/<by_year|by_month|covid_and_hate_crime>: the plotly json
+      of the figures of main.run and main.graphs
+
+Run this module as a script, e.g. python service.py --port 8110
+"""
+import argparse
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import json
+import multiprocessing
+from typing import Any, Optional
+
+import covid_dataclass
+import covid_to_hate_crime_relationship as relationship
+import creating_graphs
+import hate_crime
+from hate_crime import CountCube
+
+# The largest request head (request line and headers) read, in bytes
+_MAX_HEAD_SIZE = 16 * 1024
+
+_REASONS = {200: 'OK', 304: 'Not Modified', 404: 'Not Found', 405: 'Method Not Allowed',
+            500: 'Internal Server Error'}
+
+# The aggregates used by render, set by _initialize_worker
+_worker_state = {}
+
+# The start method of the worker processes. A forked worker would inherit the sockets of the
+# connections open at that moment, which would then never be closed by the client's side.
+_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() \
+    else 'spawn'
+
+
+###############################################################################
+# Rendering responses (in the worker processes)
+###############################################################################
+def _initialize_worker(cube: CountCube, covid_totals: dict[tuple[str, int, int], int]) -> None:
+    """Store the aggregates used by render in this process."""
+    _worker_state['cube'] = cube
+    _worker_state['covid_totals'] = covid_totals
+
+
+def canonical_path(path: str) -> str:
+    """Return the canonical form of path, under which its response is rendered and cached.
+
+    >>> canonical_path('//series/AL/month/')
+    '/series/AL/month'
+    """
+    return '/' + path.strip('/')
+
+
+def render(path: str) -> Optional[bytes]:
+    """Return the json body of the response to path, or None if there is no such endpoint.
+
+    Preconditions:
+        - _initialize_worker has been called in this process
+    """
+    cube = _worker_state['cube']
+    covid_totals = _worker_state['covid_totals']
+    parts = canonical_path(path)[1:].split('/')
+
+    if parts == ['states']:
+        body = list(hate_crime.STATE_CODES)
+    elif parts == ['percent-difference']:
+        body = {state: {'percent_difference': values[0], 'actual': values[1],
+                        'predicted': values[2]}
+                for state, values in _percent_difference(cube).items()}
+    elif parts == ['map']:
+        percent_difference = _percent_difference(cube)
+        body = {'locations': list(percent_difference),
+                'z': [values[0] for values in percent_difference.values()],
+                'text': [f'{state}<br>Actual {actual}<br>Predicted {predicted}'
+                         for state, (_, actual, predicted) in percent_difference.items()]}
+    elif len(parts) == 3 and parts[0] == 'series' and parts[1] in hate_crime.STATES:
+        body = _series(cube, covid_totals, parts[1], parts[2])
+    elif parts[0] == 'figures' and len(parts) in {2, 3}:
+        fig = _figure(cube, covid_totals, parts[1:])
+        return None if fig is None else fig.to_json().encode()
+    else:
+        return None
+
+    return None if body is None else json.dumps(body).encode()
+
+
+def _percent_difference(cube: CountCube) -> dict[str, list[float, int, int]]:
+    """Return the percent differences of every state of STATE_CODES, in that order."""
+    return hate_crime.cube_percent_difference(cube, hate_crime.STATE_CODES)
+
+
+def _series(cube: CountCube, covid_totals: dict[tuple[str, int, int], int], state: str,
+            granularity: str) -> Optional[dict[str, Any]]:
+    """Return the series of the given granularity of state, or None if there is no such
+    granularity."""
+    if granularity == 'month':
+        x, y = creating_graphs.month_coordinates(creating_graphs.cube_data_by_month(cube, state))
+        return {'state': state, 'x': x, 'y': y}
+    elif granularity == 'year':
+        x, y = creating_graphs.year_coordinates(creating_graphs.cube_data_by_year(cube, state))
+        return {'state': state, 'x': x, 'y': y}
+    elif granularity == 'covid':
+        dates, covid, hate_crimes = relationship.aggregate_xy_data(covid_totals, cube, state)
+        return {'state': state, 'dates': dates, 'covid': covid, 'hate_crimes': hate_crimes}
+    else:
+        return None
+
+
+def _figure(cube: CountCube, covid_totals: dict[tuple[str, int, int], int],
+            parts: list[str]) -> Any:
+    """Return the figure named by the path parts after /figures/, or None if there is no such
+    figure."""
+    if parts == ['map']:
+        from map import percent_difference_map
+        return percent_difference_map(_percent_difference(cube))
+    elif len(parts) != 2 or parts[0] not in hate_crime.STATES:
+        return None
+
+    state, name = parts
+    series = _series(cube, covid_totals, state,
+                     {'by_year': 'year', 'by_month': 'month',
+                      'covid_and_hate_crime': 'covid'}.get(name, ''))
+    if name == 'by_year':
+        return creating_graphs.hate_crime_by_year_figure(state, series['x'], series['y'])
+    elif name == 'by_month':
+        return creating_graphs.hate_crime_by_month_figure(state, series['x'], series['y'])
+    elif name == 'covid_and_hate_crime':
+        return relationship.covid_and_hate_crime_figure(state, series['covid'],
+                                                        series['hate_crimes'])
+    else:
+        return None
+
+
+###############################################################################
+# Serving responses
+###############################################################################
+class Service:
+    """The HTTP service, with the responses rendered so far.
+
+    Instance Attributes:
+        - workers: the number of worker processes rendering responses, or None for one per cpu
+        - version: the number of times the data sets were loaded, part of every ETag
+
+    Representation Invariants:
+        - self.workers is None or self.workers >= 1
+    """
+    workers: Optional[int]
+    version: int
+
+    # Private Instance Attributes:
+    #   - _executor: the pool of worker processes rendering responses
+    #   - _responses: a mapping from the canonical form of every known path rendered since the
+    #     data sets were loaded to the ETag and body of its response
+    #   - _rendering: a mapping from the canonical form of every path being rendered to the task
+    #     rendering it
+    _executor: Optional[ProcessPoolExecutor]
+    _responses: dict[str, tuple[str, Optional[bytes]]]
+    _rendering: dict[str, asyncio.Task]
+
+    def __init__(self, workers: Optional[int] = None) -> None:
+        self.workers = workers
+        self.version = 0
+        self._executor = None
+        self._responses = {}
+        self._rendering = {}
+
+    async def load(self) -> None:
+        """Load the data sets, or reload them if they were loaded before, and start a new pool of
+        worker processes with their aggregates. The responses rendered so far are forgotten."""
+        loop = asyncio.get_running_loop()
+        cube, covid_totals = await loop.run_in_executor(None, _load_aggregates, self.version > 0)
+
+        previous = self._executor
+        self._executor = ProcessPoolExecutor(self.workers,
+                                             multiprocessing.get_context(_START_METHOD),
+                                             initializer=_initialize_worker,
+                                             initargs=(cube, covid_totals))
+        self.version += 1
+        self._responses = {}
+        self._rendering = {}
+
+        if previous is not None:
+            previous.shutdown(wait=False)
+
+    def close(self) -> None:
+        """Stop the worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    async def response(self, path: str) -> tuple[str, Optional[bytes]]:
+        """Return the ETag and json body of the response to path, rendering it in a worker
+        process the first time it or another path with the same canonical_path is requested. The
+        body is None for unknown paths, which are rendered again on every request so that they
+        cannot fill the cache."""
+        path = canonical_path(path)
+        if path in self._responses:
+            return self._responses[path]
+
+        if path not in self._rendering:
+            self._rendering[path] = asyncio.create_task(self._render(path))
+        return await asyncio.shield(self._rendering[path])
+
+    async def _render(self, path: str) -> tuple[str, Optional[bytes]]:
+        """Render and return the response to path, caching it unless path is unknown."""
+        executor, responses, version = self._executor, self._responses, self.version
+        rendering = self._rendering
+        try:
+            body = await asyncio.get_running_loop().run_in_executor(executor, render, path)
+        finally:
+            # A reload may have started another rendering of path in the meantime
+            if rendering.get(path) is asyncio.current_task():
+                del rendering[path]
+
+        digest = hashlib.sha256(body or b'').hexdigest()[:32]
+        response = (f'"{version}-{digest}"', body)
+        if body is not None:
+            responses[path] = response
+        return response
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Answer the requests of one connection until it is closed."""
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, path, headers = request
+                closing = headers.get('connection', '').lower() == 'close'
+                await self._answer(writer, method, path, headers, closing)
+                if closing:
+                    break
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+            pass  # The connection was lost, or the request was malformed
+        finally:
+            writer.close()
+
+    async def _answer(self, writer: asyncio.StreamWriter, method: str, path: str,
+                      headers: dict[str, str], closing: bool = False) -> None:
+        """Write the response to one request, telling the client that the connection is closed
+        after it if closing is True."""
+        extra_headers = {'Connection': 'close'} if closing else {}
+
+        if method not in {'GET', 'HEAD'}:
+            await _write_response(writer, 405, _error_body('only GET and HEAD are supported'),
+                                  {'Allow': 'GET, HEAD', **extra_headers})
+            return
+
+        try:
+            etag, body = await self.response(path.split('?', 1)[0])
+        except Exception as error:  # The rendering failed in the worker process
+            await _write_response(writer, 500, _error_body(repr(error)), extra_headers)
+            return
+
+        if body is None:
+            await _write_response(writer, 404, _error_body(f'no such endpoint: {path}'),
+                                  extra_headers)
+        elif etag in {tag.strip() for tag in headers.get('if-none-match', '').split(',')}:
+            await _write_response(writer, 304, None, {'ETag': etag, **extra_headers})
+        else:
+            await _write_response(writer, 200, body,
+                                  {'ETag': etag, 'Cache-Control': 'no-cache', **extra_headers},
+                                  head=method == 'HEAD')
+
+
+def _load_aggregates(reload: bool) -> tuple[CountCube, dict[tuple[str, int, int], int]]:
+    """Load the data sets, again if reload is True, and return their hate crime CountCube and
+    covid monthly totals."""
+    import main as project
+    if reload:
+        project.reload_datasets()
+    project.load_datasets()
+    return (hate_crime.count_cube(project.get_hate_crime_data()),
+            covid_dataclass.monthly_totals(project.get_covid_data()))
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Optional[tuple[str, str, dict]]:
+    """Return the method, path and lower-cased headers of the next request read from reader, or
+    None if the connection was closed before a new request."""
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except asyncio.IncompleteReadError as error:
+        if error.partial.strip() == b'':
+            return None
+        raise
+    except asyncio.LimitOverrunError:
+        raise ConnectionError('request head too large')
+
+    lines = head.decode('latin-1').split('\r\n')
+    request_line = lines[0].split()
+    if len(request_line) != 3:
+        raise ConnectionError('malformed request line')
+
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        if name:
+            headers[name.strip().lower()] = value.strip()
+
+    # Request bodies are not used by any endpoint, but are read to keep the connection usable
+    if int(headers.get('content-length', 0) or 0) > 0:
+        await reader.readexactly(int(headers['content-length']))
+
+    return (request_line[0].upper(), request_line[1], headers)
+
+
+async def _write_response(writer: asyncio.StreamWriter, status: int, body: Optional[bytes],
+                          headers: Optional[dict[str, str]] = None, head: bool = False) -> None:
+    """Write a response with the given status, json body and extra headers to writer, without
+    the body if head is True."""
+    lines = [f'HTTP/1.1 {status} {_REASONS[status]}']
+    for name, value in (headers or {}).items():
+        lines.append(f'{name}: {value}')
+    if body is not None:
+        lines.append('Content-Type: application/json')
+        lines.append(f'Content-Length: {len(body)}')
+    elif status != 304:
+        lines.append('Content-Length: 0')
+
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+    if body is not None and not head:
+        writer.write(body)
+    await writer.drain()
+
+
+def _error_body(message: str) -> bytes:
+    """Return the json body of an error response with the given message."""
+    return json.dumps({'error': message}).encode()
+
+
+async def serve(host: str = '127.0.0.1', port: int = 8110, workers: Optional[int] = None) -> None:
+    """Load the data sets and serve requests on host and port until cancelled."""
+    service = Service(workers)
+    await service.load()
+    server = await asyncio.start_server(service.handle, host, port, limit=_MAX_HEAD_SIZE)
+
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main(arguments: Optional[list[str]] = None) -> None:
+    """Run the service with the options given as command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on')
+    parser.add_argument('--port', type=int, default=8110, help='port to listen on')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of worker processes (default: one per cpu)')
+    options = parser.parse_args(arguments)
+
+    try:
+        asyncio.run(serve(options.host, options.port, options.workers))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'extra-imports': ['validation', 'argparse', 'asyncio', 'concurrent.futures', 'hashlib',
+                          'json', 'multiprocessing', 'typing', 'covid_dataclass',
+                          'covid_to_hate_crime_relationship', 'creating_graphs', 'hate_crime',
+                          'map', 'main'],
+        'disable': ['R1705']
+    })
+
+    import validation
+
+    validation.check_contracts()
+
+    main()
@@ -0,0 +1,308 @@
+"""CSC110 Project: The Hidden Correlation Between Covid-19 and Hate Crimes in the United States
+
+Module Description
+==================
+This module contains functions to save the parsed hate crime and covid data sets as binary
+snapshots, so that they do not have to be parsed from the text csv files on every start.
+
+A snapshot of a source file is one .npy array per column, memory-mapped when it is loaded, and
+a json manifest. The manifest records the size, modification time and sha256 hash of the source
+file the snapshot was built from. A snapshot is rebuilt automatically as soon as its source file
+changes.
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import hashlib
+import json
+import os
+from typing import Callable, Iterator, Optional, Union
+
+import numpy as np
+
+from atomic_file import replace_file
+from categories import CategoricalColumn, read_categories
+from covid_dataclass import CovidData
+from covid_metrics import read_metrics
+from hate_crime import HateCrime
+from instrumentation import counted
+from parallel_reader import read_hate_crime_store
+from record_store import CovidStore, HateCrimeStore
+
+# Increase whenever the layout of a snapshot or the way its source file is parsed changes, so that
+# old snapshots are rebuilt
+SNAPSHOT_VERSION = 2
+
+# The default directory the snapshots are stored in, relative to the source file
+SNAPSHOT_DIRECTORY = '.snapshots'
+
+
+###############################################################################
+# Loading the data sets through their snapshots
+###############################################################################
+@counted
+def load_hate_crime_store(filename: str = 'hate_crime.zip',
+                          snapshot_dir: Optional[str] = None) -> HateCrimeStore:
+    """Return the hate crime data set in filename as a store, backed by the memory-mapped arrays
+    of its snapshot if the snapshot is up to date, or by parsing filename and saving a new
+    snapshot otherwise.
+
+    filename may be either hate_crime.csv or a zip archive containing it.
+
+    Preconditions:
+        - filename refers to a valid hate crime csv file or zip archive
+    """
+    def parse() -> tuple[dict, dict[str, np.ndarray]]:
+        store = read_hate_crime_store(filename)
+        return ({'headers': store.headers, 'states': list(store.states)},
+                {'incident_ids': store.incident_ids, 'state_codes': store.state_codes,
+                 'date_ordinals': store.date_ordinals})
+
+    metadata, arrays = _load_snapshot(filename, snapshot_dir, 'hate_crime', parse)
+    return HateCrimeStore(metadata['headers'], tuple(metadata['states']),
+                          arrays['incident_ids'], arrays['state_codes'], arrays['date_ordinals'])
+
+
+def load_hate_crime_data(filename: str = 'hate_crime.zip',
+                         snapshot_dir: Optional[str] = None) -> tuple[list[str], list[HateCrime]]:
+    """Return the headers and data of the hate crime data set in filename, in the same format as
+    hate_crime.read_csv_file, using its snapshot where possible.
+
+    Preconditions:
+        - filename refers to a valid hate crime csv file or zip archive
+    """
+    store = load_hate_crime_store(filename, snapshot_dir)
+    return (store.headers, store.records())
+
+
+@counted
+def load_covid_store(filename: str = 'all-states-history.csv',
+                     snapshot_dir: Optional[str] = None) -> CovidStore:
+    """Return the covid data set in filename as a store, backed by the memory-mapped arrays of its
+    snapshot if the snapshot is up to date, or by parsing filename and saving a new snapshot
+    otherwise.
+
+    Preconditions:
+        - filename refers to a valid covid csv file with headers
+    """
+    def parse() -> tuple[dict, dict[str, np.ndarray]]:
+        store = read_metrics(filename).store()
+        return ({'states': list(store.states)},
+                {'date_ordinals': store.date_ordinals, 'state_codes': store.state_codes,
+                 'cases': store.cases})
+
+    metadata, arrays = _load_snapshot(filename, snapshot_dir, 'covid', parse)
+    return CovidStore(tuple(metadata['states']), arrays['date_ordinals'], arrays['state_codes'],
+                      arrays['cases'])
+
+
+def load_covid_data(filename: str = 'all-states-history.csv',
+                    snapshot_dir: Optional[str] = None) -> list[CovidData]:
+    """Return the covid data set in filename, in the same format as covid_dataclass.read_csv_file,
+    using its snapshot where possible.
+
+    Preconditions:
+        - filename refers to a valid covid csv file with headers
+    """
+    return load_covid_store(filename, snapshot_dir).records()
+
+
+@counted
+def load_hate_crime_categories(filename: str = 'hate_crime.zip',
+                               snapshot_dir: Optional[str] = None) \
+        -> dict[str, CategoricalColumn]:
+    """Return every categorical column of categories.CATEGORY_COLUMNS of the hate crime data set
+    in filename, backed by the memory-mapped arrays of its snapshot if the snapshot is up to date,
+    or by parsing filename and saving a new snapshot otherwise.
+
+    The rows of the columns are those of load_hate_crime_store(filename), in the same order.
+
+    Preconditions:
+        - filename refers to a valid hate crime csv file or zip archive
+    """
+    def parse() -> tuple[dict, dict[str, np.ndarray]]:
+        columns = read_categories(filename)
+        return ({name: list(column.categories) for name, column in columns.items()},
+                {f'{name}_{array}': getattr(column, array)
+                 for name, column in columns.items() for array in ('offsets', 'codes')})
+
+    metadata, arrays = _load_snapshot(filename, snapshot_dir, 'hate_crime_categories', parse)
+    return {name: CategoricalColumn(name, tuple(categories), arrays[f'{name}_offsets'],
+                                    arrays[f'{name}_codes'])
+            for name, categories in metadata.items()}
+
+
+# The loaders of the data sets, keyed by the kind of their snapshots
+LOADERS = {'hate_crime': load_hate_crime_store, 'covid': load_covid_store}
+
+
+def load_stores(sources: dict[str, str], snapshot_dir: Optional[str] = None) \
+        -> Iterator[tuple[str, Union[HateCrimeStore, CovidStore]]]:
+    """Yield a (kind, store) tuple for every kind of LOADERS mapped to a filename in sources, as
+    soon as that data set is loaded.
+
+    The data sets with up to date snapshots are loaded first. When several data sets have to be
+    parsed, they are parsed at the same time in separate processes, each of which saves a
+    snapshot that is then loaded here. An error raised while parsing any data set is raised
+    here, and the data sets that were not parsed yet are abandoned.
+
+    Preconditions:
+        - all(kind in LOADERS for kind in sources)
+    """
+    stale = {kind: filename for kind, filename in sources.items()
+             if not snapshot_is_up_to_date(filename, kind, snapshot_dir)}
+
+    for kind, filename in sources.items():
+        if kind not in stale or len(stale) == 1:
+            yield (kind, LOADERS[kind](filename, snapshot_dir))
+
+    if len(stale) > 1:
+        with ProcessPoolExecutor(len(stale)) as executor:
+            futures = {executor.submit(_save_snapshot, kind, filename, snapshot_dir): kind
+                       for kind, filename in stale.items()}
+            try:
+                for future in as_completed(futures):
+                    future.result()
+                    kind = futures[future]
+                    yield (kind, LOADERS[kind](stale[kind], snapshot_dir))
+            finally:
+                for future in futures:
+                    future.cancel()
+
+
+def _save_snapshot(kind: str, filename: str, snapshot_dir: Optional[str]) -> None:
+    """Parse the data set of the given kind in filename and save its snapshot, unless it is
+    already up to date."""
+    LOADERS[kind](filename, snapshot_dir)
+
+
+def snapshot_is_up_to_date(filename: str, kind: str, snapshot_dir: Optional[str] = None) -> bool:
+    """Return whether the data set of the given kind in filename has an up to date snapshot."""
+    prefix = _snapshot_prefix(filename, snapshot_dir, kind)
+    manifest = _read_manifest(prefix + '.json')
+    return manifest is not None and _is_up_to_date(manifest, filename, prefix)
+
+
+###############################################################################
+# Reading and writing snapshots
+###############################################################################
+def source_fingerprint(filename: str) -> dict[str, int | str]:
+    """Return the size, modification time and sha256 hash of the file with the given filename."""
+    stat = os.stat(filename)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': _file_sha256(filename)}
+
+
+def _file_sha256(filename: str) -> str:
+    """Return the hex sha256 digest of the contents of the file with the given filename."""
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _load_snapshot(filename: str, snapshot_dir: Optional[str], kind: str,
+                   parse: Callable[[], tuple[dict, dict[str, np.ndarray]]]) \
+        -> tuple[dict, dict[str, np.ndarray]]:
+    """Return the metadata and memory-mapped arrays of the snapshot of filename, first calling
+    parse and saving its result as a new snapshot if there is no up to date snapshot.
+
+    kind names the data set, so that different data sets parsed from the same file never share a
+    snapshot.
+    """
+    prefix = _snapshot_prefix(filename, snapshot_dir, kind)
+    snapshot_dir = os.path.dirname(prefix)
+
+    manifest = _read_manifest(prefix + '.json')
+    if manifest is not None and _is_up_to_date(manifest, filename, prefix):
+        try:
+            arrays = {name: np.load(os.path.join(snapshot_dir, array_file), mmap_mode='r')
+                      for name, array_file in manifest['arrays'].items()}
+            return (manifest['metadata'], arrays)
+        except (OSError, ValueError):
+            pass  # A damaged or partially deleted snapshot is rebuilt below
+
+    fingerprint = source_fingerprint(filename)
+    metadata, arrays = parse()
+
+    # The array files are named after the hash of their source, so that a process still reading
+    # an older manifest never opens arrays built from a different version of the source
+    os.makedirs(snapshot_dir, exist_ok=True)
+    array_files = {name: f'{os.path.basename(prefix)}.{fingerprint["sha256"][:16]}.{name}.npy'
+                   for name in arrays}
+    for name, array in arrays.items():
+        replace_file(os.path.join(snapshot_dir, array_files[name]),
+                      lambda file, a=array: np.save(file, a))
+    _write_manifest(prefix + '.json', {'version': SNAPSHOT_VERSION, 'source': fingerprint,
+                                       'metadata': metadata, 'arrays': array_files})
+
+    if manifest is not None and isinstance(manifest.get('arrays'), dict):
+        for array_file in set(manifest['arrays'].values()) - set(array_files.values()):
+            try:
+                os.remove(os.path.join(snapshot_dir, array_file))
+            except OSError:
+                pass  # Already removed by another process
+
+    return (metadata, arrays)
+
+
+def _snapshot_prefix(filename: str, snapshot_dir: Optional[str], kind: str) -> str:
+    """Return the path, without an extension, of the manifest of the snapshot of the data set of
+    the given kind in filename."""
+    if snapshot_dir is None:
+        snapshot_dir = os.path.join(os.path.dirname(os.path.abspath(filename)), SNAPSHOT_DIRECTORY)
+    return os.path.join(snapshot_dir, f'{os.path.basename(filename)}.{kind}')
+
+
+def _is_up_to_date(manifest: dict, filename: str, prefix: str) -> bool:
+    """Return whether the snapshot with the given manifest was built from the current contents
+    of filename.
+
+    The source file is only hashed when its size or modification time differ from the ones in the
+    manifest. If the contents turn out to be unchanged, the manifest is updated with the new
+    modification time so that the file does not have to be hashed again.
+    """
+    if manifest.get('version') != SNAPSHOT_VERSION:
+        return False
+
+    stat = os.stat(filename)
+    source = manifest['source']
+    if stat.st_size != source['size']:
+        return False
+    elif stat.st_mtime_ns == source['mtime_ns']:
+        return True
+    elif _file_sha256(filename) != source['sha256']:
+        return False
+
+    _write_manifest(prefix + '.json', {**manifest,
+                                       'source': {**source, 'mtime_ns': stat.st_mtime_ns}})
+    return True
+
+
+def _read_manifest(path: str) -> Optional[dict]:
+    """Return the manifest stored at path, or None if there is no readable manifest."""
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_manifest(path: str, manifest: dict) -> None:
+    """Write manifest to path."""
+    replace_file(path, lambda file: file.write(json.dumps(manifest).encode()))
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'extra-imports': ['validation', 'concurrent.futures', 'hashlib', 'json', 'os', 'typing',
+                          'numpy', 'atomic_file', 'categories', 'covid_dataclass', 'covid_metrics',
+                          'hate_crime', 'instrumentation', 'parallel_reader', 'record_store'],
+        'allowed-io': ['_file_sha256', '_read_manifest'],
+        'disable': ['R1705']
+    })
+
+    import validation
+
+    validation.check_contracts()
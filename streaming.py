@@ -0,0 +1,245 @@
+"""CSC110 Project: The Hidden Correlation Between Covid-19 and Hate Crimes in the United States
+
+Module Description
+==================
+This module contains a streaming mode that aggregates hate crime and covid data sets too large to
+be held in memory, possibly split over several files, such as multi-year FBI extracts or
+county-level covid files.
+
+The records of every file are read by a generator and grouped into chunks of a fixed number of
+rows. Every chunk is turned into a record store, aggregated, and dropped before the next chunk is
+read, so the memory used depends on the chunk size and the number of states, years and months,
+but not on the size of the input. The hate crime chunks are summed into a single
+hate_crime.CountCube, from which the percent differences of calculate_percent_difference and
+the series of creating_graphs.cube_data_by_month and cube_data_by_year are read, and the covid
+chunks are summed into monthly totals in the format of covid_dataclass.monthly_totals.
+
+Run this module as a script, e.g.
+python streaming.py --hate-crime hate_crime_1999.csv hate_crime_2020.zip --covid covid.csv
+"""
+import argparse
+from contextlib import contextmanager
+import csv
+import datetime
+import io
+from itertools import islice
+from typing import Iterable, Iterator, Optional, TextIO
+import zipfile
+
+import numpy as np
+
+import covid_dataclass
+import covid_metrics
+import hate_crime
+from hate_crime import CountCube
+from record_store import CovidStore, HateCrimeStore
+
+# The default number of rows read into memory at a time
+CHUNK_SIZE = 1 << 16
+
+
+###############################################################################
+# Reading the files in chunks
+###############################################################################
+@contextmanager
+def _open_csv(filename: str) -> Iterator[TextIO]:
+    """Open filename for reading as text, or the first csv member of filename if it is a zip
+    archive."""
+    if not filename.endswith('.zip'):
+        with open(filename, newline='') as file:
+            yield file
+        return
+
+    with zipfile.ZipFile(filename) as archive:
+        member = next(name for name in archive.namelist() if name.endswith('.csv'))
+        with archive.open(member) as raw:
+            yield io.TextIOWrapper(raw, encoding='utf-8', newline='')
+
+
+def hate_crime_chunks(filenames: Iterable[str],
+                      chunk_size: int = CHUNK_SIZE) -> Iterator[HateCrimeStore]:
+    """Yield the hate crime records of the given files as stores of at most chunk_size rows, in
+    the order of the files.
+
+    Every file may be either a hate crime csv file or a zip archive containing one.
+
+    Preconditions:
+        - every filename refers to a valid hate crime csv file or zip archive
+        - chunk_size >= 1
+    """
+    for filename in filenames:
+        with _open_csv(filename) as file:
+            reader = csv.reader(file)
+            headers = next(reader)
+            headers = [headers[0], headers[6], headers[12]]  # The columns kept by iter_records
+            records = hate_crime.iter_records(reader)
+
+            while True:
+                chunk = list(islice(records, chunk_size))
+                if chunk == []:
+                    break
+                yield HateCrimeStore.from_records(headers, chunk)
+
+
+def covid_chunks(filenames: Iterable[str], metric: str = covid_metrics.DEFAULT_METRIC,
+                 start: datetime.date = datetime.date(2020, 1, 1),
+                 end: datetime.date = datetime.date(2021, 1, 1),
+                 chunk_size: int = CHUNK_SIZE) -> Iterator[CovidStore]:
+    """Yield the rows of the given covid csv files whose date is from start up to but not
+    including end as stores of at most chunk_size rows of the given metric, in the order of the
+    files.
+
+    The date, state and metric columns are found by their headers, so the files may have
+    different columns. In a file whose first column is its date column, rows outside the date
+    range are rejected from the start of their line, before the line is split into fields, like
+    covid_metrics.read_metrics; in any other file they are rejected after the split.
+
+    Preconditions:
+        - every filename refers to a valid covid csv file with date, state and metric headers
+        - the dates of every file are in yyyy-mm-dd format, and no field holds a line break
+        - chunk_size >= 1
+    """
+    first, last = start.isoformat(), end.isoformat()
+
+    for filename in filenames:
+        with _open_csv(filename) as file:
+            headers = next(csv.reader([file.readline()]))
+            date_column = headers.index('date')
+
+            if date_column == 0:
+                # An ISO date string compares like its date
+                rows = csv.reader(line for line in file if first <= line[:10] < last)
+            else:
+                rows = (row for row in csv.reader(file) if first <= row[date_column] < last)
+
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if chunk == []:
+                    break
+                yield covid_metrics.metrics_from_rows(headers, chunk, [metric]).store(metric)
+
+
+###############################################################################
+# Aggregating the chunks
+###############################################################################
+def stream_count_cube(filenames: Iterable[str], chunk_size: int = CHUNK_SIZE) -> CountCube:
+    """Return the CountCube of the hate crime incidents of all the given files, reading at most
+    chunk_size records into memory at a time.
+
+    The cube equals hate_crime.count_cube of all the records of the files in a single list.
+
+    Preconditions:
+        - every filename refers to a valid hate crime csv file or zip archive
+        - chunk_size >= 1
+    """
+    cube = hate_crime.count_cube_from_arrays(hate_crime.STATE_CODES, np.zeros(0, dtype=np.int64),
+                                             np.zeros(0, dtype=np.int64))
+    for chunk in hate_crime_chunks(filenames, chunk_size):
+        cube = add_cubes(cube, hate_crime.build_count_cube(chunk))
+    return cube
+
+
+def add_cubes(cube1: CountCube, cube2: CountCube) -> CountCube:
+    """Return the CountCube of the incidents of both cube1 and cube2, covering the states and
+    years of both."""
+    states = hate_crime.state_codes_for(set(cube1.states) | set(cube2.states))
+    first_year = min(cube1.first_year, cube2.first_year)
+    last_year = max(cube.first_year + cube.counts.shape[1] - 1 for cube in (cube1, cube2))
+
+    counts = np.zeros((len(states), last_year - first_year + 1, 12), dtype=np.int64)
+    state_index = {state: code for code, state in enumerate(states)}
+    for cube in (cube1, cube2):
+        codes = [state_index[state] for state in cube.states]
+        start = cube.first_year - first_year
+        counts[codes, start:start + cube.counts.shape[1]] += cube.counts
+
+    return CountCube(states, state_index, first_year, counts, counts.sum(axis=2))
+
+
+def stream_monthly_totals(filenames: Iterable[str], metric: str = covid_metrics.DEFAULT_METRIC,
+                          chunk_size: int = CHUNK_SIZE) -> dict[tuple[str, int, int], int]:
+    """Return a dictionary mapping (state, year, month) tuples to the total of the given metric
+    in that state and month in 2020 over all the given covid files, reading at most chunk_size
+    rows into memory at a time.
+
+    For a single file, the totals equal covid_dataclass.monthly_totals of its data set. Rows of
+    several files for the same state and day (e.g. of different counties) are added up.
+
+    Preconditions:
+        - every filename refers to a valid covid csv file with date, state and metric headers
+        - chunk_size >= 1
+    """
+    totals = {}
+    for chunk in covid_chunks(filenames, metric, chunk_size=chunk_size):
+        for key, total in covid_dataclass.build_monthly_totals(chunk).items():
+            totals[key] = totals.get(key, 0) + total
+    return totals
+
+
+def stream_percent_difference(filenames: Iterable[str], chunk_size: int = CHUNK_SIZE) \
+        -> dict[str, list[float, int, int]]:
+    """Return the percent differences of hate_crime.calculate_percent_difference of the hate
+    crime incidents of all the given files, reading at most chunk_size records into memory at a
+    time.
+
+    Preconditions:
+        - every filename refers to a valid hate crime csv file or zip archive
+        - chunk_size >= 1
+    """
+    return hate_crime.cube_percent_difference(stream_count_cube(filenames, chunk_size),
+                                              hate_crime.STATES)
+
+
+def monthly_totals_to_csv(totals: dict[tuple[str, int, int], int],
+                          filename: str = 'covid_monthly_totals.csv') -> None:
+    """Write the monthly totals returned by stream_monthly_totals to a csv file with the given
+    filename."""
+    with open(filename, 'w', newline='') as totals_file:
+
+        writer = csv.writer(totals_file)
+        writer.writerow(['State', 'Year', 'Month', 'Total'])
+        for (state, year, month), total in sorted(totals.items()):
+            writer.writerow([state, year, month, total])
+
+
+def main(arguments: Optional[list[str]] = None) -> None:
+    """Write the percent differences of the hate crime files, and the monthly covid totals of the
+    covid files, given as command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--hate-crime', nargs='+', default=['hate_crime.zip'],
+                        help='hate crime csv files or zip archives (default: hate_crime.zip)')
+    parser.add_argument('--covid', nargs='*', default=[], help='covid csv files')
+    parser.add_argument('--metric', default=covid_metrics.DEFAULT_METRIC,
+                        help='covid metric to total (default: positiveIncrease)')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                        help='number of rows read into memory at a time')
+    parser.add_argument('--output', default='percent_diff.csv',
+                        help='csv file of the percent differences to write')
+    parser.add_argument('--covid-output', default='covid_monthly_totals.csv',
+                        help='csv file of the monthly covid totals to write')
+    options = parser.parse_args(arguments)
+
+    hate_crime.to_csv(stream_percent_difference(options.hate_crime, options.chunk_size),
+                      options.output)
+    if options.covid:
+        monthly_totals_to_csv(stream_monthly_totals(options.covid, options.metric,
+                                                    options.chunk_size), options.covid_output)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'extra-imports': ['validation', 'argparse', 'contextlib', 'csv', 'datetime', 'io',
+                          'itertools', 'typing', 'zipfile', 'numpy', 'covid_dataclass',
+                          'covid_metrics', 'hate_crime', 'record_store'],
+        'allowed-io': ['_open_csv', 'monthly_totals_to_csv'],
+        'disable': ['R1705']
+    })
+
+    import validation
+
+    validation.check_contracts()
+
+    main()
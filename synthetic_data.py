@@ -0,0 +1,122 @@
+"""CSC110 Project: The Hidden Correlation Between Covid-19 and Hate Crimes in the United States
+
+Module Description
+==================
+This module contains functions to generate synthetic hate crime and covid csv files in the same
+format as hate_crime.csv and all-states-history.csv, with any number of rows.
+
+The generated data is random but reproducible: the same seed and number of rows always give the
+same file.
+"""
+import csv
+import datetime
+import random
+
+from hate_crime import STATE_CODES
+
+# The number of data rows of hate_crime.csv and all-states-history.csv
+HATE_CRIME_ROWS = 162010
+COVID_ROWS = 20780
+
+HATE_CRIME_HEADERS = [
+    'INCIDENT_ID', 'DATA_YEAR', 'ORI', 'PUB_AGENCY_NAME', 'PUB_AGENCY_UNIT', 'AGENCY_TYPE_NAME',
+    'STATE_ABBR', 'STATE_NAME', 'DIVISION_NAME', 'REGION_NAME', 'POPULATION_GROUP_CODE',
+    'POPULATION_GROUP_DESC', 'INCIDENT_DATE', 'ADULT_VICTIM_COUNT', 'JUVENILE_VICTIM_COUNT',
+    'TOTAL_OFFENDER_COUNT', 'ADULT_OFFENDER_COUNT', 'JUVENILE_OFFENDER_COUNT', 'OFFENDER_RACE',
+    'OFFENDER_ETHNICITY', 'VICTIM_COUNT', 'OFFENSE_NAME', 'TOTAL_INDIVIDUAL_VICTIMS',
+    'LOCATION_NAME', 'BIAS_DESC', 'VICTIM_TYPES', 'MULTIPLE_OFFENSE', 'MULTIPLE_BIAS']
+
+COVID_HEADERS = [
+    'date', 'state', 'death', 'deathConfirmed', 'deathIncrease', 'deathProbable', 'hospitalized',
+    'hospitalizedCumulative', 'hospitalizedCurrently', 'hospitalizedIncrease', 'inIcuCumulative',
+    'inIcuCurrently', 'negative', 'negativeIncrease', 'negativeTestsAntibody',
+    'negativeTestsPeopleAntibody', 'negativeTestsViral', 'onVentilatorCumulative',
+    'onVentilatorCurrently', 'positive', 'positiveCasesViral', 'positiveIncrease',
+    'positiveScore', 'positiveTestsAntibody', 'positiveTestsAntigen',
+    'positiveTestsPeopleAntibody', 'positiveTestsPeopleAntigen', 'positiveTestsViral',
+    'recovered', 'totalTestEncountersViral', 'totalTestEncountersViralIncrease',
+    'totalTestResults', 'totalTestResultsIncrease', 'totalTestsAntibody', 'totalTestsAntigen',
+    'totalTestsPeopleAntibody', 'totalTestsPeopleAntigen', 'totalTestsPeopleViral',
+    'totalTestsPeopleViralIncrease', 'totalTestsViral', 'totalTestsViralIncrease']
+
+# Abbreviations other than the 50 states that appear in the real data sets
+_OTHER_HATE_CRIME_STATES = ('DC', 'FS', 'NB')
+_OTHER_COVID_STATES = ('DC', 'PR', 'GU')
+
+_POPULATION_GROUPS = ('Cities from 250,000 thru 499,999', 'Cities from 10,000 thru 24,999',
+                      'Cities under 2,500', 'MSA counties 100,000 or over')
+_OFFENSES = ('Intimidation', 'Simple Assault', 'Aggravated Assault',
+             'Destruction/Damage/Vandalism of Property')
+_LOCATIONS = ('Residence/Home', 'Highway/Road/Alley/Street/Sidewalk', 'Other/Unknown',
+              'School-College/University')
+_BIASES = ('Anti-Black or African American', 'Anti-Jewish', 'Anti-White',
+           'Anti-Gay (Male)', 'Anti-Asian', 'Anti-Hispanic or Latino')
+
+
+def write_hate_crime_csv(filename: str, num_rows: int = HATE_CRIME_ROWS, seed: int = 0) -> None:
+    """Write a synthetic hate crime csv file with the given number of data rows to filename.
+
+    Like hate_crime.csv, the incidents are dated from 1999 to 2020, some rows use 'NB' for
+    Nebraska, and some fields are quoted because they contain commas.
+
+    Preconditions:
+        - num_rows >= 0
+    """
+    rng = random.Random(seed)
+    states = STATE_CODES + _OTHER_HATE_CRIME_STATES
+    first_day = datetime.date(1999, 1, 1).toordinal()
+    num_days = datetime.date(2020, 12, 31).toordinal() - first_day + 1
+
+    with open(filename, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(HATE_CRIME_HEADERS)
+        for incident_id in range(1, num_rows + 1):
+            date = datetime.date.fromordinal(first_day + rng.randrange(num_days))
+            state = rng.choice(states)
+            writer.writerow([
+                incident_id, date.year, f'{state}0010100', 'Agency, ' + state, '', 'City',
+                state, '', '', '', '1C', rng.choice(_POPULATION_GROUPS), date.isoformat(),
+                '', '', rng.randrange(4), '', '', 'Unknown', '', 1, rng.choice(_OFFENSES), 1,
+                rng.choice(_LOCATIONS), ';'.join(rng.sample(_BIASES, rng.choice((1, 1, 2)))),
+                'Individual', 'S', 'S'])
+
+
+def write_covid_csv(filename: str, num_rows: int = COVID_ROWS, seed: int = 0) -> None:
+    """Write a synthetic covid csv file with the given number of data rows to filename.
+
+    Like all-states-history.csv, most rows are dated in 2020, a few in early 2021, and the
+    positiveIncrease column is sometimes empty.
+
+    Preconditions:
+        - num_rows >= 0
+    """
+    rng = random.Random(seed)
+    states = STATE_CODES + _OTHER_COVID_STATES
+    first_day = datetime.date(2020, 1, 13).toordinal()
+    num_days = datetime.date(2021, 3, 7).toordinal() - first_day + 1
+    positive_increase = COVID_HEADERS.index('positiveIncrease')
+
+    with open(filename, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(COVID_HEADERS)
+        row = [''] * len(COVID_HEADERS)
+        for _ in range(num_rows):
+            row[0] = datetime.date.fromordinal(first_day + rng.randrange(num_days)).isoformat()
+            row[1] = rng.choice(states)
+            row[positive_increase] = '' if rng.random() < 0.02 else rng.randrange(5000)
+            writer.writerow(row)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'extra-imports': ['validation', 'csv', 'datetime', 'random', 'hate_crime'],
+        'allowed-io': ['write_hate_crime_csv', 'write_covid_csv'],
+        'disable': ['R1705']
+    })
+
+    import validation
+
+    validation.check_contracts()
@@ -0,0 +1,6 @@
+"""Configuration of the tests: the modules of the project are imported from the parent
+directory."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,46 @@
+"""Tests of the caches of hate_crime.count_cube and covid_dataclass.monthly_totals."""
+import datetime
+import gc
+
+import covid_dataclass
+from covid_dataclass import CovidData
+import hate_crime
+from hate_crime import HateCrime
+from record_store import CovidStore, HateCrimeStore
+
+
+def test_count_cube_of_list_edited_in_place() -> None:
+    """The counts of a list whose records are edited in place are never stale."""
+    data = [HateCrime(1, 'AL', datetime.date(2020, 1, 5))]
+    assert hate_crime.num_instances_by_month(data, 'AL', 2020, 1) == 1
+
+    data[0].state_abbr = 'NE'
+    assert hate_crime.num_instances_by_month(data, 'AL', 2020, 1) == 0
+    assert hate_crime.num_instances_by_month(data, 'NE', 2020, 1) == 1
+    assert hate_crime.num_instances_by_year(data, 'NE', 2020) == 1
+
+
+def test_monthly_totals_of_list_edited_in_place() -> None:
+    """The totals of a list whose rows are edited in place are never stale."""
+    data = [CovidData(datetime.date(2020, 1, 5), 'AL', 3)]
+    assert covid_dataclass.cases_by_month(data, 1, 'AL').cases == 3
+
+    data[0].cases = 7
+    assert covid_dataclass.cases_by_month(data, 1, 'AL').cases == 7
+
+
+def test_caches_do_not_keep_stores_alive() -> None:
+    """The aggregates of record stores are cached without keeping the stores alive."""
+    hate_crime_store = HateCrimeStore.from_records(
+        [], [HateCrime(1, 'AL', datetime.date(2020, 1, 5))])
+    covid_store = CovidStore.from_records([CovidData(datetime.date(2020, 1, 5), 'AL', 3)])
+
+    assert hate_crime.count_cube(hate_crime_store) is hate_crime.count_cube(hate_crime_store)
+    assert covid_dataclass.monthly_totals(covid_store) is \
+        covid_dataclass.monthly_totals(covid_store)
+
+    cached = len(hate_crime._STORE_CUBES), len(covid_dataclass._STORE_TOTALS)
+    del hate_crime_store, covid_store
+    gc.collect()
+    assert (len(hate_crime._STORE_CUBES), len(covid_dataclass._STORE_TOTALS)) == \
+        (cached[0] - 1, cached[1] - 1)
@@ -0,0 +1,18 @@
+"""Tests of correlation."""
+import numpy as np
+
+import correlation
+
+
+def test_zero_variance_series_has_nan_statistics() -> None:
+    """A series without any variance has an undefined correlation, so its confidence interval and
+    p-value are nan rather than the smallest possible p-value."""
+    x = np.array([np.arange(1, 13), np.arange(1, 13)], dtype=np.float64)
+    y = np.array([np.zeros(12), np.arange(1, 13) ** 2], dtype=np.float64)
+
+    statistics = correlation.correlation_statistics(x, y, resamples=200, permutations=200,
+                                                    workers=1)
+
+    assert np.isnan(statistics[:, 0]).all()
+    assert not np.isnan(statistics[:, 1]).any()
+    assert statistics[0, 1, 3] < 0.05
@@ -0,0 +1,42 @@
+"""Tests of the import-time budget of main."""
+import os
+import subprocess
+import sys
+
+# The largest cumulative time that importing main may take, in microseconds
+IMPORT_BUDGET = 300_000
+
+PROJECT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _import_times(statement: str) -> dict[str, int]:
+    """Return a mapping from every module imported by running statement in a new interpreter to
+    its cumulative import time in microseconds, as reported by python -X importtime."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                            cwd=PROJECT_DIRECTORY, capture_output=True, text=True, check=True)
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, name = line[len('import time:'):].split('|')
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_import_main_skips_plotting_libraries() -> None:
+    """Importing main imports neither plotly nor pandas."""
+    modules = _import_times('import main')
+    assert 'main' in modules
+    assert not any(name.split('.')[0] in {'plotly', 'pandas'} for name in modules)
+
+
+def test_import_main_within_budget() -> None:
+    """Importing main takes at most IMPORT_BUDGET microseconds."""
+    assert _import_times('import main')['main'] <= IMPORT_BUDGET
+
+
+def test_import_main_loads_no_data_set() -> None:
+    """Importing main parses neither data set."""
+    subprocess.run([sys.executable, '-c', 'import main; assert main._datasets == {}'],
+                   cwd=PROJECT_DIRECTORY, check=True)
@@ -0,0 +1,74 @@
+"""Tests of incremental."""
+import csv
+import io
+import zipfile
+
+import numpy as np
+import pytest
+
+import incremental
+
+
+def _hate_crime_rows(count: int) -> list[list[str]]:
+    """Return the header and the first count rows of hate_crime.csv in hate_crime.zip."""
+    with zipfile.ZipFile('hate_crime.zip') as archive, archive.open('hate_crime.csv') as raw:
+        reader = csv.reader(io.TextIOWrapper(raw, encoding='utf-8', newline=''))
+        return [row for _, row in zip(range(count + 1), reader)]
+
+
+def _covid_rows(count: int) -> list[list[str]]:
+    """Return the header and the first count rows of all-states-history.csv."""
+    with open('all-states-history.csv', newline='') as file:
+        return [row for _, row in zip(range(count + 1), csv.reader(file))]
+
+
+def _write(filename: str, rows: list[list[str]]) -> None:
+    """Write rows to the csv file with the given filename, or to hate_crime.csv in a zip archive
+    with that filename."""
+    text = io.StringIO(newline='')
+    csv.writer(text).writerows(rows)
+    if filename.endswith('.zip'):
+        with zipfile.ZipFile(filename, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr('hate_crime.csv', text.getvalue())
+    else:
+        with open(filename, 'w', newline='') as file:
+            file.write(text.getvalue())
+
+
+@pytest.mark.parametrize('extension', ['.csv', '.zip'])
+def test_appended_rows_match_full_recompute(tmp_path, extension: str) -> None:
+    """Updating with rows appended to the source files gives the same aggregates as reading the
+    complete files from scratch."""
+    hate_crime_rows, covid_rows = _hate_crime_rows(20000), _covid_rows(4000)
+    hate_crime_file = str(tmp_path / f'hate_crime{extension}')
+    covid_file = str(tmp_path / 'covid.csv')
+
+    _write(hate_crime_file, hate_crime_rows[:12001])
+    _write(covid_file, covid_rows[:2001])
+    state = incremental.initialize(hate_crime_file, covid_file)
+
+    _write(hate_crime_file, hate_crime_rows)
+    _write(covid_file, covid_rows)
+    changed = incremental.update(state)
+    assert changed != set()
+    assert state.hate_crime_offset > 0
+
+    full = incremental.initialize(hate_crime_file, covid_file)
+    assert np.array_equal(state.incident_ids, full.incident_ids)
+    assert np.array_equal(state.cube.counts, full.cube.counts)
+    assert state.cube.states == full.cube.states
+    assert state.percent_difference == full.percent_difference
+    assert state.covid_totals == full.covid_totals
+
+
+def test_zip_and_csv_sources_match(tmp_path) -> None:
+    """A hate crime zip archive is ingested like the csv file it contains."""
+    rows, covid_file = _hate_crime_rows(5000), str(tmp_path / 'covid.csv')
+    _write(str(tmp_path / 'hate_crime.csv'), rows)
+    _write(str(tmp_path / 'hate_crime.zip'), rows)
+    _write(covid_file, _covid_rows(10))
+
+    from_csv = incremental.initialize(str(tmp_path / 'hate_crime.csv'), covid_file)
+    from_zip = incremental.initialize(str(tmp_path / 'hate_crime.zip'), covid_file)
+    assert np.array_equal(from_csv.cube.counts, from_zip.cube.counts)
+    assert from_csv.hate_crime_offset == from_zip.hate_crime_offset
@@ -0,0 +1,80 @@
+"""Tests of parallel_reader."""
+import csv
+import io
+import zipfile
+
+import numpy as np
+import pytest
+
+import hate_crime
+import parallel_reader
+from record_store import HateCrimeStore
+
+
+def _write(directory, name: str, text: str) -> tuple[str, str]:
+    """Write text to name.csv and to name.csv in name.zip in directory and return the paths of
+    both files."""
+    csv_file, zip_file = str(directory / f'{name}.csv'), str(directory / f'{name}.zip')
+    with open(csv_file, 'w', encoding='utf-8', newline='') as file:
+        file.write(text)
+    with zipfile.ZipFile(zip_file, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(f'{name}.csv', text)
+    return csv_file, zip_file
+
+
+def _assert_equal(store: HateCrimeStore, expected: tuple[list[str], list[hate_crime.HateCrime]]) \
+        -> None:
+    """Assert that store holds exactly the headers and records returned by read_csv_file."""
+    assert store.headers == expected[0]
+    assert store.records() == expected[1]
+
+
+def test_multi_chunk_reads_match_serial_reader(tmp_path) -> None:
+    """Reading hate_crime.csv, or the zip archive containing it, in several chunks gives the
+    headers and records of hate_crime.read_csv_file."""
+    with zipfile.ZipFile('hate_crime.zip') as archive:
+        text = archive.read('hate_crime.csv').decode('utf-8')
+    csv_file, zip_file = _write(tmp_path, 'hate_crime', text)
+    expected = hate_crime.read_csv_file(csv_file)
+
+    for filename in (csv_file, zip_file):
+        _assert_equal(parallel_reader.read_hate_crime_store(filename, workers=4), expected)
+
+
+@pytest.mark.parametrize('workers', [1, 2, 3, 5, 7])
+def test_quoted_line_breaks_at_chunk_boundaries(tmp_path, monkeypatch, workers: int) -> None:
+    """Line breaks inside quoted fields do not end a record, even where the data is split into
+    chunks of equal size."""
+    with zipfile.ZipFile('hate_crime.zip') as archive, archive.open('hate_crime.csv') as raw:
+        headers = next(csv.reader(io.TextIOWrapper(raw, encoding='utf-8', newline='')))
+
+    # Records of equal length, most of which is a quoted field holding line breaks. There are
+    # 211 of them, so that every split into up to 7 chunks of equal size falls inside a record.
+    rows = [headers]
+    for number in range(211):
+        row = [''] * len(headers)
+        row[0] = str(100000 + number)
+        row[3] = 'Agency, "unit"\n' * 50
+        row[6] = ('AL', 'NB', 'DC')[number % 3]
+        row[12] = f'2020-{number % 12 + 1:02}-15'
+        rows.append(row)
+    text = io.StringIO(newline='')
+    csv.writer(text).writerows(rows)
+    csv_file, zip_file = _write(tmp_path, 'hate_crime', text.getvalue())
+    expected = hate_crime.read_csv_file(csv_file)
+
+    data = text.getvalue().encode('utf-8')
+    header_end = parallel_reader.next_record_start(data, 0, 0)
+    splits = [header_end + (len(data) - header_end) * chunk // workers
+              for chunk in range(1, workers)]
+    assert all(data.count(b'"', header_end, split) % 2 == 1 for split in splits)
+
+    monkeypatch.setattr(parallel_reader, '_MIN_CHUNK_SIZE', 256)
+    boundaries = parallel_reader.record_boundaries(data, workers, header_end)
+    assert len(boundaries) == workers + 1
+    assert all(data.count(b'"', header_end, boundary) % 2 == 0 for boundary in boundaries)
+
+    for filename in (csv_file, zip_file):
+        store = parallel_reader.read_hate_crime_store(filename, workers=workers)
+        _assert_equal(store, expected)
+        assert np.array_equal(store.incident_ids, [int(row[0]) for row in rows[1:]])
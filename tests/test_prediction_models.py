@@ -0,0 +1,51 @@
+"""Tests of prediction_models."""
+import numpy as np
+
+import hate_crime
+import prediction_models
+import snapshot
+
+
+def _find_best_slope(counts: list[int]) -> int:
+    """Return the slope found by hate_crime.find_best_slope for the yearly counts of one state,
+    from its start_year to its end_year."""
+    end = len(counts) - 1
+    slope = (counts[end] - counts[0]) // end
+
+    middle = end // 2
+    adjusted_slope = (counts[end] - counts[middle]) // (end - middle)
+
+    while abs(slope - adjusted_slope) > 1:
+        slope = adjusted_slope
+        middle = (end + middle) // 2
+        adjusted_slope = (counts[end] - counts[middle]) // (end - middle)
+
+    return adjusted_slope
+
+
+def test_best_slopes_match_find_best_slope() -> None:
+    """best_slopes and predict_slope agree with the find_best_slope loop on random windows of
+    every length."""
+    rng = np.random.default_rng(110)
+    for length in range(2, 26):
+        for scale in (3, 50, 1000):
+            window = rng.integers(0, scale, size=(200, length))
+            expected = [_find_best_slope(row) for row in window.tolist()]
+
+            assert prediction_models.best_slopes(window).tolist() == expected
+            assert prediction_models.predict_slope(window).tolist() == \
+                [slope + row[-1] for slope, row in zip(expected, window.tolist())]
+
+
+def test_cube_predictions_match_baseline_predictions() -> None:
+    """The predictions for the hate crime data set equal those of the baseline loop over
+    find_best_slope, raised to at least 1."""
+    data = snapshot.load_hate_crime_store()
+    expected = {}
+    for state in hate_crime.STATES:
+        prediction = hate_crime.find_best_slope(data, state, 1999, 2019) \
+            + hate_crime.num_instances_by_year(data, state, 2019)
+        expected[state] = max(prediction, 1)
+
+    assert hate_crime.predictions(data) == expected
+    assert hate_crime.cube_predictions(hate_crime.count_cube(data), hate_crime.STATES) == expected
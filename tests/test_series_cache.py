@@ -0,0 +1,80 @@
+"""Tests of series_cache."""
+import datetime
+import gc
+
+import creating_graphs
+from hate_crime import HateCrime
+from record_store import HateCrimeStore
+import series_cache
+
+
+def _data() -> list[HateCrime]:
+    """Return a small hate crime data set."""
+    return [HateCrime(1, 'AL', datetime.date(2020, 3, 1)),
+            HateCrime(2, 'AL', datetime.date(2020, 3, 9)),
+            HateCrime(3, 'AK', datetime.date(2019, 5, 2))]
+
+
+def _store() -> HateCrimeStore:
+    """Return the small hate crime data set of _data as a record store."""
+    return HateCrimeStore.from_records([], _data())
+
+
+def test_memoized_function_accepts_keyword_state() -> None:
+    """A memoized function can be called with its state as a keyword, and shares its cached
+    result with a positional call."""
+    series_cache.invalidate()
+    data = _store()
+
+    by_keyword = creating_graphs.get_data_by_month(data, state='AL')
+    hits = series_cache.statistics()['hits']
+    by_position = creating_graphs.get_data_by_month(data, 'AL')
+
+    assert by_keyword == by_position
+    assert by_keyword[(2020, 3)] == 2
+    assert series_cache.statistics()['hits'] == hits + 1
+
+
+def test_memoized_function_accepts_keyword_data() -> None:
+    """A memoized function can be called with all of its arguments as keywords."""
+    series_cache.invalidate()
+    x, y = creating_graphs.get_xy_coordinates_year(data=_store(), state='AK')
+    assert dict(zip(x, y))['2019'] == 1
+
+
+def test_lists_are_not_memoized() -> None:
+    """The series of a list whose records are edited in place are never stale."""
+    series_cache.invalidate()
+    data = _data()
+    assert creating_graphs.get_data_by_month(data, 'AL')[(2020, 3)] == 2
+
+    data[0].state_abbr = 'AK'
+    assert creating_graphs.get_data_by_month(data, 'AL')[(2020, 3)] == 1
+    assert series_cache.statistics()['entries'] == 0
+
+
+def test_cached_results_are_copied() -> None:
+    """Mutating a returned result does not change the cached result."""
+    series_cache.invalidate()
+    data = _store()
+    misses = series_cache.statistics()['misses']
+
+    _, y = creating_graphs.get_xy_coordinates_month(data, 'AL')
+    y.clear()
+    creating_graphs.get_data_by_month(data, 'AL').clear()
+
+    assert sum(creating_graphs.get_xy_coordinates_month(data, 'AL')[1]) == 2
+    assert sum(creating_graphs.get_data_by_month(data, 'AL').values()) == 2
+    assert series_cache.statistics()['misses'] == misses + 2
+
+
+def test_results_are_dropped_with_their_store() -> None:
+    """The cache does not keep stores alive, and drops their results once they are collected."""
+    series_cache.invalidate()
+    data = _store()
+    creating_graphs.get_data_by_year(data, 'AL')
+    assert series_cache.statistics()['entries'] == 1
+
+    del data
+    gc.collect()
+    assert series_cache.statistics()['entries'] == 0
@@ -0,0 +1,114 @@
+"""Tests of service."""
+import asyncio
+import json
+
+import service
+
+
+def test_unknown_paths_are_not_cached() -> None:
+    """Responses to known paths are cached, but 404 responses to unknown paths are not."""
+    async def run() -> None:
+        svc = service.Service(workers=1)
+        await svc.load()
+        try:
+            _, body = await svc.response('/states')
+            assert body is not None
+            for number in range(5):
+                assert (await svc.response(f'/no-such-endpoint/{number}'))[1] is None
+            assert list(svc._responses) == ['/states']
+            assert svc._rendering == {}
+        finally:
+            svc.close()
+
+    asyncio.run(run())
+
+
+def test_rendering_finished_after_reload_keeps_new_rendering() -> None:
+    """A rendering that finishes after a newer rendering of the same path was started does not
+    forget the newer one."""
+    async def run() -> None:
+        svc = service.Service(workers=1)
+        await svc.load()
+        try:
+            first = asyncio.ensure_future(svc.response('/percent-difference'))
+            await asyncio.sleep(0)
+            newer = asyncio.get_running_loop().create_future()
+            svc._rendering['/percent-difference'] = newer
+
+            await first
+            assert svc._rendering['/percent-difference'] is newer
+        finally:
+            svc.close()
+
+    asyncio.run(run())
+
+
+def test_paths_are_cached_under_their_canonical_form() -> None:
+    """Paths differing only in their leading and trailing slashes share one cached response."""
+    async def run() -> None:
+        svc = service.Service(workers=1)
+        await svc.load()
+        try:
+            responses = [await svc.response(path)
+                         for path in ['/states', '/states/', '//states', '/states//']]
+            assert all(response == responses[0] for response in responses)
+            await svc.response('/series/AL/month/')
+            assert sorted(svc._responses) == ['/series/AL/month', '/states']
+        finally:
+            svc.close()
+
+    asyncio.run(run())
+
+
+async def _request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, path: str,
+                   headers: str = '') -> tuple[int, dict[str, str], bytes]:
+    """Send a GET request for path and return the status, lower-cased headers and body of the
+    response."""
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\n{headers}\r\n'.encode())
+    await writer.drain()
+
+    head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+    response_headers = {}
+    for line in head[1:]:
+        name, _, value = line.partition(':')
+        if name:
+            response_headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(response_headers.get('content-length', 0)))
+    return int(head[0].split()[1]), response_headers, body
+
+
+def test_http_responses() -> None:
+    """The service answers over a socket with 200 and an ETag, 304 for a matching If-None-Match,
+    404 for unknown paths, and closes the connection when asked to."""
+    async def run() -> None:
+        svc = service.Service(workers=1)
+        await svc.load()
+        server = await asyncio.start_server(svc.handle, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            # The workers are started by this request, and must not keep its connection open
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            status, headers, _ = await _request(reader, writer, '/percent-difference',
+                                                'Connection: close\r\n')
+            assert (status, headers['connection']) == (200, 'close')
+            assert await asyncio.wait_for(reader.read(), 10) == b''
+            writer.close()
+
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            status, headers, body = await _request(reader, writer, '/states')
+            assert status == 200 and 'AL' in json.loads(body)
+            etag = headers['etag']
+
+            status, headers, body = await _request(reader, writer, '/states/',
+                                                   f'If-None-Match: {etag}\r\n')
+            assert (status, headers['etag'], body) == (304, etag, b'')
+
+            status, _, body = await _request(reader, writer, '/no-such-endpoint')
+            assert status == 404 and 'error' in json.loads(body)
+            writer.close()
+        finally:
+            server.close()
+            await server.wait_closed()
+            svc.close()
+
+    asyncio.run(run())
@@ -0,0 +1,136 @@
+"""Tests of snapshot."""
+import csv
+import io
+import json
+import os
+import zipfile
+
+import numpy as np
+import pytest
+
+import covid_dataclass
+import hate_crime
+import snapshot
+
+
+def _covid_rows(count: int) -> list[list[str]]:
+    """Return the header and the first count rows from 2020 of all-states-history.csv."""
+    with open('all-states-history.csv', newline='') as file:
+        reader = csv.reader(file)
+        rows = (row for row in reader if row[0].startswith('2020'))
+        return [next(reader)] + [row for _, row in zip(range(count), rows)]
+
+
+def _write_rows(filename: str, rows: list[list[str]]) -> None:
+    """Write rows to the csv file with the given filename."""
+    with open(filename, 'w', newline='') as file:
+        csv.writer(file).writerows(rows)
+
+
+def _forbid_parsing(monkeypatch) -> None:
+    """Make parsing the covid data set fail, so that only a snapshot can be loaded."""
+    def fail(*_) -> None:
+        raise AssertionError('the source file was parsed')
+    monkeypatch.setattr(snapshot, 'read_metrics', fail)
+
+
+def _load_cases(filename: str, snapshot_dir: str) -> list[int]:
+    """Return the cases of the covid data set in filename, loaded through its snapshot."""
+    return snapshot.load_covid_store(filename, snapshot_dir).cases.tolist()
+
+
+@pytest.fixture
+def covid_file(tmp_path) -> str:
+    """Return the path of a small covid csv file."""
+    filename = str(tmp_path / 'covid.csv')
+    _write_rows(filename, _covid_rows(200))
+    return filename
+
+
+def test_warm_load_equals_cold_load(tmp_path, covid_file: str, monkeypatch) -> None:
+    """Loading a data set from its snapshot gives the same data as parsing it."""
+    snapshot_dir = str(tmp_path / 'snapshots')
+    cold = snapshot.load_covid_data(covid_file, snapshot_dir)
+    assert cold == covid_dataclass.read_csv_file(covid_file)
+
+    _forbid_parsing(monkeypatch)
+    assert snapshot.snapshot_is_up_to_date(covid_file, 'covid', snapshot_dir)
+    assert snapshot.load_covid_data(covid_file, snapshot_dir) == cold
+
+
+def test_warm_hate_crime_load_equals_cold_load(tmp_path) -> None:
+    """Loading the hate crime data set from its snapshot gives the records of
+    hate_crime.read_csv_file."""
+    with zipfile.ZipFile('hate_crime.zip') as archive, archive.open('hate_crime.csv') as raw:
+        lines = [line for _, line in zip(range(3001), io.TextIOWrapper(raw, encoding='utf-8',
+                                                                       newline=''))]
+    csv_file = str(tmp_path / 'hate_crime.csv')
+    with open(csv_file, 'w', encoding='utf-8', newline='') as file:
+        file.writelines(lines)
+
+    snapshot_dir = str(tmp_path / 'snapshots')
+    expected = hate_crime.read_csv_file(csv_file)
+    assert snapshot.load_hate_crime_data(csv_file, snapshot_dir) == expected
+    assert snapshot.snapshot_is_up_to_date(csv_file, 'hate_crime', snapshot_dir)
+    assert snapshot.load_hate_crime_data(csv_file, snapshot_dir) == expected
+
+
+def test_rebuilt_when_size_changes(tmp_path, covid_file: str) -> None:
+    """A snapshot is rebuilt when its source file grows."""
+    snapshot_dir = str(tmp_path / 'snapshots')
+    before = _load_cases(covid_file, snapshot_dir)
+
+    _write_rows(covid_file, _covid_rows(300))
+    assert not snapshot.snapshot_is_up_to_date(covid_file, 'covid', snapshot_dir)
+    after = _load_cases(covid_file, snapshot_dir)
+    assert after == [row.cases for row in covid_dataclass.read_csv_file(covid_file)]
+    assert len(after) > len(before)
+
+
+def test_rebuilt_when_contents_change(tmp_path, covid_file: str) -> None:
+    """A snapshot is rebuilt when its source file is rewritten with new contents of the same
+    size, which is detected by its hash."""
+    snapshot_dir = str(tmp_path / 'snapshots')
+    before = _load_cases(covid_file, snapshot_dir)
+    size = os.path.getsize(covid_file)
+
+    rows = _covid_rows(200)
+    column = rows[0].index('positiveIncrease')
+    row = next(row for row in rows[1:] if row[column] not in {'', '0'})
+    row[column] = str(int(row[column]) % 9 + 1).rjust(len(row[column]), '1')
+    _write_rows(covid_file, rows)
+    assert os.path.getsize(covid_file) == size
+
+    stat = os.stat(covid_file)
+    os.utime(covid_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert not snapshot.snapshot_is_up_to_date(covid_file, 'covid', snapshot_dir)
+    after = _load_cases(covid_file, snapshot_dir)
+    assert after == [row.cases for row in covid_dataclass.read_csv_file(covid_file)]
+    assert after != before
+
+
+def test_kept_when_only_mtime_changes(tmp_path, covid_file: str, monkeypatch) -> None:
+    """A snapshot is kept when its source file is touched without changing its contents, and
+    its manifest records the new modification time."""
+    snapshot_dir = str(tmp_path / 'snapshots')
+    cases = _load_cases(covid_file, snapshot_dir)
+
+    stat = os.stat(covid_file)
+    os.utime(covid_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    _forbid_parsing(monkeypatch)
+    assert _load_cases(covid_file, snapshot_dir) == cases
+
+    manifest_path = os.path.join(snapshot_dir, 'covid.csv.covid.json')
+    with open(manifest_path) as file:
+        assert json.load(file)['source']['mtime_ns'] == stat.st_mtime_ns + 10 ** 9
+
+
+def test_rebuilt_when_version_changes(tmp_path, covid_file: str, monkeypatch) -> None:
+    """A snapshot built by another SNAPSHOT_VERSION is rebuilt."""
+    snapshot_dir = str(tmp_path / 'snapshots')
+    cases = _load_cases(covid_file, snapshot_dir)
+
+    monkeypatch.setattr(snapshot, 'SNAPSHOT_VERSION', snapshot.SNAPSHOT_VERSION + 1)
+    assert not snapshot.snapshot_is_up_to_date(covid_file, 'covid', snapshot_dir)
+    assert np.array_equal(_load_cases(covid_file, snapshot_dir), cases)
+    assert snapshot.snapshot_is_up_to_date(covid_file, 'covid', snapshot_dir)
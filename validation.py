@@ -0,0 +1,218 @@
+"""CSC110 Project: The Hidden Correlation Between Covid-19 and Hate Crimes in the United States
+
+Module Description
+==================
+This module contains a bulk validator for the representation invariants of HateCrime and
+CovidData, and the switch for the per-call python_ta contracts.
+
+The validator checks every invariant once per data set, over the arrays of its record store, and
+reports every row that violates an invariant by its index in the data set. main.load_datasets
+validates the data sets as soon as they are loaded. What happens with the violations is chosen
+with the HATE_CRIME_VALIDATION environment variable:
+    - 'warn' (the default): a warning summarizing the violations is issued
+    - 'strict': a DataValidationError is raised
+    - 'off': the data sets are not validated
+
+Since the data sets are validated as a whole, the per-call contracts, which check the
+preconditions and invariants again on every call when a module is run as a script, can be turned
+off by setting the HATE_CRIME_CONTRACTS environment variable to 0.
+
+>>> import datetime
+>>> from hate_crime import HateCrime
+>>> violations = hate_crime_violations([HateCrime(1, 'AL', datetime.date(2020, 1, 1)),
+...                                     HateCrime(-2, 'GM', datetime.date(2020, 1, 1))])
+>>> [(violation.row, violation.invariant) for violation in violations]
+[(1, 'incident_id >= 0'), (1, 'state in STATES')]
+"""
+from dataclasses import dataclass
+import datetime
+import os
+from typing import Any, Union
+import warnings
+
+import numpy as np
+
+import covid_dataclass
+from covid_dataclass import CovidData
+import hate_crime
+from hate_crime import HateCrime
+from record_store import CovidStore, HateCrimeStore
+
+# What load_datasets does with the violations of a data set: 'warn', 'strict' or 'off'
+VALIDATION_MODE = os.environ.get('HATE_CRIME_VALIDATION', 'warn').lower()
+
+# Whether the per-call python_ta contracts are checked when a module is run as a script
+CONTRACTS_ENABLED = os.environ.get('HATE_CRIME_CONTRACTS', '1') != '0'
+
+# The number of violating rows listed per invariant in a summary
+_ROWS_SHOWN = 5
+
+
+@dataclass
+class Violation:
+    """A row of a data set that violates a representation invariant.
+
+    Attributes:
+        - row: the index of the row in the data set
+        - invariant: the representation invariant that the row violates
+        - value: the value of the row that violates the invariant
+
+    Representation Invariants:
+        - self.row >= 0
+    """
+    row: int
+    invariant: str
+    value: Any
+
+
+class DataValidationError(ValueError):
+    """Raised when a data set violates the representation invariants of its records.
+
+    Instance Attributes:
+        - kind: the kind of the data set, 'hate_crime' or 'covid'
+        - violations: every violation found in the data set, ordered by row
+    """
+    kind: str
+    violations: list[Violation]
+
+    def __init__(self, kind: str, violations: list[Violation]) -> None:
+        super().__init__(summary(kind, violations))
+        self.kind = kind
+        self.violations = violations
+
+
+def hate_crime_violations(data: list[HateCrime]) -> list[Violation]:
+    """Return every violation of the representation invariants of HateCrime in data, ordered by
+    row.
+
+    If data is a record_store.HateCrimeStore, its arrays are checked directly.
+    """
+    if not isinstance(data, HateCrimeStore):
+        data = HateCrimeStore.from_records([], data)
+
+    first_ordinal = datetime.date(1999, 1, 1).toordinal()
+    return _violations([
+        ('incident_id >= 0', data.incident_ids < 0, data.incident_ids.tolist),
+        ('1999 <= date.year', data.date_ordinals < first_ordinal,
+         lambda: _dates(data.date_ordinals)),
+        ('state in STATES', _invalid_states(data.states, hate_crime.STATES)[data.state_codes],
+         lambda: [data.states[code] for code in data.state_codes.tolist()])])
+
+
+def covid_violations(data: list[CovidData]) -> list[Violation]:
+    """Return every violation of the representation invariants of CovidData in data, ordered by
+    row.
+
+    If data is a record_store.CovidStore, its arrays are checked directly.
+    """
+    if not isinstance(data, CovidStore):
+        data = CovidStore.from_records(data)
+
+    first_ordinal = datetime.date(2020, 1, 1).toordinal()
+    end_ordinal = datetime.date(2021, 1, 1).toordinal()
+    return _violations([
+        ('(2021, 1, 1) > date >= (2020, 1, 1)',
+         (data.date_ordinals < first_ordinal) | (data.date_ordinals >= end_ordinal),
+         lambda: _dates(data.date_ordinals)),
+        ('state in STATES',
+         _invalid_states(data.states, covid_dataclass.STATES)[data.state_codes],
+         lambda: [data.states[code] for code in data.state_codes.tolist()]),
+        ('cases >= 0', data.cases < 0, data.cases.tolist)])
+
+
+def _invalid_states(states: tuple[str, ...], valid: set[str]) -> np.ndarray:
+    """Return a boolean array that is True at the index of every state of states that is not a
+    valid abbreviated state name, so that it can be indexed by state codes."""
+    return np.array([len(state) != 2 or state not in valid for state in states] or [False])
+
+
+def _dates(ordinals: np.ndarray) -> list[datetime.date]:
+    """Return the dates with the given date ordinals."""
+    return [datetime.date.fromordinal(ordinal) for ordinal in ordinals.tolist()]
+
+
+def _violations(checks: list[tuple[str, np.ndarray, Any]]) -> list[Violation]:
+    """Return the violations of the (invariant, violated, values) checks, ordered by row.
+
+    violated is True for every row violating the invariant, and values is a function returning
+    the values of every row, only called if some row violates the invariant.
+    """
+    violations = []
+    for invariant, violated, values in checks:
+        rows = np.flatnonzero(violated)
+        if len(rows) > 0:
+            all_values = values()
+            violations.extend(Violation(row, invariant, all_values[row]) for row in rows.tolist())
+
+    violations.sort(key=lambda violation: violation.row)
+    return violations
+
+
+def summary(kind: str, violations: list[Violation]) -> str:
+    """Return a summary of the violations of a data set of the given kind, listing the first rows
+    violating each invariant.
+
+    >>> print(summary('covid', [Violation(3, 'cases >= 0', -1), Violation(7, 'cases >= 0', -4)]))
+    2 rows of the covid data set violate its representation invariants:
+        cases >= 0: 2 rows, e.g. row 3 (-1), row 7 (-4)
+    """
+    by_invariant = {}
+    for violation in violations:
+        by_invariant.setdefault(violation.invariant, []).append(violation)
+
+    lines = [f'{len({violation.row for violation in violations})} rows of the {kind} data set '
+             f'violate its representation invariants:']
+    for invariant, invariant_violations in by_invariant.items():
+        examples = ', '.join(f'row {violation.row} ({violation.value!r})'
+                             for violation in invariant_violations[:_ROWS_SHOWN])
+        lines.append(f'    {invariant}: {len(invariant_violations)} rows, e.g. {examples}')
+
+    return '\n'.join(lines)
+
+
+# The violation functions of the data sets, keyed by their kind
+VALIDATORS = {'hate_crime': hate_crime_violations, 'covid': covid_violations}
+
+
+def validate(kind: str, data: Union[list[HateCrime], list[CovidData]],
+             mode: str = VALIDATION_MODE) -> list[Violation]:
+    """Validate the data set data of the given kind of VALIDATORS in the given mode of
+    VALIDATION_MODE, and return its violations.
+
+    Preconditions:
+        - kind in VALIDATORS
+        - mode in {'warn', 'strict', 'off'}
+    """
+    if mode == 'off':
+        return []
+
+    violations = VALIDATORS[kind](data)
+    if violations and mode == 'strict':
+        raise DataValidationError(kind, violations)
+    elif violations:
+        warnings.warn(summary(kind, violations), stacklevel=2)
+
+    return violations
+
+
+def check_contracts() -> None:
+    """Check the contracts of the functions of the module run as a script on every call, unless
+    they were turned off with CONTRACTS_ENABLED."""
+    if CONTRACTS_ENABLED:
+        import python_ta.contracts
+
+        python_ta.contracts.DEBUG_CONTRACTS = False
+        python_ta.contracts.check_all_contracts()
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'extra-imports': ['python_ta.contracts', 'dataclasses', 'datetime', 'os', 'typing',
+                          'warnings', 'numpy', 'covid_dataclass', 'hate_crime', 'record_store'],
+        'disable': ['R1705']
+    })
+
+    check_contracts()